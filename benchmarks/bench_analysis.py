@@ -0,0 +1,122 @@
+"""主机端测量基准：scope_analysis 由原始码值计算全部测量项的耗时 (对比先解码为 float64 电压再逐项计算)，
+以及经模拟器 (--transport sim) 读取波形后主机端结果与仪器 :MEASure 结果的一致性。
+
+波形为模拟器的正弦 (1 MHz，1.25 GS/s) 加 --noise 给出的噪声 (WORD 码值的均方根)。
+
+    python benchmarks/bench_analysis.py --points 10000000 -c 1 4 --gates 1 8
+"""
+import argparse
+import math
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import numpy as np
+
+import scope_analysis
+import scope_controller
+import scope_simulator
+import scope_waveform
+
+PARAMETERS = (scope_simulator.WAVEFORM_RANGE, 0.0, 0.0)
+AMPLITUDE_PARAMETERS = ("AVERage", "RMS", "SDEViation", "MAXimum", "MINimum", "PTOPeak")
+
+
+def decoded_baseline(codes, sample_rate):
+    """对照：整条记录解码为 float64 电压后逐项计算 (幅值类)，时间类以过零点估计周期"""
+    results = []
+    for row in codes:
+        volts = scope_waveform.decode_waveform(row, "WORD", *PARAMETERS)
+        crossings = np.flatnonzero((volts[:-1] < 0) & (volts[1:] >= 0))
+        results.append((volts.mean(), np.sqrt(np.mean(volts ** 2)), volts.std(), volts.max(), volts.min(),
+                        volts.max() - volts.min(), np.diff(crossings).mean() / sample_rate))
+    return results
+
+
+def timed(function, repeat):
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def cross_check(tolerance):
+    """经模拟器读取各通道波形，在主机端计算并与 :MEASure 的结果比较；返回是否全部在容差内"""
+    args = SimpleNamespace(transport="sim", verbose=False)
+    controller = scope_controller.ScopeController(args)
+    if not controller.connect(quiet=True):
+        raise SystemExit("连接模拟器失败")
+    channels = scope_controller.ALL_CHANNELS
+    parameters = scope_analysis.HOST_PARAMETERS
+    try:
+        scope_values = controller.measure_snapshot([(channel, parameter) for channel in channels for parameter in parameters])
+        host = controller.host_measurements(channels, parameters)
+    finally:
+        controller.close(quiet=True)
+
+    print(f"\n与模拟器 :MEASure 的一致性 (容差: 相对 {tolerance:g}，平均值按峰峰值计)")
+    print(f"{'测量项':<12} {'最大偏差':>10}  结果")
+    ok = True
+    for index, parameter in enumerate(parameters):
+        worst = 0.0
+        for column, channel in enumerate(channels):
+            expected = scope_values[column * len(parameters) + index]
+            actual = float(host[parameter][0, column])
+            # 平均值的期望为 0，以峰峰值为基准计算相对偏差
+            reference = scope_values[column * len(parameters) + parameters.index("PTOPeak")] if parameter == "AVERage" else expected
+            worst = max(worst, abs(actual - expected) / abs(reference))
+        passed = worst <= tolerance
+        ok = ok and passed
+        print(f"{parameter:<12} {worst:10.2e}  {'一致' if passed else '不一致'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="主机端测量基准 (scope_analysis)")
+    parser.add_argument("--points", type=int, default=10_000_000, help="每个通道的点数 (默认 10000000)")
+    parser.add_argument("-c", "--channels", type=int, nargs="+", default=[1, 4], help="通道数 (默认 1 4)")
+    parser.add_argument("--gates", type=int, nargs="+", default=[1, 8], help="门控区间数 (均分整条记录, 默认 1 8)")
+    parser.add_argument("--noise", type=float, default=20.0, help="噪声均方根 (WORD 码值, 默认 20)")
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数，取最短用时 (默认 3)")
+    parser.add_argument("--tolerance", type=float, default=1e-2, help="一致性检查的相对容差 (默认 0.01)")
+    args = parser.parse_args()
+
+    scope = scope_simulator.SimulatedScope(record_length=args.points)
+    rng = np.random.default_rng(0)
+    sample_rate = scope_simulator.SAMPLE_RATE
+    codes = np.vstack([
+        np.clip(scope.waveform_codes(channel, 0, args.points - 1) + rng.normal(0.0, args.noise, args.points), -32768, 32767)
+        .astype("<i2")
+        for channel in range(1, max(args.channels) + 1)
+    ])
+
+    print(f"每通道 {args.points} 点, 噪声 {args.noise:g} 码值")
+    print(f"{'通道':>4} {'门控':>4} {'方式':<22} {'用时':>10} {'MSa/s':>10}")
+    for count in args.channels:
+        block = codes[:count]
+        conversions = [PARAMETERS] * count
+        cases = [("解码 float64 后逐项", lambda: decoded_baseline(block, sample_rate), 1)]
+        for gates in args.gates:
+            edges = np.linspace(0, args.points, gates + 1).astype(int)
+            windows = [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:])] if gates > 1 else None
+            cases.append(("码值 幅值类", lambda windows=windows: scope_analysis.analyze(
+                block, conversions, sample_rate, gates=windows, parameters=AMPLITUDE_PARAMETERS), gates))
+            cases.append(("码值 全部测量项", lambda windows=windows: scope_analysis.analyze(
+                block, conversions, sample_rate, gates=windows), gates))
+        for label, run, gates in cases:
+            elapsed = timed(run, args.repeat)
+            print(f"{count:>4} {gates:>4} {label:<22} {elapsed * 1e3:8.1f}ms {count * args.points / elapsed / 1e6:10.1f}")
+
+    if not cross_check(args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
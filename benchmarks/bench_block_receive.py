@@ -0,0 +1,115 @@
+"""块数据接收的峰值内存/耗时基准：旧的 extend+切片 写法 vs scope_block 预分配缓冲区。
+
+假传输层按固定大小分块吐出 #N<len><data>，不依赖真实设备。
+
+    python benchmarks/bench_block_receive.py --size 16000000
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scope_block
+
+
+class FakeTransport:
+    """按 chunk_size 分块返回一个完整的块数据应答 (含末尾 LF)"""
+
+    def __init__(self, payload, chunk_size):
+        length = str(len(payload)).encode("ascii")
+        self.stream = io.BytesIO(b"#" + str(len(length)).encode("ascii") + length + payload + b"\n")
+        self.chunk_size = chunk_size
+
+    def read_raw(self):
+        return self.stream.read(self.chunk_size)
+
+    def read_bytes(self, count):
+        # 与 pyvisa 一致：内部按 chunk_size 循环读取，拼接为 count 字节
+        parts = []
+        while count > 0:
+            part = self.stream.read(min(count, self.chunk_size))
+            parts.append(part)
+            count -= len(part)
+        return b"".join(parts)
+
+    def readinto(self, view):
+        # 与 tmctl ReceiveBlockData 一致：直接写入调用方提供的缓冲区
+        return self.stream.readinto(view[:self.chunk_size])
+
+
+def legacy_pyvisa(transport, f):
+    """原 yokogawa_pyvisa.py 截图路径：read_raw + extend，再切片后写文件"""
+    raw_data = bytearray()
+    raw_data.extend(transport.read_raw())
+    header_len = 2 + int(chr(raw_data[1]))
+    data_len = int(raw_data[2:header_len])
+    while len(raw_data) < header_len + data_len:
+        raw_data.extend(transport.read_raw())
+    f.write(raw_data[header_len:header_len + data_len])
+
+
+def legacy_tmctl(transport, f, block_size=4096):
+    """原 yokogawa.py 截图路径：每 4 KiB 新建 bytearray，切片后写文件"""
+    head = transport.read_bytes(2)
+    total_len = int(transport.read_bytes(int(chr(head[1]))))
+    received_total = 0
+    while received_total < total_len:
+        remaining = total_len - received_total
+        req_size = min(block_size, remaining + 1)
+        buf = bytearray(req_size)
+        rlen = transport.readinto(memoryview(buf))
+        bytes_to_write = min(rlen, remaining)
+        f.write(buf[:bytes_to_write])
+        received_total += bytes_to_write
+
+
+def shared_pyvisa(transport, f):
+    head = transport.read_bytes(2)
+    _, data_len = scope_block.parse_block_header(head + transport.read_bytes(int(chr(head[1]))))
+
+    def read_into(view):
+        chunk = transport.read_bytes(len(view))
+        view[:len(chunk)] = chunk
+        return len(chunk)
+
+    f.write(scope_block.receive_block(data_len, read_into))
+
+
+def shared_tmctl(transport, f):
+    head = transport.read_bytes(2)
+    _, data_len = scope_block.parse_block_header(head + transport.read_bytes(int(chr(head[1]))))
+    f.write(scope_block.receive_block(data_len, transport.readinto, extra=1))
+
+
+def measure(func, payload, chunk_size):
+    transport = FakeTransport(payload, chunk_size)
+    with open(os.devnull, "wb") as f:
+        tracemalloc.start()
+        start = time.perf_counter()
+        func(transport, f)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="块数据接收基准")
+    parser.add_argument("--size", type=int, default=16_000_000, help="块数据体大小 (bytes, 默认 16 MB)")
+    parser.add_argument("--chunk", type=int, default=20 * 1024, help="假传输层每次返回的字节数 (默认 20 KiB)")
+    args = parser.parse_args()
+
+    payload = os.urandom(args.size)
+    print(f"数据体: {args.size} bytes, 传输分块: {args.chunk} bytes")
+    for name, func in (("pyvisa 旧实现", legacy_pyvisa), ("pyvisa 预分配", shared_pyvisa),
+                       ("tmctl 旧实现", legacy_tmctl), ("tmctl 预分配", shared_tmctl)):
+        elapsed, peak = measure(func, payload, args.chunk)
+        print(f"{name:<12} {elapsed * 1000:8.1f} ms  {args.size / 1e6 / elapsed:8.1f} MB/s  峰值内存 {peak / args.size:4.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""连续单次采集流水线基准：串行 (:SSTart? -> 测量 -> 波形 -> 再次 :SSTart?) 与 --overlap
+(读出测量值即开始下一次采集，上一次的波形在采集期间传输) 的每秒触发数与仪器端死区时间
+(采集停止到下一次开始采集的间隔，由模拟器记录)，并校验归档中每次采集的波形与仪器端一致。
+
+经本地假示波器运行，--profile 模拟链路时序。
+
+    python benchmarks/bench_capture.py -n 50 --profile gbe --acquisition-time 0.005
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import numpy as np
+
+import scope_capture
+import scope_controller
+import scope_history
+import scope_logger
+from fake_scope import PROFILES, FakeHislipServer, FakeScopeServer
+from scope_simulator import SimulatedScope
+
+SERVERS = {"hislip": FakeHislipServer, "socket": FakeScopeServer}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="连续单次采集流水线基准 (串行 / 采集与传输重叠)")
+    parser.add_argument("-n", "--count", type=int, default=50, help="每项的采集次数 (默认 50)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="gbe", help="链路时序配置 (默认 gbe)")
+    parser.add_argument("--acquisition-time", type=float, default=0.005, help="开始采集到触发停止的时间 (秒, 默认 0.005)")
+    parser.add_argument("--record-length", type=int, default=125000, help="每个通道的点数 (默认 125000)")
+    parser.add_argument("-c", "--channels", type=int, default=2, help="通道数 (默认 2)")
+    args = parser.parse_args()
+
+    profile = PROFILES[args.profile]
+    channels = list(range(1, args.channels + 1))
+    items = [(channel, parameter) for channel in channels for parameter in ("AVERage", "RMS")]
+    directory = tempfile.mkdtemp()
+    print(f"时序: {args.profile}, 采集 {args.acquisition_time * 1e3:.1f} ms, {len(channels)} 通道 × {args.record_length} 点, "
+          f"测量值 {len(items)} 个, 每项 {args.count} 次")
+    print(f"{'传输':<8} {'方式':<8} {'触发/s':>8} {'死区 p50':>10} {'p95':>9} {'最大':>9} {'波形不符':>8}")
+    for kind, server_class in SERVERS.items():
+        for overlap in (False, True):
+            scope = SimulatedScope(latency=profile.latency, record_length=args.record_length,
+                                   acquisition_time=args.acquisition_time)
+            server = server_class(scope=scope, rtt=profile.rtt, bandwidth=profile.bandwidth).start()
+            host, port = server.server_address[:2]
+            controller = scope_controller.ScopeController(SimpleNamespace(transport=kind, ip=host, port=port))
+            if not controller.connect(quiet=True):
+                raise SystemExit(f"连接假示波器失败 ({kind})")
+
+            # 仪器端每次开始采集的时刻 (单次采集在 acquisition_time 后停止)
+            starts = []
+            start_acquisition = scope.start_acquisition
+
+            def record_start(now, single=False, start_acquisition=start_acquisition, starts=starts):
+                starts.append(now)
+                start_acquisition(now, single)
+
+            scope.start_acquisition = record_start
+            # 预热 (首次生成模拟波形时导入 numpy)
+            scope.waveform_payload()
+            first = scope.captures + 1
+            path = os.path.join(directory, f"{kind}_{int(overlap)}.dlmhist")
+            try:
+                begin = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    ok = scope_capture.run_capture(controller, channels, items, path, count=args.count, overlap=overlap)
+                elapsed = time.perf_counter() - begin
+            finally:
+                controller.close(quiet=True)
+                server.shutdown()
+            if not ok:
+                raise SystemExit(f"{kind} 采集失败")
+
+            dead = sorted(later - (earlier + args.acquisition_time) for earlier, later in zip(starts, starts[1:]))
+            _, records = scope_history.read_history(path)
+            mismatched = 0
+            for index, record in enumerate(records):
+                for position, channel in enumerate(channels):
+                    expected = scope.waveform_codes(channel, 0, args.record_length - 1, first + index)
+                    mismatched += not np.array_equal(record["codes"][position], expected)
+            print(f"{kind:<8} {'overlap' if overlap else '串行':<8} {args.count / elapsed:8.1f} "
+                  f"{statistics.median(dead) * 1e3:8.2f}ms {scope_logger.percentile(dead, 95) * 1e3:7.2f}ms "
+                  f"{dead[-1] * 1e3:7.2f}ms {mismatched:8d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""CLI 端到端基准：yokogawa_pyvisa.py 的每个子命令都按命令行调用的完整流程 (解析参数 -> 连接 -> 执行 -> 断开)
+对本地假示波器运行，报告每个子命令的 p50/p95 耗时、每次调用的往返数与应答吞吐，并可保存/比较基线。
+
+假示波器按 --profile 模拟 DLM3000 的链路时序 (usb2 / gbe: 往返时延、带宽、仪器处理时间)，
+--transport vxi11 经 pyvisa-py 的 VXI-11 客户端连接，socket/hislip 使用本仓库的原生传输。
+
+    python benchmarks/bench_cli.py --profile gbe --transport vxi11 -n 10 --save baseline.json
+    python benchmarks/bench_cli.py --profile gbe --transport vxi11 -n 10 --compare baseline.json --threshold 0.2
+"""
+import _thread
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import scope_controller
+import scope_logger
+import yokogawa_pyvisa
+from fake_scope import PROFILES, FakeHislipServer, FakeScopeServer, FakeVxi11Server
+from scope_simulator import SimulatedScope
+
+# (名称, 子命令参数)；{tmp} 为临时输出目录，{targets} 为 multi 的两台假示波器，{http_port} 为 exporter 的监听端口
+COMMANDS = (
+    ("mean", ["mean", "-c", "1"]),
+    ("rms", ["rms", "-c", "2"]),
+    ("measure", ["measure", "-a", "-p", "mean", "rms", "pp", "freq"]),
+    ("channel", ["channel", "on", "-a"]),
+    ("shot", ["shot", "-o", "{tmp}/shot.png"]),
+    ("shot --count 5", ["shot", "-o", "{tmp}/burst.png", "--count", "5", "--no-stop"]),
+    ("wave", ["wave", "-c", "1", "-o", "{tmp}/wave.npy"]),
+    ("wave -a", ["wave", "-a", "-o", "{tmp}/wave_all.npy"]),
+    ("log --count 20", ["log", "-a", "-p", "mean", "rms", "--rate", "1000", "--count", "20", "-o", "{tmp}/log.dlmlog"]),
+    ("capture --count 10", ["capture", "-a", "-p", "mean", "rms", "--count", "10", "-o", "{tmp}/cap.dlmhist"]),
+    ("capture --overlap", ["capture", "-a", "-p", "mean", "rms", "--count", "10", "--overlap", "-o", "{tmp}/cap_overlap.dlmhist"]),
+    ("history-export", ["history-export", "-a", "--first", "-4", "-o", "{tmp}/hist.dlmhist"]),
+    ("autoset", ["autoset"]),
+    ("single", ["single"]),
+    ("save", ["save"]),
+    ("multi x2", ["multi", "{targets}", "measure", "-a"]),
+    ("exporter /metrics x5", ["exporter", "-a", "-p", "mean", "rms", "--interval", "0.05", "--http-port", "{http_port}"]),
+)
+# exporter 每次运行: 等到第一次刷新成功后抓取 /metrics 的次数，之后模拟 Ctrl+C 结束
+EXPORTER_SCRAPES = 5
+EXPORTER_TIMEOUT = 10.0
+
+
+def start_servers(kind, scope, profile):
+    """启动假示波器 (共用同一个模拟器状态)，返回 (servers, 连接参数, multi 的两个目标参数)"""
+    if kind == "vxi11":
+        # 每个 VXI-11 资源字符串对应一台假示波器
+        servers = [FakeVxi11Server(scope=scope, rtt=profile.rtt, bandwidth=profile.bandwidth).start() for _ in range(2)]
+        return servers, ["--resource", servers[0].resource], [arg for server in servers for arg in ("--resource", server.resource)]
+    if kind == "hislip":
+        server = FakeHislipServer(scope=scope, rtt=profile.rtt, bandwidth=profile.bandwidth).start()
+    else:
+        server = FakeScopeServer(scope=scope, rtt=profile.rtt, bandwidth=profile.bandwidth).start()
+    host, port = server.server_address[:2]
+    # multi 的 --port 对所有目标生效，用两个不同的主机名连接同一台假示波器
+    return [server], ["--transport", kind, "--ip", host, "--port", str(port)], ["--ip", host, "--ip", "localhost"]
+
+
+def free_port():
+    """本机空闲的 TCP 端口 (exporter 的 HTTP 监听端口)"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def build_argv(connection, targets, argv, tmp, http_port):
+    """把 {tmp}/{targets}/{http_port} 展开为完整命令行；multi 的目标参数插在子命令名之后"""
+    expanded = []
+    for arg in argv:
+        if arg == "{targets}":
+            expanded.extend(targets)
+        else:
+            expanded.append(arg.format(tmp=tmp, http_port=http_port))
+    return ["--no-daemon"] + connection + expanded
+
+
+def scrape_exporter(port, failures):
+    """等到 /metrics 报告 dlm_up 1 后再抓取 EXPORTER_SCRAPES 次，然后向主线程发送 Ctrl+C 结束 exporter"""
+    url = f"http://127.0.0.1:{port}/metrics"
+    deadline = time.monotonic() + EXPORTER_TIMEOUT
+    try:
+        while True:
+            try:
+                with urllib.request.urlopen(url, timeout=1.0) as response:
+                    if b"\ndlm_up 1\n" in response.read():
+                        break
+            except OSError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError("exporter 未在超时内完成第一次刷新")
+            time.sleep(0.01)
+        for _ in range(EXPORTER_SCRAPES):
+            with urllib.request.urlopen(url, timeout=1.0) as response:
+                response.read()
+    except Exception as e:
+        failures.append(e)
+    finally:
+        # run_exporter 在 Ctrl+C 时关闭 HTTP 服务并返回
+        _thread.interrupt_main()
+
+
+def run_cli(parser, argv):
+    """按 yokogawa_pyvisa.main 的流程执行一次命令 (不经守护进程)，返回退出码"""
+    args = parser.parse_args(argv)
+    with contextlib.redirect_stdout(io.StringIO()):
+        if args.command == "multi":
+            return scope_controller.cmd_multi(parser, args, yokogawa_pyvisa.ScopeController)
+        if args.command == "exporter":
+            failures = []
+            scraper = threading.Thread(target=scrape_exporter, args=(args.http_port, failures), daemon=True)
+            scraper.start()
+            try:
+                code = scope_controller.execute(yokogawa_pyvisa.ScopeController(args), args)
+            except KeyboardInterrupt:
+                # 抓取失败时 Ctrl+C 可能早于 run_exporter 的主循环到达
+                code = 1
+            scraper.join()
+            return 1 if failures else code
+        return scope_controller.execute(yokogawa_pyvisa.ScopeController(args), args)
+
+
+def bench_command(parser, scope, argv, count):
+    """执行 count 次 (先预热 1 次)，返回结果字典"""
+    if run_cli(parser, argv) != 0:
+        raise RuntimeError("执行失败")
+    timings = []
+    commands = scope.commands
+    sent = scope.bytes_sent
+    for _ in range(count):
+        start = time.perf_counter()
+        code = run_cli(parser, argv)
+        timings.append(time.perf_counter() - start)
+        if code != 0:
+            raise RuntimeError("执行失败")
+    timings.sort()
+    return {
+        "p50_ms": scope_logger.percentile(timings, 50) * 1000.0,
+        "p95_ms": scope_logger.percentile(timings, 95) * 1000.0,
+        "commands": (scope.commands - commands) / count,
+        "mb_per_s": (scope.bytes_sent - sent) / sum(timings) / 1e6,
+    }
+
+
+def compare(results, baseline, threshold):
+    """与基线比较 p50，返回变慢超过 threshold (比例) 的子命令列表"""
+    regressions = []
+    print()
+    print(f"{'子命令':<20} {'基线 p50':>10} {'本次 p50':>10} {'变化':>8}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        change = result["p50_ms"] / base["p50_ms"] - 1.0
+        mark = " <-- 变慢" if change > threshold else ""
+        print(f"{name:<20} {base['p50_ms']:8.2f}ms {result['p50_ms']:8.2f}ms {change * 100:+7.1f}%{mark}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="yokogawa_pyvisa.py 全部子命令的端到端基准 (假示波器)")
+    parser.add_argument("--transport", choices=["vxi11", "socket", "hislip"], default="vxi11",
+                        help="假示波器协议 (默认 vxi11，经 pyvisa-py)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="gbe", help="链路时序配置 (默认 gbe)")
+    parser.add_argument("-n", "--count", type=int, default=10, help="每个子命令的执行次数 (默认 10)")
+    parser.add_argument("--image-size", type=int, default=256 * 1024, help="模拟截图大小 (bytes, 默认 262144)")
+    parser.add_argument("--record-length", type=int, default=12500, help="波形记录长度 (点, 默认 12500)")
+    parser.add_argument("--only", default=None, help=f"只运行指定子命令，逗号分隔 (可选: {', '.join(name for name, _ in COMMANDS)})")
+    parser.add_argument("--save", metavar="FILE", help="把结果保存为基线 (JSON)")
+    parser.add_argument("--compare", metavar="FILE", help="与基线比较，p50 变慢超过 --threshold 时以退出码 1 结束")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定为变慢的 p50 增幅 (比例, 默认 0.2)")
+    args = parser.parse_args()
+
+    selected = COMMANDS
+    if args.only:
+        names = [name.strip() for name in args.only.split(",")]
+        unknown = [name for name in names if name not in dict(COMMANDS)]
+        if unknown:
+            parser.error(f"未知子命令: {', '.join(unknown)}")
+        selected = [command for command in COMMANDS if command[0] in names]
+
+    profile = PROFILES[args.profile]
+    scope = SimulatedScope(latency=profile.latency, image_size=args.image_size, record_length=args.record_length)
+    servers, connection, targets = start_servers(args.transport, scope, profile)
+    cli_parser = yokogawa_pyvisa.build_parser()
+    tmp = tempfile.mkdtemp()
+    http_port = free_port()
+    results = {}
+    print(f"传输: {args.transport}, 时序: {args.profile} (rtt {profile.rtt * 1e3:.2f} ms, "
+          f"带宽 {profile.bandwidth / 1e6:.0f} MB/s, 处理 {profile.latency * 1e3:.2f} ms), 每项 {args.count} 次")
+    print(f"{'子命令':<20} {'p50':>9} {'p95':>9} {'指令/次':>8} {'应答吞吐':>12}")
+    try:
+        for name, argv in selected:
+            try:
+                result = bench_command(cli_parser, scope, build_argv(connection, targets, argv, tmp, http_port), args.count)
+            except Exception as e:
+                print(f"{name:<20} 失败: {e}")
+                continue
+            results[name] = result
+            print(f"{name:<20} {result['p50_ms']:7.2f}ms {result['p95_ms']:7.2f}ms {result['commands']:8.1f} "
+                  f"{result['mb_per_s']:8.2f} MB/s")
+    finally:
+        for server in servers:
+            server.shutdown()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "transport": args.transport,
+                "profile": args.profile,
+                "count": args.count,
+                "python": platform.python_version(),
+                "results": results,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"基线已保存: {args.save}")
+
+    failed = len(results) != len(selected)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if (baseline.get("transport"), baseline.get("profile")) != (args.transport, args.profile):
+            print(f"注意: 基线的传输/时序为 {baseline.get('transport')}/{baseline.get('profile')}，与本次不同")
+        regressions = compare(results, baseline.get("results", {}), args.threshold)
+        if regressions:
+            print(f"变慢超过 {args.threshold * 100:.0f}%: {', '.join(regressions)}")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
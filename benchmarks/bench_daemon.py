@@ -0,0 +1,73 @@
+"""对比 mean 读数在冷启动直连与经守护进程转发时的单次延迟。
+
+    python benchmarks/bench_daemon.py -n 20 --latency 0.002
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scope_logger
+from fake_scope import FakeScope, FakeScopeServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(ROOT, "yokogawa_pyvisa.py")
+
+
+def run_readings(base_args, count):
+    """连续执行 count 次 mean，返回每次的耗时 (秒)"""
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, CLI] + base_args + ["mean"], capture_output=True, text=True)
+        timings.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            raise RuntimeError(f"mean 执行失败: {result.stdout}{result.stderr}")
+    return timings
+
+
+def report(name, timings):
+    ms = sorted(t * 1000.0 for t in timings)
+    p50 = scope_logger.percentile(ms, 50)
+    p95 = scope_logger.percentile(ms, 95)
+    print(f"{name:<10} n={len(ms):<4} mean={statistics.mean(ms):8.2f} ms  p50={p50:8.2f} ms  p95={p95:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="守护进程 vs 冷启动 mean 延迟基准")
+    parser.add_argument("-n", "--count", type=int, default=20, help="每种模式的读数次数 (默认 20)")
+    parser.add_argument("--latency", type=float, default=0.0, help="假示波器每条消息的应答延时 (秒)")
+    args = parser.parse_args()
+
+    server = FakeScopeServer(scope=FakeScope(latency=args.latency)).start()
+    socket_path = os.path.join(tempfile.mkdtemp(), "bench.sock")
+    base_args = ["--resource", server.resource, "--socket", socket_path]
+
+    cold = run_readings(base_args + ["--no-daemon"], args.count)
+
+    daemon = subprocess.Popen([sys.executable, CLI] + base_args + ["serve"], stdout=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 10.0
+        while not os.path.exists(socket_path):
+            if time.monotonic() > deadline or daemon.poll() is not None:
+                raise RuntimeError("守护进程启动失败")
+            time.sleep(0.05)
+        warm = run_readings(base_args, args.count)
+    finally:
+        daemon.terminate()
+        daemon.wait()
+        server.shutdown()
+
+    report("cold", cold)
+    report("daemon", warm)
+    print(f"加速比: {statistics.mean(cold) / statistics.mean(warm):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
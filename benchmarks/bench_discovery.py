@@ -0,0 +1,83 @@
+"""设备发现基准：逐个 vs 并发 *IDN? 探测，以及发现缓存命中时的连接耗时。
+
+部分假示波器的应答延时超过探测超时，模拟不响应 *IDN? 的资源 (逐个探测时每个都要等满超时)。
+
+    python benchmarks/bench_discovery.py --scopes 8 --silent 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import pyvisa
+
+import scope_discovery
+from fake_scope import FakeScope, FakeScopeServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="设备发现基准")
+    parser.add_argument("--scopes", type=int, default=8, help="正常应答的假示波器数量 (默认 8)")
+    parser.add_argument("--silent", type=int, default=4, help="不应答 *IDN? 的资源数量 (默认 4)")
+    parser.add_argument("--latency", type=float, default=0.02, help="正常设备的应答延时 (秒)")
+    parser.add_argument("--timeout", type=int, default=scope_discovery.PROBE_TIMEOUT, help="探测超时 (ms)")
+    parser.add_argument("--repeat", type=int, default=20, help="缓存命中连接的重复次数")
+    args = parser.parse_args()
+
+    servers = [FakeScopeServer(scope=FakeScope(latency=args.latency, serial=f"FAKE{i:04d}")).start() for i in range(args.scopes)]
+    silent_latency = args.timeout / 1000.0 * 2
+    servers += [FakeScopeServer(scope=FakeScope(latency=silent_latency, serial=f"MUTE{i:04d}")).start() for i in range(args.silent)]
+    resources = [server.resource for server in servers]
+    rm = pyvisa.ResourceManager("@py")
+
+    start = time.perf_counter()
+    sequential = [(res, scope_discovery.probe_idn(rm, res, args.timeout)) for res in resources]
+    sequential_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parallel = scope_discovery.probe_resources(rm, resources, args.timeout)
+    parallel_time = time.perf_counter() - start
+
+    answered = sum(1 for _, idn in parallel if idn)
+    print(f"资源数: {len(resources)} (应答 {answered}, 探测超时 {args.timeout} ms)")
+    print(f"逐个探测: {sequential_time * 1000:8.1f} ms")
+    print(f"并发探测: {parallel_time * 1000:8.1f} ms (x{sequential_time / parallel_time:.1f})")
+    assert [idn for _, idn in sequential if idn] == [idn for _, idn in parallel if idn]
+
+    # 缓存命中：只需一次字典查找 + 打开资源，完全跳过枚举与探测
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = scope_discovery.DiscoveryCache(os.path.join(tmp, "discovery.json"))
+        for res, idn in parallel:
+            if idn:
+                cache.put(scope_discovery.serial_from_idn(idn), res, idn)
+        target = scope_discovery.serial_from_idn(parallel[-1 - args.silent][1])
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            found = [res for res, idn in scope_discovery.probe_resources(rm, resources, args.timeout)
+                     if scope_discovery.serial_from_idn(idn) == target]
+            with rm.open_resource(found[0]):
+                pass
+        miss_time = (time.perf_counter() - start) / args.repeat
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            cache = scope_discovery.DiscoveryCache(os.path.join(tmp, "discovery.json"))
+            with rm.open_resource(cache.get(target)):
+                pass
+        hit_time = (time.perf_counter() - start) / args.repeat
+
+    print(f"按序列号定位 (探测): {miss_time * 1000:8.1f} ms")
+    print(f"按序列号定位 (缓存): {hit_time * 1000:8.1f} ms")
+
+    for server in servers:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""exporter 基准：并发抓取 /metrics 时的抓取吞吐与延迟，以及仪器端实际收到的查询数
+(应只随刷新次数增长，与抓取次数无关)；对比 cron 方式每个样本执行一次 rms 子命令 (连接 -> 查询 -> 断开) 的耗时。
+
+经本地 TCP 假示波器 (Socket 传输) 运行，--profile 模拟链路时序。
+
+    python benchmarks/bench_exporter.py --scrapes 2000 --workers 32 --interval 0.1 --profile gbe
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import scope_controller
+import scope_exporter
+import scope_logger
+from fake_scope import PROFILES, FakeScopeServer
+from scope_simulator import SimulatedScope
+
+ITEMS = [(channel, parameter) for channel in (1, 2, 3, 4) for parameter in ("AVERage", "RMS")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="exporter 并发抓取基准")
+    parser.add_argument("--scrapes", type=int, default=2000, help="抓取总次数 (默认 2000)")
+    parser.add_argument("--workers", type=int, default=32, help="并发抓取线程数 (默认 32)")
+    parser.add_argument("--interval", type=float, default=0.1, help="刷新间隔 (秒, 默认 0.1)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="gbe", help="链路时序配置 (默认 gbe)")
+    parser.add_argument("--cron", type=int, default=20, help="cron 方式的样本数 (默认 20)")
+    args = parser.parse_args()
+
+    profile = PROFILES[args.profile]
+    scope = SimulatedScope(latency=profile.latency)
+    server = FakeScopeServer(scope=scope, rtt=profile.rtt, bandwidth=profile.bandwidth).start()
+    host, port = server.server_address[:2]
+    connection = SimpleNamespace(transport="socket", ip=host, port=port)
+
+    # cron 方式: 每个样本一次完整的 连接 -> rms -> 断开
+    cli_parser, _ = scope_controller.build_parser("bench", ["socket"])
+    rms_args = cli_parser.parse_args(["--transport", "socket", "--ip", host, "--port", str(port), "rms", "-c", "1"])
+    cron_times = []
+    for _ in range(args.cron):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            scope_controller.execute(scope_controller.ScopeController(rms_args), rms_args)
+        cron_times.append(time.perf_counter() - start)
+
+    controller = scope_controller.ScopeController(connection)
+    if not controller.connect(quiet=True):
+        raise SystemExit("连接假示波器失败")
+    poller = scope_exporter.MeasurementPoller(controller, ITEMS, args.interval)
+    metrics = scope_exporter.MetricsServer(("127.0.0.1", 0), poller)
+    threading.Thread(target=metrics.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{metrics.server_address[1]}/metrics"
+
+    stop = threading.Event()
+
+    def poll():
+        while not stop.is_set():
+            poller.refresh()
+            stop.wait(args.interval)
+
+    poller.refresh()
+    commands = scope.commands
+    refreshes = poller.refreshes
+    poll_thread = threading.Thread(target=poll, daemon=True)
+    poll_thread.start()
+
+    def scrape(_):
+        t0 = time.perf_counter()
+        with urllib.request.urlopen(url) as response:
+            response.read()
+        return time.perf_counter() - t0
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.workers) as executor:
+        latencies = sorted(executor.map(scrape, range(args.scrapes)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    poll_thread.join()
+    controller.close(quiet=True)
+    metrics.shutdown()
+    server.shutdown()
+
+    print(f"cron (每样本连接一次 rms, {len(ITEMS)} 个值需 {len(ITEMS)} 次): p50 {statistics.median(cron_times) * 1000.0:.2f} ms/值")
+    print(f"exporter 抓取: {args.scrapes} 次 / {elapsed:.2f} s = {args.scrapes / elapsed:.0f} 次/s ({args.workers} 并发), "
+          f"p50 {scope_logger.percentile(latencies, 50) * 1000.0:.2f} ms, p99 {scope_logger.percentile(latencies, 99) * 1000.0:.2f} ms")
+    print(f"期间刷新 {poller.refreshes - refreshes} 次，仪器收到 {scope.commands - commands} 条指令 "
+          f"(每次刷新 {(scope.commands - commands) / max(1, poller.refreshes - refreshes):.1f} 条，与抓取次数无关)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""历史记录批量导出基准：经本地 TCP 假示波器 (Socket 传输) 导出不同条数的历史记录，
+报告 MB/s、条/s 以及导出过程中 Python 堆的峰值，验证内存占用不随记录数增长。
+
+    python benchmarks/bench_history.py --records 100 1000 --record-length 12500
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import scope_controller
+import scope_history
+from fake_scope import FakeScopeServer
+from scope_simulator import SimulatedScope
+
+
+def main():
+    parser = argparse.ArgumentParser(description="历史记录批量导出基准")
+    parser.add_argument("--records", type=int, nargs="+", default=[100, 1000], help="导出的记录条数 (默认 100 1000)")
+    parser.add_argument("--record-length", type=int, default=12500, help="每条记录的点数 (默认 12500)")
+    parser.add_argument("-c", "--channels", type=int, default=2, help="通道数 (默认 2)")
+    args = parser.parse_args()
+
+    channels = list(range(1, args.channels + 1))
+    print(f"{'记录数':>8} {'数据量':>10} {'MB/s':>8} {'条/s':>8} {'堆峰值':>10} {'文件':>10}")
+    for count in args.records:
+        scope = SimulatedScope(record_length=args.record_length, history=count)
+        server = FakeScopeServer(scope=scope).start()
+        host, port = server.server_address[:2]
+        controller = scope_controller.ScopeController(SimpleNamespace(transport="socket", ip=host, port=port))
+        path = os.path.join(tempfile.mkdtemp(), "bench.dlmhist")
+        try:
+            controller.connect(quiet=True)
+            controller.send(":COMMunicate:HEADer OFF")
+            # 预热 (首次生成模拟波形时导入 numpy)，避免计入峰值与耗时
+            scope.waveform_payload()
+            tracemalloc.start()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                ok = scope_history.run_history_export(controller, channels, path, 1 - count, 0)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            if not ok:
+                raise SystemExit(f"{count} 条记录导出不完整")
+            size = count * len(channels) * args.record_length * 2
+            print(f"{count:>8} {size / 1e6:8.1f}MB {size / elapsed / 1e6:8.1f} {count / elapsed:8.1f} "
+                  f"{peak / 1e6:8.2f}MB {os.path.getsize(path) / 1e6:8.1f}MB")
+        finally:
+            controller.close(quiet=True)
+            server.shutdown()
+            if os.path.exists(path):
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""对比逐个读取测量值 (mean/rms 的做法) 与 measure 快照 (';' 拼接) 的延迟。
+
+    python benchmarks/bench_measure.py --latency 0.002 -p mean rms pp freq
+"""
+import argparse
+import os
+import socket
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import scope_measure
+from fake_scope import FakeScope, FakeScopeServer
+from yokogawa_pyvisa import ScopeController
+
+
+def per_value(controller, items):
+    """与 _cmd_get_measurement 相同：每个值先写 HEADer OFF，再单独查询"""
+    values = []
+    for channel, parameter in items:
+        controller.send(":COMMunicate:HEADer OFF")
+        values.append(float(controller.query(f":MEASure:CHANnel{channel}:{parameter}:VALue?")))
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测量快照延迟基准")
+    parser.add_argument("-n", "--count", type=int, default=50, help="每种方式的快照次数 (默认 50)")
+    parser.add_argument("--latency", type=float, default=0.002, help="假示波器每条消息的应答延时 (秒)")
+    parser.add_argument("-p", "--param", nargs="+", default=["mean", "rms", "pp", "freq"], help="测量项")
+    args = parser.parse_args()
+
+    server = FakeScopeServer(scope=FakeScope(latency=args.latency)).start()
+    controller = ScopeController(argparse.Namespace(resource=server.resource, ip=None, serial=None))
+    if not controller.connect(quiet=True):
+        raise SystemExit("连接假示波器失败")
+    # 关闭 Nagle 算法，避免 "写 + 查询" 两个小包叠加延迟确认 (约 40 ms) 放大逐个读取的耗时
+    # (pyvisa-py 的 SOCKET 会话未开放 VI_ATTR_TCPIP_NODELAY，直接设置底层 socket)
+    session = controller.transport.inst.visalib.sessions[controller.transport.inst.session]
+    session.interface.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    parameters = scope_measure.parse_parameter_values(args.param)
+    items = [(channel, parameter) for channel in (1, 2, 3, 4) for parameter in parameters]
+    messages = len(scope_measure.build_measure_messages(items, prefix=":COMMunicate:HEADer OFF"))
+
+    try:
+        results = {}
+        for name, func in (("逐个读取", per_value), ("measure", controller.measure_snapshot)):
+            timings = []
+            for _ in range(args.count):
+                start = time.perf_counter()
+                values = func(controller, items) if func is per_value else func(items)
+                timings.append(time.perf_counter() - start)
+            results[name] = (timings, values)
+    finally:
+        controller.close(quiet=True)
+        server.shutdown()
+
+    if results["逐个读取"][1] != results["measure"][1]:
+        raise SystemExit("两种方式的读数不一致")
+
+    print(f"快照: {len(items)} 个值 (4 通道 x {len(parameters)} 项), measure 使用 {messages} 条程序消息")
+    for name, (timings, _) in results.items():
+        ms = [t * 1000.0 for t in timings]
+        print(f"{name:<8} mean={statistics.mean(ms):8.2f} ms  p50={statistics.median(ms):8.2f} ms")
+    ratio = statistics.mean(results["逐个读取"][0]) / statistics.mean(results["measure"][0])
+    print(f"加速比: {ratio:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""多台示波器并发 vs 逐台串行的总耗时基准。
+
+每台假示波器注入不同的应答延时，并发总耗时应接近最慢的一台，而不是所有设备之和。
+
+    python benchmarks/bench_multi.py --scopes 8 --latency 0.02 --spread 0.01
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import scope_multi
+from fake_scope import FakeScope, FakeScopeServer
+from scope_controller import CLEAN_COMMANDS, run_command
+from yokogawa_pyvisa import ScopeController, build_parser
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多设备并发基准")
+    parser.add_argument("--scopes", type=int, default=8, help="假示波器数量 (默认 8)")
+    parser.add_argument("--latency", type=float, default=0.02, help="基础应答延时 (秒)")
+    parser.add_argument("--spread", type=float, default=0.01, help="每台设备依次增加的延时 (秒)")
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="子命令 (默认: measure -a -p mean rms pp freq)")
+    args = parser.parse_args()
+
+    servers = [FakeScopeServer(scope=FakeScope(latency=args.latency + i * args.spread)).start() for i in range(args.scopes)]
+    targets = [("resource", server.resource) for server in servers]
+    command = args.command or ["measure", "-a", "-p", "mean", "rms", "pp", "freq"]
+    sub_args = build_parser().parse_args(command)
+
+    # 逐台串行：与单设备 CLI 相同的 连接 -> 执行 -> 断开
+    serial_times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _, resource in targets:
+            start = time.perf_counter()
+            scope_multi.run_multi(sub_args, [("resource", resource)], ScopeController, run_command, CLEAN_COMMANDS)
+            serial_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        ok = scope_multi.run_multi(sub_args, targets, ScopeController, run_command, CLEAN_COMMANDS)
+        concurrent = time.perf_counter() - start
+
+    for server in servers:
+        server.shutdown()
+
+    print(f"设备数: {args.scopes}, 子命令: {' '.join(command)}, 结果: {'OK' if ok else 'FAIL'}")
+    print(f"逐台串行合计: {sum(serial_times):8.3f} s")
+    print(f"最慢单台    : {max(serial_times):8.3f} s")
+    print(f"并发总耗时  : {concurrent:8.3f} s (串行的 {concurrent / sum(serial_times) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""截图连拍基准：N 次单张截图 (每张都 *CLS/:STOP/*OPC?/:IMAGe:FORMat/*OPC?/传输/:STARt)
+对比一次 shot --count N 连拍 (格式只设置一次，后台线程写盘) 与 --no-stop 连拍的帧/s。
+
+经本地 TCP 假示波器 (Socket 传输) 运行，--rtt 模拟网络往返时延。
+
+    python benchmarks/bench_screenshot.py -n 20 --rtt 0.0005 --image-size 262144
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import scope_controller
+import scope_state
+from fake_scope import FakeScopeServer
+from scope_simulator import SimulatedScope
+
+
+def run_shots(controller, parser, runs, argv):
+    """执行 runs 次 shot 子命令，返回总耗时 (秒)"""
+    args = parser.parse_args(argv)
+    controller.args = args
+    start = time.perf_counter()
+    for _ in range(runs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            if not scope_controller.run_command(controller, args):
+                raise SystemExit(f"{' '.join(argv)} 执行失败")
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="截图连拍基准")
+    parser.add_argument("-n", "--frames", type=int, default=20, help="帧数 (默认 20)")
+    parser.add_argument("--rtt", type=float, default=0.0005, help="模拟的网络往返时延 (秒, 默认 0.0005)")
+    parser.add_argument("--image-size", type=int, default=256 * 1024, help="模拟截图大小 (字节, 默认 262144)")
+    args = parser.parse_args()
+
+    cli_parser, _ = scope_controller.build_parser("bench", ["socket"])
+    output = os.path.join(tempfile.mkdtemp(), "bench.png")
+    server = FakeScopeServer(scope=SimulatedScope(image_size=args.image_size), rtt=args.rtt).start()
+    host, port = server.server_address[:2]
+    controller = scope_controller.ScopeController(SimpleNamespace(transport="socket", ip=host, port=port))
+    # 不使用设置缓存，单张截图每次都发送 :IMAGe:FORMat (与单次命令行调用一致)
+    controller.state = scope_state.StateCache(enabled=False)
+    try:
+        if not controller.connect(quiet=True):
+            raise SystemExit("连接假示波器失败")
+        print(f"{'方式':<22} {'总耗时':>10} {'帧/s':>8}")
+        cases = (
+            ("单张截图 x N", args.frames, ["shot", "-o", output]),
+            ("连拍 --count N", 1, ["shot", "-o", output, "--count", str(args.frames)]),
+            ("连拍 --count N --no-stop", 1, ["shot", "-o", output, "--count", str(args.frames), "--no-stop"]),
+        )
+        for name, runs, argv in cases:
+            elapsed = run_shots(controller, cli_parser, runs, argv)
+            print(f"{name:<22} {elapsed * 1000.0:8.1f}ms {args.frames / elapsed:8.1f}")
+    finally:
+        controller.close(quiet=True)
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""耗时操作的完成等待基准：自动设置、单次采集、文件保存分别用
+Sample.py 的方式 (每 100 ms 查询一次 :STATus:CONDition?)、:SSTart? 阻塞查询 (仅单次采集)、
+扩展事件寄存器 + 服务请求 (HiSLIP 异步通道) 以及不支持 SRQ 时的 :STATus:EESR? 退避轮询 (Socket) 等待，
+报告操作完成到程序得知之间的额外延迟与每次操作的指令数。
+
+经本地假示波器运行，--profile 模拟链路时序；每次操作的耗时在给定值的 0.5~1.5 倍之间随机 (固定种子)，
+避免与 100 ms 轮询节拍对齐。
+
+    python benchmarks/bench_srq.py -n 10 --profile gbe
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import scope_controller
+import scope_status
+from fake_scope import PROFILES, FakeHislipServer, FakeScopeServer
+from scope_simulator import SimulatedScope
+
+# Sample.py 的轮询间隔
+SAMPLE_INTERVAL = 0.1
+
+
+def wait_sample(controller, command, mask, level, timeout):
+    """Sample.py 的方式：发送后每 100 ms 查询一次条件寄存器"""
+    controller.send(command)
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        time.sleep(SAMPLE_INTERVAL)
+        if bool(scope_status.register_value(controller.query(":STATus:CONDition?")) & mask) == level:
+            return
+    raise RuntimeError("超时")
+
+
+def wait_sstart(controller, command, mask, level, timeout):
+    """:SSTart? 阻塞到单次采集停止 (参数为 100 ms 单位的超时)"""
+    if controller.query(f":SSTart? {int(timeout * 10)}") != "0":
+        raise RuntimeError("超时")
+
+
+def wait_event(controller, command, mask, level, timeout):
+    controller.wait_condition(command, mask, level, timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="耗时操作完成等待基准 (轮询 / :SSTart? / SRQ)")
+    parser.add_argument("-n", "--count", type=int, default=10, help="每项的执行次数 (默认 10)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="gbe", help="链路时序配置 (默认 gbe)")
+    parser.add_argument("--autoset-time", type=float, default=0.3, help="自动设置耗时 (秒, 默认 0.3)")
+    parser.add_argument("--acquisition-time", type=float, default=0.05, help="单次采集到触发的时间 (秒, 默认 0.05)")
+    parser.add_argument("--save-time", type=float, default=0.15, help="文件保存耗时 (秒, 默认 0.15)")
+    args = parser.parse_args()
+
+    profile = PROFILES[args.profile]
+    scope = SimulatedScope(latency=profile.latency, autoset_time=args.autoset_time,
+                           acquisition_time=args.acquisition_time, save_time=args.save_time)
+    servers = {
+        "hislip": FakeHislipServer(scope=scope, rtt=profile.rtt, bandwidth=profile.bandwidth).start(),
+        "socket": FakeScopeServer(scope=scope, rtt=profile.rtt, bandwidth=profile.bandwidth).start(),
+    }
+    controllers = {}
+    for kind, server in servers.items():
+        host, port = server.server_address[:2]
+        controller = scope_controller.ScopeController(SimpleNamespace(transport=kind, ip=host, port=port))
+        if not controller.connect(quiet=True):
+            raise SystemExit(f"连接假示波器失败 ({kind})")
+        controllers[kind] = controller
+
+    # (操作名, 指令, 条件位, 目标电平, 模拟器的耗时属性)
+    operations = (
+        ("autoset", ":ASETup:EXECute", scope_status.CONDITION_RUN, True, "autoset_time"),
+        ("single", ":TRIGger:MODE SINGle;:STARt", scope_status.CONDITION_RUN, False, "acquisition_time"),
+        ("save", ":FILE:SAVE:BINary:EXECute", scope_status.CONDITION_ACS, False, "save_time"),
+    )
+    # (方法名, 传输, 等待函数, 只适用的操作)
+    methods = (
+        ("Sample.py 100ms 轮询", "hislip", wait_sample, None),
+        (":SSTart?", "hislip", wait_sstart, "single"),
+        ("EESR 轮询 (socket)", "socket", wait_event, None),
+        ("SRQ (hislip)", "hislip", wait_event, None),
+    )
+
+    print(f"时序: {args.profile} (rtt {profile.rtt * 1e3:.2f} ms, 处理 {profile.latency * 1e3:.2f} ms), 每项 {args.count} 次")
+    print(f"{'操作':<8} {'方法':<22} {'额外延迟 p50':>12} {'最大':>9} {'指令/次':>8}")
+    try:
+        for name, command, mask, level, attribute in operations:
+            base = getattr(args, attribute)
+            for method, kind, wait, only in methods:
+                if only is not None and only != name:
+                    continue
+                controller = controllers[kind]
+                rng = random.Random(0)
+                delays = []
+                commands = 0
+                for _ in range(args.count):
+                    duration = base * rng.uniform(0.5, 1.5)
+                    setattr(scope, attribute, duration)
+                    # 每次都从采集运行中开始
+                    controller.query(":TRIGger:MODE AUTO;:STARt;*OPC?")
+                    before = scope.commands
+                    start = time.perf_counter()
+                    wait(controller, command, mask, level, 10.0)
+                    delays.append(time.perf_counter() - start - duration)
+                    commands += scope.commands - before
+                print(f"{name:<8} {method:<22} {statistics.median(delays) * 1e3:10.2f}ms {max(delays) * 1e3:7.2f}ms "
+                      f"{commands / args.count:8.1f}")
+    finally:
+        for controller in controllers.values():
+            controller.close(quiet=True)
+        for server in servers.values():
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
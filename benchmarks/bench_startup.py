@@ -0,0 +1,107 @@
+"""CLI 启动开销基准 (python -X importtime)，超出预算或加载了重依赖时以退出码 1 结束。
+
+检查以下不需要打开设备的路径：
+  help    -> yokogawa_pyvisa.py --help
+  error   -> yokogawa_pyvisa.py mean -c 9 (参数错误)
+  daemon  -> yokogawa_pyvisa.py mean (经守护进程转发)
+
+    python benchmarks/bench_startup.py --budget 60 -n 5
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_scope import FakeScopeServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(ROOT, "yokogawa_pyvisa.py")
+
+# 这些路径上不应出现的模块 (任一出现即视为启动回归)
+HEAVY_MODULES = ("pyvisa", "pyvisa_py", "numpy", "usb", "asyncio", "concurrent.futures", "zeroconf")
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def parse_importtime(stderr):
+    """解析 -X importtime 输出，返回 (顶层模块累计耗时之和 us, {模块: 累计耗时 us})"""
+    total = 0
+    modules = {}
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        modules[name] = cumulative
+        if indent == 1:
+            total += cumulative
+    return total, modules
+
+
+def measure(argv, count, env):
+    """执行 count 次，返回 (最小 import 耗时 ms, 最小墙钟耗时 ms, 加载的模块集合)"""
+    import_times, wall_times, modules = [], [], {}
+    for _ in range(count):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-X", "importtime"] + argv, capture_output=True, text=True, env=env)
+        wall_times.append(time.perf_counter() - start)
+        total, modules = parse_importtime(result.stderr)
+        import_times.append(total)
+    return min(import_times) / 1000.0, min(wall_times) * 1000.0, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI 启动开销基准")
+    parser.add_argument("-n", "--count", type=int, default=5, help="每个场景的执行次数，取最小值 (默认 5)")
+    parser.add_argument("--budget", type=float, default=60.0, help="相对空解释器的 import 耗时预算 (ms, 默认 60)")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    baseline, baseline_wall, baseline_modules = measure(["-c", "pass"], args.count, env)
+
+    server = FakeScopeServer().start()
+    socket_path = os.path.join(tempfile.mkdtemp(), "bench.sock")
+    base_args = ["--resource", server.resource, "--socket", socket_path]
+    daemon = subprocess.Popen([sys.executable, CLI] + base_args + ["serve"], stdout=subprocess.DEVNULL)
+
+    scenarios = [
+        ("help", [CLI, "--help"]),
+        ("error", [CLI, "mean", "-c", "9"]),
+        ("daemon", [CLI] + base_args + ["mean"]),
+    ]
+    failed = False
+    try:
+        deadline = time.monotonic() + 10.0
+        while not os.path.exists(socket_path):
+            if time.monotonic() > deadline or daemon.poll() is not None:
+                raise RuntimeError("守护进程启动失败")
+            time.sleep(0.05)
+
+        print(f"空解释器: import {baseline:6.1f} ms, 墙钟 {baseline_wall:6.1f} ms")
+        for name, argv in scenarios:
+            import_ms, wall_ms, modules = measure(argv, args.count, env)
+            delta = import_ms - baseline
+            heavy = sorted(m for m in modules if any(m == h or m.startswith(h + ".") for h in HEAVY_MODULES))
+            ok = delta <= args.budget and not heavy
+            failed |= not ok
+            print(f"{name:<7} import +{delta:6.1f} ms (预算 {args.budget:g} ms), 墙钟 {wall_ms:6.1f} ms  [{'OK' if ok else 'FAIL'}]")
+            if heavy:
+                print(f"        不应加载的模块: {', '.join(heavy[:8])}{' ...' if len(heavy) > 8 else ''}")
+            if not ok:
+                slowest = sorted(((t, m) for m, t in modules.items() if m not in baseline_modules), reverse=True)[:5]
+                print("        耗时最多: " + ", ".join(f"{m} {t / 1000.0:.1f} ms" for t, m in slowest))
+    finally:
+        daemon.terminate()
+        daemon.wait()
+        server.shutdown()
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
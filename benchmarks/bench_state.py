@@ -0,0 +1,86 @@
+"""设置缓存基准：在同一会话中反复执行脚本化的子命令序列 (常驻守护进程/自动化脚本的典型用法)，
+对比启用设置缓存 (连接时预读设置，重复设置指令省略) 与不缓存时示波器收到的指令数与总耗时。
+
+经本地 TCP 假示波器 (Socket 传输) 运行，--rtt 模拟网络往返时延。
+
+    python benchmarks/bench_state.py -n 20 --rtt 0.0005
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import scope_controller
+import scope_state
+from fake_scope import FakeScopeServer
+from scope_simulator import SimulatedScope
+
+# 每轮执行的子命令序列 (相同设置反复出现)
+SEQUENCE = (
+    ["channel", "on", "-a"],
+    ["shot", "-o", "{tmp}/bench_state.png"],
+    ["measure", "-a", "-p", "mean", "rms"],
+    ["channel", "off", "-c", "3", "4"],
+    ["shot", "-o", "{tmp}/bench_state.png"],
+    ["channel", "on", "-a"],
+    ["mean", "-c", "1"],
+)
+
+
+def run_sequence(cached, rounds, rtt, tmp):
+    """返回 (总耗时 秒, 示波器收到的指令数, 省略的设置指令数)"""
+    parser, _ = scope_controller.build_parser("bench", ["socket"])
+    scope = SimulatedScope(image_size=4096)
+    server = FakeScopeServer(scope=scope, rtt=rtt).start()
+    host, port = server.server_address[:2]
+    controller = scope_controller.ScopeController(SimpleNamespace(transport="socket", ip=host, port=port))
+    if not cached:
+        controller.state = scope_state.StateCache(enabled=False)
+    commands = [parser.parse_args([arg.format(tmp=tmp) for arg in argv]) for argv in SEQUENCE]
+    elided = 0
+    try:
+        start = time.perf_counter()
+        if not controller.connect(quiet=True, prefetch_state=cached):
+            raise SystemExit("连接假示波器失败")
+        for _ in range(rounds):
+            for args in commands:
+                controller.args = args
+                with contextlib.redirect_stdout(io.StringIO()):
+                    if not scope_controller.run_command(controller, args):
+                        raise SystemExit(f"{args.command} 执行失败")
+                elided += controller.state.elided
+        elapsed = time.perf_counter() - start
+    finally:
+        controller.close(quiet=True)
+        server.shutdown()
+    return elapsed, scope.commands, elided
+
+
+def main():
+    parser = argparse.ArgumentParser(description="设置缓存基准")
+    parser.add_argument("-n", "--rounds", type=int, default=20, help="子命令序列的执行轮数 (默认 20)")
+    parser.add_argument("--rtt", type=float, default=0.0005, help="模拟的网络往返时延 (秒, 默认 0.0005)")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    results = {}
+    print(f"{'方式':<12} {'总耗时':>10} {'收到指令':>8} {'省略':>6}")
+    for name, cached in (("不缓存", False), ("设置缓存", True)):
+        elapsed, received, elided = results[name] = run_sequence(cached, args.rounds, args.rtt, tmp)
+        print(f"{name:<12} {elapsed * 1000.0:8.1f}ms {received:8d} {elided:6d}")
+
+    (plain_time, plain_commands, _), (cached_time, cached_commands, _) = results.values()
+    print(f"节省: {(plain_time - cached_time) * 1000.0:.1f} ms ({(1 - cached_time / plain_time) * 100.0:.0f}%)，"
+          f"少发送 {plain_commands - cached_commands} 条指令")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""yokogawa.py (tmctl 路径) 端到端基准：设置 YOKOGAWA_TMCTL_SIM 后 tmctlLib 挂接纯 Python 模拟 DLL，
+在任意 Linux 主机上重复执行子命令，报告每次耗时、每次 DLL 调用数以及块传输吞吐。
+
+    python benchmarks/bench_tmctl.py -n 20 --overhead 0.0002 --bandwidth 40e6
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import scope_controller
+import scope_tmctl_sim
+import yokogawa
+
+# (名称, 子命令参数)
+COMMANDS = (
+    ("mean", ["mean", "-c", "1"]),
+    ("measure 4ch x 2", ["measure", "-a", "-p", "mean", "rms"]),
+    ("shot", ["shot", "-o", "{tmp}/bench.png"]),
+    ("wave 4ch", ["wave", "-a", "-o", "{tmp}/bench.npy"]),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="yokogawa.py tmctl 路径端到端基准 (模拟 DLL)")
+    parser.add_argument("-n", "--count", type=int, default=20, help="每个子命令的执行次数 (默认 20)")
+    parser.add_argument("--overhead", type=float, default=0.0002, help="每次 DLL 调用的固定开销 (秒, 默认 0.0002)")
+    parser.add_argument("--bandwidth", type=float, default=40e6, help="数据传输速率 (bytes/s, 默认 40e6)")
+    parser.add_argument("--image-size", type=int, default=256 * 1024, help="模拟截图大小 (bytes, 默认 262144)")
+    args = parser.parse_args()
+
+    os.environ[scope_tmctl_sim.ENV_VAR] = f"overhead={args.overhead},bandwidth={args.bandwidth},image_size={args.image_size}"
+    tmp = tempfile.mkdtemp()
+    cli_parser = yokogawa.build_parser()
+    controller = yokogawa.ScopeController(cli_parser.parse_args(["mean"]))
+    if not controller.connect(quiet=True):
+        raise SystemExit("连接模拟 tmctl 失败")
+    dll = controller.tmctl.dll
+    print(f"{'子命令':<18} {'p50':>9} {'次/s':>8} {'DLL 调用/次':>11}")
+    try:
+        for name, argv in COMMANDS:
+            command_args = cli_parser.parse_args([arg.format(tmp=tmp) for arg in argv])
+            controller.args = command_args
+            timings = []
+            calls = dll.calls
+            for _ in range(args.count):
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    if not scope_controller.run_command(controller, command_args):
+                        raise SystemExit(f"{name} 执行失败")
+                timings.append(time.perf_counter() - start)
+            timings.sort()
+            print(f"{name:<18} {timings[len(timings) // 2] * 1000.0:7.2f}ms {len(timings) / sum(timings):8.1f} "
+                  f"{(dll.calls - calls) / args.count:11.1f}")
+    finally:
+        controller.close(quiet=True)
+
+
+if __name__ == "__main__":
+    main()
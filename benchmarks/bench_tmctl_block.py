@@ -0,0 +1,88 @@
+"""tmctl 块数据接收基准：用模拟 DLL (scope_tmctl_sim) 代替 tmctl.dll，经 tmctlLib 原有的 ctypes 封装
+(c_char 数组 from_buffer + byref) 接收大块数据，比较不同单次读取大小的吞吐与 DLL 调用次数。
+
+模拟 DLL 每次调用有固定开销 (--call-overhead，对应 USB 事务/驱动开销)，
+数据按 --bandwidth 的速率到达；两者都用忙等待模拟，不依赖真实设备或 Windows。
+
+    python benchmarks/bench_tmctl_block.py --size 16000000 --call-overhead 0.0002 --bandwidth 40e6
+"""
+import argparse
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import scope_tmctl_sim
+import scope_transport
+from scope_simulator import SimulatedScope
+from tmctl_lib import tmctlLib
+
+
+def simulated_tmctl(payload, overhead, bandwidth):
+    """挂接模拟 DLL 的 tmctlLib.TMCTL，:IMAGe:SEND? 返回 payload；返回 (tmctl, dll, device_id)"""
+    scope = SimulatedScope(responses={"IMAG:SEND": payload})
+    tmctl = scope_tmctl_sim.create_tmctl("", scope=scope)
+    tmctl.dll.overhead = overhead
+    tmctl.dll.bandwidth = bandwidth
+    _, device_id = tmctl.Initialize(tmctlLib.TM_CTL_USBTMC3, "")
+    return tmctl, tmctl.dll, device_id
+
+
+def legacy_loop(tmctl, device_id, block_size):
+    """原 yokogawa.py 截图路径 / Sample.py 的做法：固定小块，每块新建 bytearray 再拼接，
+    最后一次读取余数 + 1 字节结束符 (LF)"""
+    tmctl.Send(device_id, ":IMAGe:SEND?")
+    _, total_len = tmctl.ReceiveBlockHeader(device_id)
+    data = bytearray()
+    for size in [block_size] * (total_len // block_size) + [total_len % block_size + 1]:
+        buf = bytearray(size)
+        _, rlen, _ = tmctl.ReceiveBlockData(device_id, buf, size)
+        data += buf[:rlen]
+    return data[:total_len]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="tmctl 块数据接收基准 (模拟 DLL)")
+    parser.add_argument("--size", type=int, default=16_000_000, help="块数据体大小 (bytes, 默认 16 MB)")
+    parser.add_argument("--call-overhead", type=float, default=0.0002, help="每次 DLL 调用的固定开销 (秒, 默认 0.0002)")
+    parser.add_argument("--bandwidth", type=float, default=40e6, help="数据到达速率 (bytes/s, 默认 40e6)")
+    parser.add_argument("--transfers", type=int, default=3, help="自动调整时连续传输的次数 (默认 3)")
+    args = parser.parse_args()
+
+    payload = os.urandom(args.size)
+    tmctl, dll, device_id = simulated_tmctl(payload, args.call_overhead, args.bandwidth)
+    print(f"数据体: {args.size} bytes, 调用开销 {args.call_overhead * 1e6:.0f} us, 带宽 {args.bandwidth / 1e6:.0f} MB/s")
+    print(f"{'方式':<24} {'MB/s':>8} {'DLL 调用':>8}")
+
+    def report(name, elapsed):
+        print(f"{name:<24} {args.size / elapsed / 1e6:8.1f} {dll.calls:8d}")
+
+    for name, block_size in (("Sample.py 1000 B", 1000), ("旧截图循环 4 KiB", 4096)):
+        dll.calls = 0
+        start = time.perf_counter()
+        data = legacy_loop(tmctl, device_id, block_size)
+        report(name, time.perf_counter() - start)
+        if bytes(data) != payload:
+            raise SystemExit(f"{name} 接收数据不一致")
+
+    transport = scope_transport.TmctlTransport(tmctl, tmctlLib.TM_CTL_USBTMC3, "")
+    transport.device_id = device_id
+    for name, tuner in (("固定 1 MiB", None), ("自动调整", transport.tuner)):
+        transport.tuner = tuner
+        buffer = bytearray(args.size + 1)
+        for index in range(1 if tuner is None else args.transfers):
+            transport.write(":IMAGe:SEND?")
+            dll.calls = 0
+            start = time.perf_counter()
+            # 复用同一个接收缓冲区，重复传输不再分配内存
+            data = transport.read_block(buffer=buffer)
+            label = name if tuner is None else f"{name} 第 {index + 1} 次 ({tuner.size >> 10} KiB)"
+            report(label, time.perf_counter() - start)
+            if data != payload:
+                raise SystemExit(f"{name} 接收数据不一致")
+
+
+if __name__ == "__main__":
+    main()
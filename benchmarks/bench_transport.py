@@ -0,0 +1,160 @@
+"""各传输层的小查询延迟、批量查询吞吐与块数据吞吐基准，全部基于模拟器，无需实机。
+
+"批量" 一列为 query_many 连续执行 --batch 条互不依赖查询时的查询/s：HiSLIP overlapped 模式
+流水线发送，其余传输逐条往返。--rtt 模拟网络往返时延，流水线的收益随时延增大。
+
+    python benchmarks/bench_transport.py -n 200 --block-mb 8
+    python benchmarks/bench_transport.py --transports visa,socket --block-mb 32
+    python benchmarks/bench_transport.py --transports socket,hislip,hislip-sync --rtt 0.0005
+    python benchmarks/bench_transport.py --transports vxi11,socket,hislip --profile gbe
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import scope_logger
+import scope_transport
+from fake_scope import PROFILES, FakeHislipServer, FakeScopeServer, FakeVxi11Server
+from scope_simulator import SimulatedScope
+
+
+def make_sim(scope, rtt, bandwidth):
+    """进程内模拟器 (不模拟网络时延)"""
+    return scope_transport.SimulatorTransport(scope), None
+
+
+def make_visa(scope, rtt, bandwidth):
+    """pyvisa-py SOCKET 资源 -> 本地 TCP 假示波器"""
+    import pyvisa
+
+    server = FakeScopeServer(scope=scope, rtt=rtt, bandwidth=bandwidth).start()
+    return scope_transport.VisaTransport(pyvisa.ResourceManager("@py"), server.resource), server
+
+
+def make_vxi11(scope, rtt, bandwidth):
+    """pyvisa-py VXI-11 (TCPIP::host,port::inst0::INSTR) -> 本地 VXI-11 假示波器"""
+    import pyvisa
+
+    server = FakeVxi11Server(scope=scope, rtt=rtt, bandwidth=bandwidth).start()
+    return scope_transport.VisaTransport(pyvisa.ResourceManager("@py"), server.resource), server
+
+
+def make_socket(scope, rtt, bandwidth):
+    """原生 TCP Socket -> 本地 TCP 假示波器 (与仪器 Socket 命令端口协议相同)"""
+    server = FakeScopeServer(scope=scope, rtt=rtt, bandwidth=bandwidth).start()
+    host, port = server.server_address[:2]
+    return scope_transport.SocketTransport(host, port), server
+
+
+def make_hislip(scope, rtt, bandwidth):
+    """HiSLIP -> 本地 HiSLIP 假示波器 (overlapped 模式)"""
+    server = FakeHislipServer(scope=scope, rtt=rtt, bandwidth=bandwidth).start()
+    host, port = server.server_address[:2]
+    return scope_transport.HislipTransport(host, port), server
+
+
+def make_hislip_sync(scope, rtt, bandwidth):
+    """HiSLIP -> 只支持 synchronized 模式的假示波器 (query_many 退化为逐条往返)"""
+    server = FakeHislipServer(scope=scope, rtt=rtt, bandwidth=bandwidth, overlap=False).start()
+    host, port = server.server_address[:2]
+    return scope_transport.HislipTransport(host, port), server
+
+
+# 名称 -> 工厂函数 (scope, rtt, bandwidth) -> (transport, server 或 None)
+TRANSPORTS = {
+    "sim": make_sim,
+    "visa": make_visa,
+    "vxi11": make_vxi11,
+    "socket": make_socket,
+    "hislip": make_hislip,
+    "hislip-sync": make_hislip_sync,
+}
+
+BATCH_QUERY = ":MEAS:CHAN{}:AVER:VAL?"
+
+
+def bench_queries(transport, count):
+    """连续 count 次小查询，返回每次耗时 (秒)"""
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        transport.query(":MEAS:CHAN1:AVER:VAL?")
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def bench_batch(transport, batch, repeat):
+    """query_many 执行 batch 条查询，返回最快一次的查询/s"""
+    cmds = [BATCH_QUERY.format(i % 4 + 1) for i in range(batch)]
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        transport.query_many(cmds)
+        best = min(best, time.perf_counter() - start)
+    return batch / best
+
+
+def bench_block(transport, repeat):
+    """读取 repeat 次截图块数据，返回 (字节数, 最短耗时 秒)"""
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        transport.write(":IMAG:SEND?")
+        size = len(transport.read_block())
+        best = min(best, time.perf_counter() - start)
+    return size, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="传输层基准")
+    parser.add_argument("--transports", default=",".join(TRANSPORTS), help=f"逗号分隔 (可选: {', '.join(TRANSPORTS)})")
+    parser.add_argument("-n", "--count", type=int, default=200, help="小查询次数 (默认 200)")
+    parser.add_argument("--block-mb", type=float, default=8.0, help="块数据大小 (MB, 默认 8)")
+    parser.add_argument("--repeat", type=int, default=3, help="块数据读取次数，取最快一次 (默认 3)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="none",
+                        help="时序配置 (usb2 / gbe)，提供 --latency/--rtt/--bandwidth 的默认值 (默认 none)")
+    parser.add_argument("--latency", type=float, default=None, help="模拟器每条消息的应答延时 (秒)")
+    parser.add_argument("--rtt", type=float, default=None, help="模拟的网络往返时延 (秒, 默认 0)")
+    parser.add_argument("--bandwidth", type=float, default=None, help="模拟的链路带宽 (bytes/s, 默认不限)")
+    parser.add_argument("--batch", type=int, default=64, help="批量查询条数 (默认 64)")
+    args = parser.parse_args()
+    profile = PROFILES[args.profile]
+    latency = profile.latency if args.latency is None else args.latency
+    rtt = profile.rtt if args.rtt is None else args.rtt
+    bandwidth = profile.bandwidth if args.bandwidth is None else args.bandwidth
+
+    print(f"{'传输':<12} {'p50':>9} {'p95':>9} {'查询/s':>9} {'批量 查询/s':>12} {'块吞吐':>12}")
+    for name in args.transports.split(","):
+        name = name.strip()
+        if name not in TRANSPORTS:
+            parser.error(f"未知传输: {name}")
+        scope = SimulatedScope(latency=latency, image_size=int(args.block_mb * 1e6))
+        transport, server = TRANSPORTS[name](scope, rtt, bandwidth)
+        try:
+            transport.open()
+            timings = sorted(bench_queries(transport, args.count))
+            batch_qps = bench_batch(transport, args.batch, args.repeat)
+            size, block_time = bench_block(transport, args.repeat)
+        except Exception as e:
+            print(f"{name:<12} 失败: {e}")
+            continue
+        finally:
+            transport.close()
+            if server:
+                server.shutdown()
+
+        p50 = statistics.median(timings) * 1000.0
+        p95 = scope_logger.percentile(sorted(timings), 95) * 1000.0
+        qps = len(timings) / sum(timings)
+        print(f"{name:<12} {p50:7.3f}ms {p95:7.3f}ms {qps:9.0f} {batch_qps:12.0f} {size / block_time / 1e6:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""波形存储格式基准：CSV (sampleGetWaveform 逐点打印的文本)、float64 .npy (wave 的默认输出)、
+原始码值 .npy 与 .dlmwav (不压缩 / zlib / zstd，块内差分开关) 的文件大小、写入与完整读取的吞吐，
+以及从文件中随机读取一小段 (换算为电压) 的耗时。
+
+波形为模拟器的正弦加噪声：8 bit ADC 的量化 (WORD 码值为 128 的整数倍) 与 --noise 给出的噪声 (ADC LSB 的均方根)。
+
+    python benchmarks/bench_wavefile.py --points 2000000 -c 2 --noise 0.5
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import numpy as np
+
+import scope_wavefile
+import scope_waveform
+from scope_simulator import SimulatedScope
+
+# 8 bit ADC 一个 LSB 对应的 WORD 码值 (3200 / 25)
+ADC_STEP = 128
+PARAMETERS = (5.0, 0.0, 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="波形存储格式基准 (CSV / .npy / .dlmwav)")
+    parser.add_argument("--points", type=int, default=2_000_000, help="每个通道的点数 (默认 2000000)")
+    parser.add_argument("-c", "--channels", type=int, default=2, help="通道数 (默认 2)")
+    parser.add_argument("--noise", type=float, default=0.5, help="噪声均方根 (ADC LSB, 默认 0.5)")
+    parser.add_argument("--slices", type=int, default=200, help="随机读取的次数 (默认 200)")
+    parser.add_argument("--slice-points", type=int, default=10000, help="每次随机读取的点数 (默认 10000)")
+    args = parser.parse_args()
+
+    scope = SimulatedScope(record_length=args.points)
+    rng = np.random.default_rng(0)
+    channels = list(range(1, args.channels + 1))
+    codes = {}
+    for channel in channels:
+        clean = scope.waveform_codes(channel, 0, args.points - 1).astype(np.float64)
+        noisy = clean / ADC_STEP + rng.normal(0.0, args.noise, args.points)
+        codes[channel] = (np.clip(np.round(noisy), -127, 127) * ADC_STEP).astype("<i2")
+    parameters = {channel: PARAMETERS for channel in channels}
+    raw_bytes = sum(c.nbytes for c in codes.values())
+
+    def values_of(channel):
+        return scope_waveform.decode_waveform(codes[channel], "WORD", *PARAMETERS)
+
+    directory = tempfile.mkdtemp()
+    starts = rng.integers(0, args.points - args.slice_points, args.slices)
+
+    def csv_write(path):
+        scope_waveform.save_waveform(path, np.vstack([values_of(c) for c in channels]), 1.25e9, names=[f"CH{c}" for c in channels])
+
+    def csv_read(path):
+        return np.loadtxt(path, delimiter=",", skiprows=1)
+
+    def npy_write(path):
+        np.save(path, np.vstack([values_of(c) for c in channels]))
+
+    def npy_read(path):
+        return np.load(path)
+
+    def npy_slice(path, start):
+        return np.load(path, mmap_mode="r")[0, start:start + args.slice_points].copy()
+
+    def codes_write(path):
+        np.save(path, np.vstack([codes[c] for c in channels]))
+
+    def codes_read(path):
+        return scope_waveform.decode_waveform(np.load(path), "WORD", *PARAMETERS)
+
+    def codes_slice(path, start):
+        return scope_waveform.decode_waveform(np.load(path, mmap_mode="r")[0, start:start + args.slice_points].copy(), "WORD", *PARAMETERS)
+
+    def wavefile(codec, delta):
+        def write(path):
+            scope_wavefile.write_waveform_file(path, codes, "WORD", parameters, sample_rate=1.25e9, codec=codec, delta=delta)
+
+        def read(path):
+            with scope_wavefile.WaveformFile(path) as f:
+                return [f.read(channel) for channel in channels]
+
+        def read_slice(path, start, opened={}):
+            f = opened.get(path)
+            if f is None:
+                f = opened[path] = scope_wavefile.WaveformFile(path)
+            return f[1][start:start + args.slice_points]
+
+        return write, read, read_slice
+
+    cases = [
+        ("CSV", ".csv", csv_write, csv_read, None),
+        ("float64 .npy", ".npy", npy_write, npy_read, npy_slice),
+        ("码值 .npy", ".npy", codes_write, codes_read, codes_slice),
+    ]
+    codecs = ["none", "zlib"]
+    try:
+        import zstandard  # noqa: F401
+
+        codecs.append("zstd")
+    except ImportError:
+        print("未安装 zstandard，跳过 zstd")
+    for codec in codecs:
+        for delta in (False, True):
+            if codec == "none" and delta:
+                continue
+            cases.append((f".dlmwav {codec}{' +差分' if delta else ''}", ".dlmwav", *wavefile(codec, delta)))
+
+    print(f"{args.channels} 通道 × {args.points} 点 (原始码值 {raw_bytes / 1e6:.1f} MB), 噪声 {args.noise:g} LSB")
+    print(f"{'格式':<22} {'大小':>10} {'相对码值':>8} {'写入 MB/s':>10} {'读取 MB/s':>10} {'随机读取':>10}")
+    try:
+        for label, extension, write, read, read_slice in cases:
+            path = os.path.join(directory, "bench" + extension)
+            t0 = time.perf_counter()
+            write(path)
+            t1 = time.perf_counter()
+            read(path)
+            t2 = time.perf_counter()
+            size = os.path.getsize(path)
+            if read_slice is not None:
+                t3 = time.perf_counter()
+                for start in starts:
+                    read_slice(path, int(start))
+                slice_time = f"{(time.perf_counter() - t3) / args.slices * 1e3:8.3f}ms"
+            else:
+                slice_time = f"{'-':>10}"
+            # 吞吐均按原始码值的字节数计
+            print(f"{label:<22} {size / 1e6:8.2f}MB {size / raw_bytes:8.2f} {raw_bytes / (t1 - t0) / 1e6:10.1f} "
+                  f"{raw_bytes / (t2 - t1) / 1e6:10.1f} {slice_time}")
+            os.remove(path)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
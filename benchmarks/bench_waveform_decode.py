@@ -0,0 +1,58 @@
+"""对比 WORD 波形逐点解码 (sampleGetWaveform 的写法) 与 NumPy 向量化解码的吞吐量。
+
+    python benchmarks/bench_waveform_decode.py --points 12500000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scope_waveform
+
+
+def decode_loop(payload, vrange, offset, div=3200):
+    """tmctl_lib/Sample.py 中的逐点换算方式"""
+    values = []
+    for j in range(len(payload) // 2):
+        values.append(int.from_bytes(payload[2 * j:2 * j + 2], byteorder="little", signed=True) * (vrange / div) + offset)
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description="波形解码吞吐量基准")
+    parser.add_argument("--points", type=int, default=12_500_000, help="向量化解码的点数 (默认 12.5M)")
+    parser.add_argument("--loop-points", type=int, default=200_000, help="逐点解码的点数 (结果按比例外推)")
+    parser.add_argument("--repeat", type=int, default=5, help="向量化解码重复次数，取最好成绩")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    payload = rng.integers(-32768, 32767, size=args.points, dtype="<i2").tobytes()
+    size_mb = len(payload) / 1e6
+
+    best = float("inf")
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        values = scope_waveform.decode_waveform(payload, "WORD", 5.0, 0.1)
+        best = min(best, time.perf_counter() - start)
+
+    loop_payload = payload[:args.loop_points * 2]
+    start = time.perf_counter()
+    reference = decode_loop(loop_payload, 5.0, 0.1)
+    loop_time = time.perf_counter() - start
+    loop_rate = len(loop_payload) / 1e6 / loop_time
+
+    if not np.allclose(values[:len(reference)], reference):
+        raise SystemExit("向量化解码结果与逐点解码不一致")
+
+    print(f"数据量: {args.points} 点 ({size_mb:.1f} MB)")
+    print(f"numpy   : {best * 1000:9.2f} ms  {size_mb / best:9.1f} MB/s")
+    print(f"逐点循环: {size_mb / loop_rate * 1000:9.2f} ms  {loop_rate:9.1f} MB/s (按 {args.loop_points} 点外推)")
+    print(f"加速比  : {size_mb / loop_rate / best:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
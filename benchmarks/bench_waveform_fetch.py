@@ -0,0 +1,90 @@
+"""多通道波形读取基准：逐通道 :WAVeform:SEND? 循环 (sampleGetWaveform 的做法，每个通道都重新查询
+RANGe/OFFSet/POSition) 对比 :WAVeform:ALL:SEND? 一次块传输 + 换算参数缓存。
+
+经本地 TCP 假示波器 (Socket 传输) 运行，--rtt 模拟网络往返时延。
+
+    python benchmarks/bench_waveform_fetch.py -n 50 --rtt 0.0005
+"""
+import argparse
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import scope_controller
+import scope_waveform
+from fake_scope import FakeScopeServer
+from scope_simulator import SimulatedScope
+
+
+def fetch_per_trace(controller, channels):
+    """逐通道选择波形、查询换算参数、读取并解码"""
+    traces = {}
+    for channel in channels:
+        controller.send(f":WAVeform:TRACe {channel}")
+        vrange = float(controller.query(":WAVeform:RANGe?"))
+        offset = float(controller.query(":WAVeform:OFFSet?"))
+        position = float(controller.query(":WAVeform:POSition?"))
+        controller.send(":WAVeform:SEND?")
+        traces[channel] = scope_waveform.decode_waveform(controller.read_block(), "WORD", vrange, offset, position)
+    return traces
+
+
+def fetch_all(controller, channels):
+    """:WAVeform:ALL:SEND? 一次读取全部波形，换算参数走缓存"""
+    codes = controller.fetch_all_traces(channels)
+    return scope_waveform.decode_traces(codes, controller.waveform_parameters(channels))
+
+
+def bench(fetch, controller, channels, count):
+    """返回 (每次耗时列表 秒, 最后一次结果)"""
+    timings = []
+    result = None
+    for _ in range(count):
+        start = time.perf_counter()
+        result = fetch(controller, channels)
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多通道波形读取基准")
+    parser.add_argument("-n", "--count", type=int, default=50, help="读取次数 (默认 50)")
+    parser.add_argument("--rtt", type=float, default=0.0005, help="模拟的网络往返时延 (秒, 默认 0.0005)")
+    parser.add_argument("-c", "--channels", type=int, default=4, help="通道数 (默认 4)")
+    args = parser.parse_args()
+
+    channels = list(range(1, args.channels + 1))
+    server = FakeScopeServer(scope=SimulatedScope(), rtt=args.rtt).start()
+    host, port = server.server_address[:2]
+    controller = scope_controller.ScopeController(SimpleNamespace(transport="socket", ip=host, port=port))
+    try:
+        if not controller.connect(quiet=True):
+            raise SystemExit("连接假示波器失败")
+        controller.send(":COMMunicate:HEADer OFF")
+        controller.send(":WAVeform:FORMat WORD;:WAVeform:BYTeorder LSBFirst")
+
+        results = {}
+        print(f"{'方式':<20} {'p50':>9} {'次/s':>8}")
+        for name, fetch in (("逐通道 SEND?", fetch_per_trace), ("ALL:SEND? + 缓存", fetch_all)):
+            timings, results[name] = bench(fetch, controller, channels, args.count)
+            timings.sort()
+            print(f"{name:<20} {timings[len(timings) // 2] * 1000.0:7.2f}ms {len(timings) / sum(timings):8.1f}")
+
+        per_trace, bulk = results.values()
+        for channel in channels:
+            if not np.array_equal(per_trace[channel], bulk[channel]):
+                raise SystemExit(f"CH{channel} 两种方式的解码结果不一致")
+    finally:
+        controller.close(quiet=True)
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""分段波形传输基准：一次 :WAVeform:SEND? 取回整条记录 与 按 :WAVeform:STARt/END 分段写入内存映射 .npy
+(不同窗口大小与自动调整) 的吞吐和 Python 堆峰值，验证分段传输的内存占用与记录长度无关。
+
+假示波器在子进程中运行 (不计入本进程的堆)，--profile 模拟链路时序。
+
+    python benchmarks/bench_window.py --lengths 2000000 20000000 --windows 0 262144 1048576 4194304 --profile gbe
+"""
+import argparse
+import contextlib
+import io
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import numpy as np
+
+import scope_chunked
+import scope_controller
+import scope_waveform
+from fake_scope import PROFILES
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分段波形传输基准 (整条 / 分段)")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[2_000_000, 20_000_000], help="记录长度 (点, 默认 2M 20M)")
+    parser.add_argument("--windows", type=int, nargs="+", default=[0, 262144, 1048576, 4194304],
+                        help="窗口点数 (0 为自动调整, 默认 0 262144 1048576 4194304)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="gbe", help="链路时序配置 (默认 gbe)")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    print(f"{'记录长度':>10} {'方式':<16} {'MB/s':>8} {'用时':>9} {'堆峰值':>10}")
+    for length in args.lengths:
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(BENCH_DIR, "fake_scope.py"), "--port", str(port),
+             "--record-length", str(length), "--profile", args.profile],
+            stdout=subprocess.PIPE, text=True,
+        )
+        controller = None
+        try:
+            server.stdout.readline()
+            controller = scope_controller.ScopeController(SimpleNamespace(transport="socket", ip="127.0.0.1", port=port))
+            if not controller.connect(quiet=True):
+                raise SystemExit("连接假示波器失败")
+            controller.sync(":COMMunicate:HEADer OFF", ":STOP")
+            controller.send(":WAVeform:FORMat WORD;:WAVeform:BYTeorder LSBFirst;:WAVeform:RECord 0")
+            parameters = controller.waveform_parameters([1])
+            identity = {"channels": [1], "record": 0, "start": 0, "end": length - 1, "format": "WORD",
+                        "stamp": controller.query(":HISTory:TIME? 0"), "sample_rate": 1.25e9,
+                        "parameters": [list(parameters[1])]}
+
+            def single(path):
+                controller.send(f":WAVeform:TRACe 1;:WAVeform:STARt 0;:WAVeform:END {length - 1};:WAVeform:SEND?")
+                payload = controller.read_block()
+                vrange, offset, position = parameters[1]
+                np.save(path, scope_waveform.decode_waveform(payload, "WORD", vrange, offset, position))
+                return True
+
+            cases = [("整条 SEND?", single)]
+            for window in args.windows:
+                label = "分段 自动" if window == 0 else f"分段 {window}"
+                cases.append((label, lambda path, window=window: scope_chunked.run_windowed_download(
+                    controller, [1], path, identity, parameters, "WORD", window)))
+
+            for label, run in cases:
+                path = os.path.join(directory, "bench.npy")
+                tracemalloc.start()
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    ok = run(path)
+                elapsed = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                os.remove(path)
+                if not ok:
+                    raise SystemExit(f"{label} 传输失败")
+                print(f"{length:>10} {label:<16} {length * 2 / elapsed / 1e6:8.1f} {elapsed:8.3f}s {peak / 1e6:8.2f}MB")
+        finally:
+            if controller is not None:
+                controller.close(quiet=True)
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
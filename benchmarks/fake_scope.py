@@ -0,0 +1,503 @@
+"""本地假示波器：在 TCP 端口上应答 DLM 常用 SCPI 指令，用于无实机的联调与基准测试。
+
+pyvisa 可通过 TCPIP::127.0.0.1::<port>::SOCKET 资源连接；每条程序消息以 LF 结尾，
+多条指令可用 ';' 拼接，查询结果同样以 ';' 拼接后返回。
+
+FakeHislipServer 以同一个模拟器应答 HiSLIP (IVI-6.1) 会话，默认工作在 overlapped 模式，
+模拟器的 RQS 置位时在异步通道上发送 AsyncServiceRequest；
+FakeVxi11Server 应答 VXI-11 (ONC RPC) 核心通道，pyvisa-py 可通过 TCPIP::127.0.0.1,<port>::inst0::INSTR
+直接连接 (跳过 portmapper)，以 root 运行时也可用 --portmapper 在 111 端口应答 portmapper 查询。
+
+所有服务器都可以用 rtt 模拟网络往返时延、用 bandwidth 模拟链路带宽：应答在收到请求 rtt 秒之后
+按带宽依次发出，但不阻塞后续请求的处理，与真实链路上的传播/传输延迟一致。
+PROFILES 给出 USB2 / 1 GbE 连接 DLM3000 的典型时序 (数量级近似，用于回归比较，不代表实测值)。
+"""
+import argparse
+import heapq
+import os
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scope_hislip
+import scope_status
+from scope_simulator import DEFAULT_SERIAL, SimulatedScope
+
+# 兼容现有基准脚本中的名称
+FakeScope = SimulatedScope
+
+# 时序参数: rtt (往返时延, 秒)、bandwidth (链路带宽, bytes/s, 0 为不限)、latency (仪器处理每条程序消息的时间, 秒)
+TimingProfile = namedtuple("TimingProfile", ["rtt", "bandwidth", "latency"])
+PROFILES = {
+    "none": TimingProfile(0.0, 0.0, 0.0),
+    # USB 2.0 High-Speed USBTMC: 微帧 125 us，批量传输有效带宽约 30 MB/s
+    "usb2": TimingProfile(0.00025, 30e6, 0.0005),
+    # 1000BASE-T 局域网: 往返约 0.2 ms，TCP 有效带宽约 110 MB/s
+    "gbe": TimingProfile(0.0002, 110e6, 0.0005),
+}
+
+
+class _DelayedWriter:
+    """按 "到达时刻 + rtt" 发送应答的后台写线程，bandwidth 非零时应答按链路带宽依次占用传输时间；
+    rtt 与 bandwidth 都为 0 时直接写出"""
+
+    def __init__(self, write, rtt, bandwidth=0.0):
+        self.write = write
+        self.rtt = rtt
+        self.bandwidth = bandwidth
+        self.pending = []
+        self.sequence = 0
+        # 链路空闲的时刻：前一个应答传输完毕之前，后一个应答不能开始传输
+        self.link_free = 0.0
+        self.condition = threading.Condition()
+        if rtt > 0 or bandwidth > 0:
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def send(self, arrival, data):
+        if self.rtt <= 0 and self.bandwidth <= 0:
+            self.write(data)
+            return
+        with self.condition:
+            due = arrival + self.rtt
+            if self.bandwidth > 0:
+                due = max(due, self.link_free) + len(data) / self.bandwidth
+                self.link_free = due
+            heapq.heappush(self.pending, (due, self.sequence, data))
+            self.sequence += 1
+            self.condition.notify()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                due, _, data = self.pending[0]
+                wait = due - time.perf_counter()
+                if wait > 0:
+                    self.condition.wait(wait)
+                    continue
+                heapq.heappop(self.pending)
+            try:
+                self.write(data)
+            except (OSError, ValueError):
+                # 客户端已断开 (连接关闭后 wfile 也已关闭)
+                return
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        scope = self.server.scope
+
+        def write(data):
+            self.wfile.write(data)
+            self.wfile.flush()
+
+        writer = _DelayedWriter(write, self.server.rtt, self.server.bandwidth)
+        for line in self.rfile:
+            arrival = time.perf_counter()
+            message = line.decode("ascii", "replace").strip()
+            if not message:
+                continue
+            response = scope.process(message)
+            if response is not None:
+                writer.send(arrival, response)
+
+
+class FakeScopeServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=("127.0.0.1", 0), scope=None, rtt=0.0, bandwidth=0.0):
+        self.scope = scope or SimulatedScope()
+        self.rtt = rtt
+        self.bandwidth = bandwidth
+        super().__init__(address, _Handler)
+
+    @property
+    def resource(self):
+        host, port = self.server_address[:2]
+        return f"TCPIP::{host}::{port}::SOCKET"
+
+    def start(self):
+        """在后台线程中运行，返回自身便于链式调用"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+class _HislipHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        sock = self.request
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            message_type, _, parameter, _ = scope_hislip.recv_message(sock)
+        except (ConnectionError, OSError):
+            return
+        if message_type == scope_hislip.INITIALIZE:
+            self._sync_channel(sock)
+        elif message_type == scope_hislip.ASYNC_INITIALIZE:
+            self._async_channel(sock)
+
+    def _sync_channel(self, sock):
+        server = self.server
+        session_id = server.next_session_id()
+        control = scope_hislip.OVERLAP_MODE if server.overlap else 0
+        sock.sendall(scope_hislip.pack_message(
+            scope_hislip.INITIALIZE_RESPONSE, control, (scope_hislip.PROTOCOL_VERSION << 16) | session_id
+        ))
+
+        writer = _DelayedWriter(sock.sendall, server.rtt, server.bandwidth)
+        message = bytearray()
+        while True:
+            try:
+                message_type, _, message_id, payload = scope_hislip.recv_message(sock)
+            except (ConnectionError, OSError):
+                return
+            arrival = time.perf_counter()
+            if message_type not in (scope_hislip.DATA, scope_hislip.DATA_END):
+                continue
+            message += payload
+            if message_type == scope_hislip.DATA:
+                continue
+            response = server.scope.process(message.decode("ascii", "replace").strip())
+            message.clear()
+            if response is not None:
+                writer.send(arrival, scope_hislip.pack_message(scope_hislip.DATA_END, 0, message_id, response))
+
+    def _async_channel(self, sock):
+        sock.sendall(scope_hislip.pack_message(
+            scope_hislip.ASYNC_INITIALIZE_RESPONSE, 0, int.from_bytes(scope_hislip.VENDOR_ID, "big")
+        ))
+        # 服务请求线程与应答共用异步通道，发送时加锁
+        lock = threading.Lock()
+        closed = threading.Event()
+        threading.Thread(target=self._service_requests, args=(sock, lock, closed), daemon=True).start()
+        try:
+            while True:
+                try:
+                    message_type, _, _, payload = scope_hislip.recv_message(sock)
+                except (ConnectionError, OSError):
+                    return
+                with lock:
+                    if message_type == scope_hislip.ASYNC_MAXIMUM_MESSAGE_SIZE:
+                        sock.sendall(scope_hislip.pack_message(
+                            scope_hislip.ASYNC_MAXIMUM_MESSAGE_SIZE_RESPONSE, 0, 0, (1 << 32).to_bytes(8, "big")
+                        ))
+                    elif message_type == scope_hislip.ASYNC_DEVICE_CLEAR:
+                        sock.sendall(scope_hislip.pack_message(scope_hislip.ASYNC_DEVICE_CLEAR_ACKNOWLEDGE, 0))
+        finally:
+            closed.set()
+
+    def _service_requests(self, sock, lock, closed):
+        """RQS 置位时发送一次 AsyncServiceRequest (控制码为状态字节，经过 rtt/2 的单程时延)，清除后才会再次发送"""
+        scope = self.server.scope
+        while not closed.is_set():
+            stb = scope.wait_rqs(True, 0.5)
+            if not stb & scope_status.STB_RQS:
+                continue
+            if self.server.rtt:
+                time.sleep(self.server.rtt / 2)
+            try:
+                with lock:
+                    sock.sendall(scope_hislip.pack_message(scope_hislip.ASYNC_SERVICE_REQUEST, stb))
+            except OSError:
+                return
+            while not closed.is_set() and scope.wait_rqs(False, 0.5) & scope_status.STB_RQS:
+                pass
+
+
+class FakeHislipServer(socketserver.ThreadingTCPServer):
+    """HiSLIP 版本的假示波器，overlap=False 时模拟只支持 synchronized 模式的仪器"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=("127.0.0.1", 0), scope=None, rtt=0.0, overlap=True, bandwidth=0.0):
+        self.scope = scope or SimulatedScope()
+        self.rtt = rtt
+        self.bandwidth = bandwidth
+        self.overlap = overlap
+        self.session_id = 0
+        self.lock = threading.Lock()
+        super().__init__(address, _HislipHandler)
+
+    def next_session_id(self):
+        with self.lock:
+            self.session_id = (self.session_id + 1) & 0xFFFF
+            return self.session_id
+
+    @property
+    def resource(self):
+        host, port = self.server_address[:2]
+        return f"TCPIP::{host}::hislip0,{port}::INSTR"
+
+    def start(self):
+        """在后台线程中运行，返回自身便于链式调用"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+# --- VXI-11: ONC RPC (RFC 5531) over TCP，记录标记分片，参数/结果为 XDR 编码 ---
+RPC_REPLY = 1
+RPC_PROG_UNAVAIL = 1
+RPC_PROC_UNAVAIL = 3
+PMAP_PROG = 100000
+PMAP_GETPORT = 3
+VXI11_CORE_PROG = 0x0607AF
+VXI11_CREATE_LINK = 10
+VXI11_DEVICE_WRITE = 11
+VXI11_DEVICE_READ = 12
+VXI11_DEVICE_READSTB = 13
+VXI11_DEVICE_CLEAR = 15
+VXI11_DEVICE_DOCMD = 22
+VXI11_DESTROY_LINK = 23
+# 其余只需应答 "无错误" 的过程: trigger/remote/local/lock/unlock/enable_srq/create_intr_chan/destroy_intr_chan
+VXI11_NOOP_PROCS = (14, 16, 17, 18, 19, 20, 25, 26)
+VXI11_OPERATION_NOT_SUPPORTED = 8
+VXI11_IO_TIMEOUT = 15
+VXI11_FLAG_END = 8
+VXI11_FLAG_TERMCHAR = 128
+VXI11_RX_REQCNT = 1
+VXI11_RX_CHR = 2
+VXI11_RX_END = 4
+# 单次 device_write 接受的最大数据量 (客户端据此分段发送)
+VXI11_MAX_RECV_SIZE = 1 << 20
+
+
+class _XdrReader:
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def uint(self):
+        value, = struct.unpack_from(">I", self.data, self.pos)
+        self.pos += 4
+        return value
+
+    def int(self):
+        value, = struct.unpack_from(">i", self.data, self.pos)
+        self.pos += 4
+        return value
+
+    def opaque(self):
+        length = self.uint()
+        value = self.data[self.pos:self.pos + length]
+        self.pos += (length + 3) & ~3
+        return value
+
+
+def _xdr_opaque(data):
+    return struct.pack(">I", len(data)) + bytes(data) + b"\0" * (-len(data) % 4)
+
+
+def _recv_record(rfile):
+    """读取一条 RPC 记录 (可能由多个分片组成)，连接关闭时返回 None"""
+    record = bytearray()
+    while True:
+        header = rfile.read(4)
+        if len(header) < 4:
+            return None
+        marker, = struct.unpack(">I", header)
+        fragment = rfile.read(marker & 0x7FFFFFFF)
+        record += fragment
+        if marker & 0x80000000:
+            return bytes(record)
+
+
+def _rpc_reply(xid, body, accept_stat=0):
+    """已接受 (MSG_ACCEPTED, AUTH_NULL) 的应答，封装为单个分片的记录"""
+    reply = struct.pack(">IIIIII", xid, RPC_REPLY, 0, 0, 0, accept_stat) + body
+    return struct.pack(">I", 0x80000000 | len(reply)) + reply
+
+
+class _Vxi11Handler(socketserver.StreamRequestHandler):
+    """VXI-11 核心通道 (同一连接上的所有 link 共用一个模拟器会话)，也应答 portmapper GETPORT"""
+
+    def handle(self):
+        server = self.server
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def write(data):
+            self.wfile.write(data)
+            self.wfile.flush()
+
+        writer = _DelayedWriter(write, server.rtt, server.bandwidth)
+        self.message = bytearray()
+        self.output = bytearray()
+        while True:
+            record = _recv_record(self.rfile)
+            if record is None:
+                return
+            arrival = time.perf_counter()
+            call = _XdrReader(record)
+            xid, _, _, prog, _, proc = (call.uint() for _ in range(6))
+            # 跳过认证 (cred) 与校验 (verf)
+            for _ in range(2):
+                call.uint()
+                call.opaque()
+            if prog == VXI11_CORE_PROG:
+                body = self._core(proc, call)
+            elif prog == PMAP_PROG:
+                body = self._portmap(proc, call)
+            else:
+                writer.send(arrival, _rpc_reply(xid, b"", RPC_PROG_UNAVAIL))
+                continue
+            if body is None:
+                writer.send(arrival, _rpc_reply(xid, b"", RPC_PROC_UNAVAIL))
+            else:
+                writer.send(arrival, _rpc_reply(xid, body))
+
+    def _portmap(self, proc, call):
+        if proc == 0:
+            return b""
+        if proc == PMAP_GETPORT:
+            prog = call.uint()
+            return struct.pack(">I", self.server.core_port if prog == VXI11_CORE_PROG else 0)
+        return None
+
+    def _core(self, proc, call):
+        if proc == VXI11_CREATE_LINK:
+            # 应答: error, lid, abortPort, maxRecvSize
+            return struct.pack(">iiII", 0, self.server.next_link_id(), 0, VXI11_MAX_RECV_SIZE)
+        if proc == VXI11_DEVICE_WRITE:
+            call.int()  # lid
+            call.uint()  # io_timeout
+            call.uint()  # lock_timeout
+            flags = call.int()
+            data = call.opaque()
+            self.message += data
+            if flags & VXI11_FLAG_END:
+                message = self.message.decode("ascii", "replace").strip()
+                self.message.clear()
+                response = self.server.scope.process(message) if message else None
+                if response is not None:
+                    self.output += response
+            return struct.pack(">iI", 0, len(data))
+        if proc == VXI11_DEVICE_READ:
+            call.int()  # lid
+            request_size = call.uint()
+            call.uint()  # io_timeout
+            call.uint()  # lock_timeout
+            flags = call.int()
+            term_char = call.int() & 0xFF
+            if not self.output:
+                return struct.pack(">ii", VXI11_IO_TIMEOUT, 0) + _xdr_opaque(b"")
+            count = min(request_size, len(self.output))
+            reason = 0
+            if flags & VXI11_FLAG_TERMCHAR:
+                index = self.output.find(bytes([term_char]), 0, count)
+                if index >= 0:
+                    count = index + 1
+                    reason |= VXI11_RX_CHR
+            data = bytes(self.output[:count])
+            del self.output[:count]
+            if not self.output:
+                reason |= VXI11_RX_END
+            elif count == request_size:
+                reason |= VXI11_RX_REQCNT
+            return struct.pack(">ii", 0, reason) + _xdr_opaque(data)
+        if proc == VXI11_DEVICE_READSTB:
+            # 模拟器的状态字节，输出队列中有应答时加上 MAV
+            stb = self.server.scope.status_byte() | (scope_status.STB_MAV if self.output else 0)
+            return struct.pack(">iI", 0, stb)
+        if proc == VXI11_DEVICE_CLEAR:
+            self.message.clear()
+            self.output.clear()
+            return struct.pack(">i", 0)
+        if proc == VXI11_DESTROY_LINK or proc in VXI11_NOOP_PROCS:
+            return struct.pack(">i", 0)
+        if proc == VXI11_DEVICE_DOCMD:
+            return struct.pack(">i", VXI11_OPERATION_NOT_SUPPORTED) + _xdr_opaque(b"")
+        return None
+
+
+class FakeVxi11Server(socketserver.ThreadingTCPServer):
+    """VXI-11 版本的假示波器
+
+    core_port 非空时作为 portmapper 运行 (一般监听 111 端口)，GETPORT 返回 core_port；
+    否则 GETPORT 返回自身端口，因此同一个实例也可以直接充当 portmapper。
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=("127.0.0.1", 0), scope=None, rtt=0.0, bandwidth=0.0, core_port=None):
+        self.scope = scope or SimulatedScope()
+        self.rtt = rtt
+        self.bandwidth = bandwidth
+        self.link_id = 0
+        self.lock = threading.Lock()
+        super().__init__(address, _Vxi11Handler)
+        self.core_port = core_port or self.server_address[1]
+
+    def next_link_id(self):
+        with self.lock:
+            self.link_id += 1
+            return self.link_id
+
+    @property
+    def resource(self):
+        host, port = self.server_address[:2]
+        return f"TCPIP::{host},{port}::inst0::INSTR"
+
+    def start(self):
+        """在后台线程中运行，返回自身便于链式调用"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地假示波器 (SCPI over TCP / HiSLIP / VXI-11)")
+    parser.add_argument("--port", type=int, default=None, help="监听端口 (默认 5025，--hislip 时为 4880，--vxi11 时为 1024)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="none",
+                        help="时序配置: usb2 / gbe 模拟对应链路的往返时延、带宽与仪器处理时间 (默认 none)")
+    parser.add_argument("--latency", type=float, default=None, help="每条程序消息的应答延时 (秒, 覆盖 --profile)")
+    parser.add_argument("--record-length", type=int, default=12500, help="波形记录长度 (点, 默认 12500)")
+    parser.add_argument("--serial", default=DEFAULT_SERIAL, help=f"*IDN? 应答中的序列号 (默认 {DEFAULT_SERIAL})")
+    parser.add_argument("--rtt", type=float, default=None, help="模拟的网络往返时延 (秒, 覆盖 --profile)")
+    parser.add_argument("--bandwidth", type=float, default=None, help="模拟的链路带宽 (bytes/s, 覆盖 --profile)")
+    protocol = parser.add_mutually_exclusive_group()
+    protocol.add_argument("--hislip", action="store_true", help="以 HiSLIP 协议应答 (默认端口改为 4880)")
+    protocol.add_argument("--vxi11", action="store_true", help="以 VXI-11 协议应答 (默认端口改为 1024)")
+    parser.add_argument("--portmapper", action="store_true", help="--vxi11 时同时在 111 端口应答 portmapper (需要 root)")
+    args = parser.parse_args()
+
+    profile = PROFILES[args.profile]
+    rtt = profile.rtt if args.rtt is None else args.rtt
+    bandwidth = profile.bandwidth if args.bandwidth is None else args.bandwidth
+    latency = profile.latency if args.latency is None else args.latency
+
+    scope = SimulatedScope(latency=latency, record_length=args.record_length, serial=args.serial)
+    portmapper = None
+    if args.hislip:
+        server = FakeHislipServer(("127.0.0.1", args.port or scope_hislip.HISLIP_PORT), scope, rtt=rtt, bandwidth=bandwidth)
+    elif args.vxi11:
+        server = FakeVxi11Server(("127.0.0.1", args.port or 1024), scope, rtt=rtt, bandwidth=bandwidth)
+        if args.portmapper:
+            portmapper = FakeVxi11Server(("127.0.0.1", 111), scope, core_port=server.server_address[1]).start()
+    else:
+        server = FakeScopeServer(("127.0.0.1", args.port or 5025), scope, rtt=rtt, bandwidth=bandwidth)
+    print(f"假示波器已启动: {server.resource} (时序: {args.profile})")
+    if portmapper:
+        print("portmapper 已启动: 127.0.0.1:111 (可使用 TCPIP::127.0.0.1::INSTR)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if portmapper:
+            portmapper.shutdown()
+            portmapper.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""主机端测量：从 :WAVeform:SEND? 的原始码值直接计算测量值，所有通道、所有测量项一次完成，可指定多个门控区间。
+
+幅值类 (平均值、RMS、标准差、最大/最小、峰峰值) 由码值的一、二阶矩与极值换算，按块处理，内存占用与记录长度无关；
+时间类 (频率、周期、上升/下降时间、占空比) 以最大/最小值之间 10%/50%/90% 电平 (近端/中间/远端，同仪器的 MaxMin 模式)
+检测边沿：越过 90% 之前须先低于 10% (迟滞)，边沿时刻在相邻两点间线性插值。
+"""
+import numpy as np
+
+import scope_waveform
+
+# 主机端支持的测量项 (标准助记符，同 scope_measure.MEASURE_PARAMETERS)
+HOST_PARAMETERS = (
+    "AVERage", "RMS", "SDEViation", "MAXimum", "MINimum", "PTOPeak",
+    "FREQuency", "PERiod", "RISE", "FALL", "DUTYcycle",
+)
+# 近端/中间/远端电平 (相对最小值到最大值的比例)
+PROXIMAL = 0.1
+MESIAL = 0.5
+DISTAL = 0.9
+# 计算矩时每块每个通道的点数 (码值按块转换为 float64)；块保持在 CPU 缓存内，过大时多通道反而变慢
+BLOCK_POINTS = 1 << 16
+
+
+def parse_gate(text):
+    """门控区间 "START:END" (数据点，左闭右开；END 省略表示到记录末尾) -> (start, end 或 None)"""
+    start, separator, end = text.partition(":")
+    if not separator:
+        raise ValueError(f"门控区间格式应为 START:END: {text}")
+    start = int(start) if start.strip() else 0
+    end = int(end) if end.strip() else None
+    if start < 0 or (end is not None and end <= start):
+        raise ValueError(f"门控区间无效: {text}")
+    return start, end
+
+
+def gate_label(gate):
+    start, end = gate
+    return f"{start}:{'' if end is None else end}"
+
+
+def check_parameters(parameters):
+    """主机端不支持的测量项抛出 ValueError"""
+    unsupported = [parameter for parameter in parameters if parameter not in HOST_PARAMETERS]
+    if unsupported:
+        raise ValueError(f"主机端不支持的测量项: {', '.join(unsupported)} (支持: {', '.join(HOST_PARAMETERS)})")
+
+
+def _moments(codes):
+    """各行码值的 (和, 平方和, 最小值, 最大值)，按块转换为 float64 避免整条记录的临时数组"""
+    rows, points = codes.shape
+    sums = np.zeros(rows)
+    squares = np.zeros(rows)
+    lows = np.full(rows, np.inf)
+    highs = np.full(rows, -np.inf)
+    for first in range(0, points, BLOCK_POINTS):
+        block = codes[:, first:first + BLOCK_POINTS]
+        values = block.astype(np.float64)
+        sums += values.sum(axis=1)
+        squares += np.einsum("ij,ij->i", values, values)
+        np.minimum(lows, block.min(axis=1), out=lows)
+        np.maximum(highs, block.max(axis=1), out=highs)
+    return sums, squares, lows, highs
+
+
+def _crossings(codes, levels):
+    """码值越过各电平 (升序) 的位置：返回 [(上升, 下降), ...]，均为越过后第一个点的下标
+
+    先把每个点归入电平之间的区间 (0..len(levels))，只做一次差分与 flatnonzero，再按前后区间分到各电平。
+    """
+    state = (codes >= levels[0]).view(np.int8).copy()
+    for level in levels[1:]:
+        state += (codes >= level).view(np.int8)
+    positions = np.flatnonzero(np.diff(state))
+    before = state[positions]
+    after = state[positions + 1]
+    positions += 1
+    return [
+        (positions[(before < k) & (after >= k)], positions[(before >= k) & (after < k)])
+        for k in range(1, len(levels) + 1)
+    ]
+
+
+def _interpolate(codes, index, level):
+    """index - 1 与 index 两点之间越过 level 的插值位置 (点)"""
+    before = codes[index - 1].astype(np.float64)
+    after = codes[index].astype(np.float64)
+    return index - 1 + (level - before) / (after - before)
+
+
+def _last_before(crossings, index):
+    """每个 index 之前 (含) 最近一次 crossings 的下标"""
+    return crossings[np.searchsorted(crossings, index, side="right") - 1]
+
+
+def _timing(codes, low, high):
+    """单个通道的 (周期, 上升时间, 下降时间, 正脉宽) (单位: 点)，无法测得时为 NaN"""
+    nan = float("nan")
+    if high <= low:
+        return nan, nan, nan, nan
+    proximal = low + (high - low) * PROXIMAL
+    mesial = low + (high - low) * MESIAL
+    distal = low + (high - low) * DISTAL
+    (proximal_up, proximal_down), (mesial_up, mesial_down), (distal_up, distal_down) = _crossings(
+        codes, (proximal, mesial, distal)
+    )
+
+    # 迟滞：上升沿 = 之前最近的事件是低于近端电平的越过远端电平；下降沿反之
+    events = np.concatenate([distal_up, proximal_down])
+    kinds = np.concatenate([np.ones(len(distal_up), np.int8), -np.ones(len(proximal_down), np.int8)])
+    order = np.argsort(events, kind="stable")
+    events, kinds = events[order], kinds[order]
+    keep = np.ones(len(kinds), dtype=bool)
+    keep[1:] = kinds[1:] != kinds[:-1]
+    # 第一个事件之前的状态由第一个点决定 (位于两电平之间时不计入第一个事件)
+    if len(kinds) and not (codes[0] < proximal if kinds[0] > 0 else codes[0] >= distal):
+        keep[0] = False
+    rising = events[keep & (kinds > 0)]
+    falling = events[keep & (kinds < 0)]
+    # 边沿之前须有对应的近端/远端与中间电平越过 (记录开头已在两电平之间的边沿不完整)
+    if len(rising):
+        rising = rising[rising > (proximal_up[0] if len(proximal_up) else len(codes))]
+    if len(falling):
+        falling = falling[falling > (distal_down[0] if len(distal_down) else len(codes))]
+
+    period = rise = fall = width = nan
+    if len(rising):
+        rise_end = _interpolate(codes, rising, distal)
+        rise_start = _interpolate(codes, _last_before(proximal_up, rising), proximal)
+        rise = float(np.mean(rise_end - rise_start))
+        rise_mid = _interpolate(codes, _last_before(mesial_up, rising), mesial)
+        if len(rising) > 1:
+            period = float((rise_mid[-1] - rise_mid[0]) / (len(rising) - 1))
+    if len(falling):
+        fall_end = _interpolate(codes, falling, proximal)
+        fall_start = _interpolate(codes, _last_before(distal_down, falling), distal)
+        fall = float(np.mean(fall_end - fall_start))
+        if len(rising):
+            # 每个上升沿与其后第一个下降沿组成一个正脉冲
+            fall_mid = _interpolate(codes, _last_before(mesial_down, falling), mesial)
+            following = np.searchsorted(falling, rising)
+            paired = following < len(falling)
+            if paired.any():
+                width = float(np.mean(fall_mid[following[paired]] - rise_mid[paired]))
+    return period, rise, fall, width
+
+
+def analyze(codes, conversions, sample_rate, fmt="WORD", gates=None, parameters=HOST_PARAMETERS):
+    """计算测量值
+
+    codes 为 (通道数, 点数) 的码值数组 (或一维单通道)，conversions 为每行的 (range, offset, position)；
+    gates 为 [(start, end), ...] 门控区间 (end 为 None 表示到记录末尾)，None 时为整条记录。
+    返回 {测量项: ndarray (门控区间数, 通道数)}，无法测得的值为 NaN。
+    """
+    check_parameters(parameters)
+    codes = np.atleast_2d(codes)
+    rows, points = codes.shape
+    gates = gates or [(0, None)]
+    division = scope_waveform.WAVEFORM_DIVISION[fmt]
+    scales = np.array([conversion[0] for conversion in conversions], dtype=np.float64) / division
+    offsets = np.array([conversion[1] for conversion in conversions], dtype=np.float64)
+    # 只有 RBYTE 的码值需要减去 position
+    positions = np.array([conversion[2] if fmt == "RBYTE" else 0.0 for conversion in conversions], dtype=np.float64)
+    timing = any(parameter in ("FREQuency", "PERiod", "RISE", "FALL", "DUTYcycle") for parameter in parameters)
+
+    results = {parameter: np.full((len(gates), rows), np.nan) for parameter in parameters}
+    for row_index, (start, end) in enumerate(gates):
+        window = codes[:, start:points if end is None else min(end, points)]
+        count = window.shape[1]
+        if count == 0:
+            continue
+        sums, squares, lows, highs = _moments(window)
+        mean = sums / count
+        # 码值减去 position 后的一、二阶矩
+        centered_mean = mean - positions
+        centered_square = squares / count - 2.0 * positions * mean + positions ** 2
+        variance = np.maximum(squares / count - mean ** 2, 0.0)
+        values = {
+            "AVERage": scales * centered_mean + offsets,
+            "RMS": np.sqrt(np.maximum(
+                scales ** 2 * centered_square + 2.0 * scales * offsets * centered_mean + offsets ** 2, 0.0)),
+            "SDEViation": scales * np.sqrt(variance),
+            "MAXimum": scales * (highs - positions) + offsets,
+            "MINimum": scales * (lows - positions) + offsets,
+            "PTOPeak": scales * (highs - lows),
+        }
+        if timing:
+            measured = np.array([_timing(window[row], lows[row], highs[row]) for row in range(rows)])
+            period, rise, fall, width = (measured[:, column] for column in range(4))
+            values.update({
+                "PERiod": period / sample_rate,
+                "FREQuency": sample_rate / period,
+                "RISE": rise / sample_rate,
+                "FALL": fall / sample_rate,
+                "DUTYcycle": 100.0 * width / period,
+            })
+        for parameter in parameters:
+            results[parameter][row_index] = values[parameter]
+    return results
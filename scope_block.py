@@ -0,0 +1,106 @@
+# IEEE 488.2 定长块数据 (#N<len><data>) 的接收工具，截图/波形等二进制传输共用
+
+import time
+
+# 单次底层读取的默认大小；缓冲区本身按数据总长一次性分配
+DEFAULT_CHUNK_SIZE = 1 << 20
+# 自动调整单次读取大小时的起点与上限 (tmctl ReceiveBlockData / VISA read 每次调用都有固定开销)
+TUNER_INITIAL_SIZE = 64 << 10
+TUNER_MAX_SIZE = 16 << 20
+# 吞吐提升低于该比例时认为已到最佳读取大小
+TUNER_MIN_GAIN = 1.02
+# 单次读取预计耗时不超过超时时间的该比例，避免为了吞吐把单次读取放大到接近超时
+TUNER_TIMEOUT_FRACTION = 0.25
+
+
+def parse_block_header(data):
+    """解析 IEEE 488.2 定长块数据头 (#N<len>)，返回 (header_len, data_len)"""
+    if len(data) < 2 or data[0:1] != b"#":
+        raise ValueError("未检测到标准数据头 #")
+    try:
+        digits = int(chr(data[1]))
+    except ValueError:
+        raise ValueError("解析数据头长度失败")
+    if digits == 0:
+        raise ValueError("不支持不定长块数据 (#0)")
+    if len(data) < 2 + digits:
+        raise ValueError("数据头不完整，无法解析数据长度")
+    return 2 + digits, int(bytes(data[2:2 + digits]))
+
+
+class ChunkTuner:
+    """按实测吞吐自动调整单次读取大小
+
+    从 initial 开始，每个大小至少统计 4 次读取的数据量后计算吞吐；吞吐仍有提升就加倍，
+    否则回退到最佳大小并固定下来。同一传输会话内的后续传输直接使用调好的大小。
+    """
+
+    def __init__(self, initial=TUNER_INITIAL_SIZE, maximum=TUNER_MAX_SIZE, timeout=None):
+        self.size = initial
+        self.maximum = maximum
+        # 单次读取的超时 (秒)，None 表示不限制
+        self.timeout = timeout
+        self.best_size = initial
+        self.best_rate = 0.0
+        self.settled = False
+        self._bytes = 0
+        self._seconds = 0.0
+
+    def record(self, nbytes, seconds):
+        """记录一次读取的字节数与耗时"""
+        if self.settled:
+            return
+        self._bytes += nbytes
+        self._seconds += seconds
+        if self._bytes < 4 * self.size:
+            return
+
+        rate = self._bytes / max(self._seconds, 1e-9)
+        self._bytes = 0
+        self._seconds = 0.0
+        if rate < self.best_rate * TUNER_MIN_GAIN:
+            self.size = self.best_size
+            self.settled = True
+            return
+
+        self.best_size, self.best_rate = self.size, rate
+        next_size = self.size * 2
+        too_slow = self.timeout is not None and next_size / rate > self.timeout * TUNER_TIMEOUT_FRACTION
+        if next_size > self.maximum or too_slow:
+            self.settled = True
+        else:
+            self.size = next_size
+
+
+def receive_block(data_len, read_into, chunk_size=DEFAULT_CHUNK_SIZE, extra=0, progress=None, buffer=None, tuner=None):
+    """把长度已知的块数据直接读入一个预分配的缓冲区
+
+    read_into(view) 负责把数据写入 memoryview 并返回写入的字节数；
+    extra 为末尾额外预留的字节 (例如 tmctl 需要同时收取块结束符)。
+    buffer 为调用方可复用的 bytearray，长度足够时直接写入其中，否则新分配；
+    tuner (ChunkTuner) 非空时单次读取大小由它按实测吞吐决定，chunk_size 不再使用。
+    返回长度恰为 data_len 的 memoryview，可直接写入文件或交给 numpy.frombuffer。
+    """
+    total = data_len + extra
+    buf = buffer if buffer is not None and len(buffer) >= total else bytearray(total)
+    view = memoryview(buf)
+    received = 0
+
+    while received < data_len:
+        req_size = min(tuner.size if tuner else chunk_size, total - received)
+        # 最后一次读取必须连同 extra 一起请求，不能只剩下结束符留在接收队列里
+        if total - received - req_size <= extra:
+            req_size = total - received
+        if tuner:
+            start = time.perf_counter()
+            rlen = read_into(view[received:received + req_size])
+            tuner.record(rlen, time.perf_counter() - start)
+        else:
+            rlen = read_into(view[received:received + req_size])
+        if rlen == 0:
+            raise Exception("接收到 0 字节，通信可能中断")
+        received += rlen
+        if progress:
+            progress(min(received, data_len), data_len)
+
+    return view[:data_len]
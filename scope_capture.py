@@ -0,0 +1,276 @@
+"""触发单次采集流水线 (Sample.py sampleGetMeasure 的流程连续执行)：
+:SSTart? 开始单次采集并等待触发 -> :MEASure:WAIT? 等待自动测量完成 -> 读取测量值与波形 -> 再次开始。
+
+读到的测量值与波形交给后台线程写入日志/归档，采集循环不等待写盘。--overlap 时测量值读出后在同一批查询中用
+:SSTart? 0 开始下一次采集，再把刚结束的采集作为历史记录 -1 读出，波形传输与下一次采集并行；
+仪器不允许采集中读取历史记录 (或记录编号不符) 时退回串行方式。
+
+死区时间为程序得知采集停止到下一次开始采集之间、仪器不能触发的时间 (以 PC 侧的时刻计)。
+"""
+import array
+import math
+import os
+import queue
+import sys
+import threading
+import time
+
+import scope_history
+import scope_logger
+import scope_measure
+
+# :SSTart? / :MEASure:WAIT? 的超时单位 (秒)
+TIMEOUT_UNIT = 0.1
+# 同时在途 (已接收、未写盘) 的采集数，每次采集占用一组接收缓冲区
+WRITE_QUEUE_CAPTURES = 4
+# 进度输出间隔 (秒)
+PROGRESS_INTERVAL = 1.0
+
+
+class CaptureWriter:
+    """后台写盘线程：把每次采集的测量值与波形写入日志/归档，写完后把接收缓冲区放回空闲队列"""
+
+    def __init__(self, log, archive, buffer_count, buffer_size):
+        self.log = log
+        self.archive = archive
+        self.error = None
+        self.free = queue.Queue()
+        for _ in range(WRITE_QUEUE_CAPTURES):
+            # 多留 1 字节给 tmctl 的块结束符
+            self.free.put([bytearray(buffer_size + 1) for _ in range(buffer_count)])
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="capture-writer", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            index, timestamp, latency, values, stamp, buffers, payloads = item
+            try:
+                if self.error is None:
+                    if self.log is not None:
+                        self.log.append(timestamp, latency, values)
+                    if self.archive is not None and payloads is not None:
+                        self.archive.append(index, stamp, payloads)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.free.put(buffers)
+
+    def buffers(self):
+        """取一组空闲的接收缓冲区 (写盘落后 WRITE_QUEUE_CAPTURES 次采集时等待)；之前的写盘出错时抛出异常"""
+        if self.error is not None:
+            raise Exception(f"写入文件失败: {self.error}")
+        return self.free.get()
+
+    def put(self, index, timestamp, latency, values, stamp, buffers, payloads):
+        """提交一次采集 (payloads 为 buffers 上的视图，写盘完成前不能复用；为 None 时只写测量值)"""
+        self.queue.put((index, timestamp, latency, values, stamp, buffers, payloads))
+
+    def close(self):
+        """等待已提交的采集全部写完并关闭文件；写盘出错时抛出异常"""
+        self.queue.put(None)
+        self.thread.join()
+        for output in (self.log, self.archive):
+            if output is not None:
+                output.close()
+        if self.error is not None:
+            raise Exception(f"写入文件失败: {self.error}")
+
+
+def capture_queries(items, units, stamp, rearm):
+    """每次采集停止后的一批查询：[:MEASure:WAIT? + 测量值...] [:HISTory:TIME? 0] [:SSTart? 0]
+
+    返回 (查询列表, 各测量消息的测量项数)；:SSTart? 0 拼在最后一条消息末尾，
+    测量值与触发时刻读出后仪器立即开始下一次采集。
+    """
+    messages = scope_measure.build_measure_messages(items, prefix=f":MEASure:WAIT? {units}") if items else []
+    queries = [message for message, _ in messages]
+    if stamp:
+        queries.append(":HISTory:TIME? 0")
+    if rearm:
+        queries[-1] += ";:SSTart? 0"
+    return queries, [len(message_items) for _, message_items in messages]
+
+
+def parse_capture_responses(responses, counts, stamp, rearm):
+    """拆分 capture_queries 的应答，返回 (测量值列表, 测量是否完成, 触发时刻应答)"""
+    responses = list(responses)
+    if rearm:
+        responses[-1] = responses[-1].rsplit(";", 1)[0]
+    stamp_text = responses.pop().strip() if stamp else ""
+    values = []
+    completed = True
+    for index, (response, count) in enumerate(zip(responses, counts)):
+        if index == 0:
+            # 第一条消息开头是 :MEASure:WAIT? 的应答 (0 完成, 1 超时)
+            parsed = scope_measure.parse_measure_response(response, count + 1)
+            completed = parsed[0] == 0
+            values.extend(parsed[1:])
+        else:
+            values.extend(scope_measure.parse_measure_response(response, count))
+    return values, completed, stamp_text
+
+
+def run_capture(controller, channels, items, path, count=None, duration=None, timeout=10.0, overlap=False,
+                fmt="WORD", verbose=False):
+    """连续执行单次采集并读取测量值/波形，结束时打印每秒触发数与死区时间；返回是否成功
+
+    channels 为要读取波形的通道 (写入 path 归档，为空时不读波形)，items 为 (通道, 测量项) 列表
+    (写入 .dlmlog 日志；只读测量值时直接写入 path)。
+    """
+    units = max(1, math.ceil(timeout / TIMEOUT_UNIT))
+    controller.send(":COMMunicate:HEADer OFF")
+
+    archive = None
+    log = None
+    payload_size = 0
+    if channels:
+        controller.send(f":WAVeform:FORMat {fmt}")
+        controller.send(":WAVeform:BYTeorder LSBFirst")
+        controller.send(f":WAVeform:TRACe {channels[0]}")
+        length = int(float(controller.query(":WAVeform:LENGth?")))
+        controller.send(":WAVeform:STARt 0")
+        controller.send(f":WAVeform:END {length - 1}")
+        sample_rate = float(controller.query(":WAVeform:SRATe?"))
+        parameters = controller.waveform_parameters(channels)
+        archive = scope_history.HistoryArchive(path, channels, fmt, length, metadata={
+            "vrange": [parameters[channel][0] for channel in channels],
+            "offset": [parameters[channel][1] for channel in channels],
+            "sample_rate": sample_rate,
+            "start": 0,
+            "end": length - 1,
+            "capture": True,
+        })
+        payload_size = archive.payload_size
+    if items:
+        controller.send(":MEASure:MODE ON")
+        log_path = os.path.splitext(path)[0] + ".dlmlog" if archive is not None else path
+        log = scope_logger.MeasurementLog(log_path, [scope_measure.column_name(*item) for item in items])
+
+    writer = CaptureWriter(log, archive, len(channels), payload_size)
+    outputs = [os.path.abspath(output.path) for output in (archive, log) if output is not None]
+    print(f"开始连续单次采集: 波形 {', '.join(f'CH{c}' for c in channels) or '无'}, 测量值 {len(items)} 个, "
+          f"{'采集与传输重叠' if overlap else '串行'}，输出: {', '.join(outputs)} (Ctrl+C 结束)")
+
+    captures = 0
+    timeouts = 0
+    incomplete = 0
+    lost = 0
+    dead_times = array.array("d")
+    # armed: 下一次采集已经开始 (overlap 时在上一批查询末尾)；stopped_at: 程序得知上一次采集停止的时刻
+    armed = False
+    stopped_at = None
+    started = time.perf_counter()
+    last_report = started
+    success = True
+    try:
+        while True:
+            if count is not None and captures >= count:
+                break
+            if duration is not None and time.perf_counter() - started >= duration:
+                break
+
+            if armed:
+                # 已在采集：不重新开始，只等待停止
+                response = controller.query(f":SSTart? {-units}")
+            else:
+                if stopped_at is not None:
+                    dead_times.append(time.perf_counter() - stopped_at)
+                response = controller.query(f":SSTart? {units}")
+            armed = False
+            if response.strip() != "0":
+                timeouts += 1
+                stopped_at = None
+                if verbose:
+                    print(f"等待触发超时 ({timeout:g} s)")
+                continue
+            stopped_at = time.perf_counter()
+            timestamp = time.time()
+            captures += 1
+
+            rearm = overlap
+            queries, counts = capture_queries(items, units, archive is not None, rearm)
+            if queries:
+                responses = controller.query_many(queries, max(1000, 32 * (len(items) + 2)))
+                values, completed, stamp = parse_capture_responses(responses, counts, archive is not None, rearm)
+            else:
+                values, completed, stamp = [], True, ""
+                if rearm:
+                    controller.query(":SSTart? 0")
+            latency = time.perf_counter() - stopped_at
+            if not completed:
+                incomplete += 1
+            if rearm:
+                dead_times.append(time.perf_counter() - stopped_at)
+                armed = True
+                stopped_at = None
+
+            buffers = writer.buffers()
+            payloads = None
+            if archive is not None:
+                record = -1 if rearm else 0
+                try:
+                    if rearm and scope_history.parse_history_time(controller.query(":HISTory:TIME? -1")) \
+                            != scope_history.parse_history_time(stamp):
+                        raise Exception("历史记录 -1 不是刚结束的采集")
+                    payloads = []
+                    for channel, buffer in zip(channels, buffers):
+                        controller.send(f":WAVeform:TRACe {channel};:WAVeform:RECord {record};:WAVeform:SEND?")
+                        payloads.append(controller.read_block(buffer=buffer))
+                except Exception as e:
+                    if not rearm:
+                        raise
+                    # 仪器不允许采集中读取上一次的记录：本次波形丢弃，等当前采集停止后改为串行
+                    payloads = None
+                    lost += 1
+                    overlap = False
+                    print(f"\n采集进行中无法读取上一次采集的波形 ({e})，改为串行方式")
+                    try:
+                        print(f"设备错误日志: {controller.query(':STATus:ERRor?')}")
+                    except Exception:
+                        pass
+            writer.put(captures, timestamp, latency, values, stamp, buffers, payloads)
+
+            if verbose:
+                dead = f"{dead_times[-1] * 1000.0:.2f} ms" if dead_times else "-"
+                line = f"#{captures} 死区 {dead}"
+                if items:
+                    line += f", {scope_measure.format_snapshot(items, values)}"
+                print(line)
+            else:
+                now = time.perf_counter()
+                if now - last_report >= PROGRESS_INTERVAL:
+                    last_report = now
+                    sys.stdout.write(f"\r进度: {captures} 次, {captures / (now - started):.1f} 次/s")
+                    sys.stdout.flush()
+    except KeyboardInterrupt:
+        print("")
+    except Exception as e:
+        success = False
+        print(f"\n采集出错: {e}")
+    finally:
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        if armed:
+            try:
+                controller.send(":STOP")
+            except Exception:
+                pass
+        try:
+            writer.close()
+        except Exception as e:
+            success = False
+            print(f"\n{e}")
+
+    print(f"\n采集结束: 触发 {captures} 次, 用时 {elapsed:.2f} s, {captures / elapsed:.2f} 次/s "
+          f"(等待触发超时 {timeouts} 次, 测量未完成 {incomplete} 次, 丢弃波形 {lost} 次)")
+    ordered = sorted(dead_times)
+    if ordered:
+        print("死区时间: p50={:.2f} ms  p95={:.2f} ms  max={:.2f} ms".format(
+            scope_logger.percentile(ordered, 50) * 1000.0,
+            scope_logger.percentile(ordered, 95) * 1000.0,
+            ordered[-1] * 1000.0,
+        ))
+    return success and captures > 0
@@ -0,0 +1,153 @@
+"""分段波形传输：按 :WAVeform:STARt/END 把记录拆成若干窗口逐个 :WAVeform:SEND?，
+每个窗口解码后直接写入内存映射的 .npy 输出文件，内存占用只与窗口大小有关，与记录长度无关。
+
+进度保存在输出文件旁的检查点 (<输出>.part)，中断后以相同参数再次执行即从最后完成的窗口继续；
+检查点记录了该记录的触发时刻与换算参数，仪器上的记录已变化时重新开始，不会拼接两次采集的数据。
+"""
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import scope_block
+import scope_waveform
+
+CHECKPOINT_SUFFIX = ".part"
+# 检查点写入间隔 (秒)；写入前先把已完成的窗口刷新到磁盘
+CHECKPOINT_INTERVAL = 1.0
+# 进度输出间隔 (秒)
+PROGRESS_INTERVAL = 1.0
+# 读取范围超过该点数时 wave 自动改用分段传输
+AUTO_WINDOW_POINTS = 10_000_000
+# 自动调整窗口大小 (字节) 的起点与上限：窗口越大每个窗口的往返开销占比越小，但中断时损失的数据越多
+WINDOW_INITIAL_BYTES = 1 << 20
+WINDOW_MAX_BYTES = 16 << 20
+
+
+def checkpoint_path(path):
+    return path + CHECKPOINT_SUFFIX
+
+
+def load_checkpoint(path, identity):
+    """读取检查点；与本次传输的 identity 一致时返回 {channel: 下一个待读取的点}，否则返回 None"""
+    try:
+        with open(checkpoint_path(path), "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if checkpoint.get("identity") != identity:
+        return None
+    return {int(channel): position for channel, position in checkpoint["positions"].items()}
+
+
+def save_checkpoint(path, identity, positions):
+    """原子地写入检查点 (先写临时文件再替换)，中途退出不会留下损坏的检查点"""
+    temporary = checkpoint_path(path) + ".tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump({"identity": identity, "positions": {str(channel): position for channel, position in positions.items()}}, f)
+    os.replace(temporary, checkpoint_path(path))
+
+
+def run_windowed_download(controller, channels, path, identity, parameters, fmt="WORD", window=None):
+    """分段读取 identity 描述的记录范围并写入 path (.npy，多个通道时为 通道数×点数)；返回是否全部完成
+
+    identity 为 {"record", "start", "end", "stamp", ...}，用于校验检查点；parameters 为 {channel: (range, offset, position)}。
+    window 为每个窗口的点数，None 或 0 时按实测吞吐自动调整。中断 (Ctrl+C) 或出错时保存检查点，
+    出错时抛出异常。调用前示波器须已停止采集。
+    """
+    start, end = identity["start"], identity["end"]
+    points = end - start + 1
+    code_size = np.dtype(scope_waveform.WAVEFORM_DTYPE[fmt]).itemsize
+    shape = (points,) if len(channels) == 1 else (len(channels), points)
+
+    positions = load_checkpoint(path, identity)
+    values = None
+    if positions is not None and os.path.exists(path):
+        try:
+            values = np.lib.format.open_memmap(path, mode="r+")
+        except (OSError, ValueError):
+            values = None
+        if values is not None and (values.shape != shape or values.dtype != np.float64):
+            values = None
+    if values is None:
+        if positions is not None or os.path.exists(checkpoint_path(path)):
+            print("检查点与当前记录或输出文件不一致，重新开始传输")
+        positions = {channel: start for channel in channels}
+        output_dir = os.path.dirname(os.path.abspath(path))
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        values = np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=shape)
+    else:
+        done = sum(positions[channel] - start for channel in channels)
+        print(f"从检查点继续: 已完成 {done}/{points * len(channels)} 点")
+
+    tuner = None
+    if not window:
+        tuner = scope_block.ChunkTuner(initial=WINDOW_INITIAL_BYTES, maximum=WINDOW_MAX_BYTES)
+    buffer = bytearray()
+    total = points * len(channels)
+    received = 0
+    windows = 0
+    started = time.perf_counter()
+    last_report = last_checkpoint = started
+    complete = False
+
+    try:
+        for row, channel in enumerate(channels):
+            output = values if len(channels) == 1 else values[row]
+            vrange, offset, position = parameters[channel]
+            controller.send(f":WAVeform:TRACe {channel}")
+            while positions[channel] <= end:
+                first = positions[channel]
+                size = window if window else max(1, tuner.size // code_size)
+                last = min(end, first + size - 1)
+                # 多留 1 字节给 tmctl 的块结束符
+                need = (last - first + 1) * code_size + 1
+                if len(buffer) < need:
+                    buffer = bytearray(need)
+
+                t0 = time.perf_counter()
+                controller.send(f":WAVeform:STARt {first};:WAVeform:END {last};:WAVeform:SEND?")
+                payload = controller.read_block(buffer=buffer)
+                if len(payload) != need - 1:
+                    raise Exception(f"CH{channel} 窗口 {first}-{last} 数据长度 {len(payload)} 与预期 {need - 1} 不符")
+                if tuner:
+                    tuner.record(len(payload), time.perf_counter() - t0)
+                scope_waveform.decode_waveform(payload, fmt, vrange, offset, position, out=output[first - start:last - start + 1])
+                positions[channel] = last + 1
+                received += len(payload)
+                windows += 1
+
+                now = time.perf_counter()
+                if now - last_checkpoint >= CHECKPOINT_INTERVAL:
+                    last_checkpoint = now
+                    values.flush()
+                    save_checkpoint(path, identity, positions)
+                if now - last_report >= PROGRESS_INTERVAL:
+                    last_report = now
+                    done = sum(positions[c] - start for c in channels)
+                    sys.stdout.write(f"\r进度: {done}/{total} 点 ({done * 100.0 / total:.1f}%), "
+                                     f"{received / (now - started) / 1e6:.1f} MB/s, 窗口 {last - first + 1} 点")
+                    sys.stdout.flush()
+        complete = True
+    except KeyboardInterrupt:
+        print("\n已中断")
+    finally:
+        values.flush()
+        if complete:
+            try:
+                os.remove(checkpoint_path(path))
+            except OSError:
+                pass
+        else:
+            save_checkpoint(path, identity, positions)
+            done = sum(positions[channel] - start for channel in channels)
+            print(f"\n已保存检查点 ({done}/{total} 点)，以相同参数再次执行即可继续: {checkpoint_path(path)}")
+
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    final = window or (tuner.size // code_size)
+    print(f"\n分段传输: {received} bytes, {windows} 个窗口 (窗口 {final} 点), 用时 {elapsed:.3f} s "
+          f"({received / elapsed / 1e6:.1f} MB/s)")
+    return complete
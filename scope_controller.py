@@ -0,0 +1,1307 @@
+import argparse
+import contextlib
+import os
+import sys
+import time
+
+import scope_hislip
+import scope_measure
+import scope_state
+import scope_status
+import scope_transport
+
+# 控制器核心：各子命令的实现只依赖 scope_transport.Transport 接口，
+# yokogawa.py (tmctl) 与 yokogawa_pyvisa.py (pyvisa) 只负责建立各自的传输会话。
+
+# --- 默认配置 ---
+# 如果不输入参数，默认使用的 USB 序列号
+DEFAULT_USB_SERIAL = "90Y701585"
+ALL_CHANNELS = [1, 2, 3, 4]
+# 默认只输出结果 (clean 模式) 的子命令，指定 -v/--verbose 时才输出连接日志
+CLEAN_COMMANDS = ("mean", "rms", "measure")
+# 不会改变波形换算参数 (RANGe/OFFSet/POSition) 的设置类指令前缀，其余设置类指令会清空换算参数缓存
+WAVEFORM_NEUTRAL_PREFIXES = (":WAV", ":COMM", ":STOP", ":STAR", ":IMAG", ":HIST", "*CLS", "*WAI")
+
+
+def _keeps_waveform_parameters(message):
+    """程序消息 (可含 ';' 拼接) 中是否只有查询和不影响波形换算参数的指令"""
+    for command in message.split(";"):
+        header = command.strip().split(" ", 1)[0].upper()
+        if header and not header.endswith("?") and not header.startswith(WAVEFORM_NEUTRAL_PREFIXES):
+            return False
+    return True
+
+
+def _dedupe_channels(channels):
+    unique_channels = []
+    for channel in channels:
+        if channel not in unique_channels:
+            unique_channels.append(channel)
+    return unique_channels
+
+
+def _parse_channel_values(values):
+    channels = []
+    for value in values:
+        for part in str(value).split(","):
+            part = part.strip()
+            if not part:
+                raise ValueError("通道参数不能为空")
+
+            try:
+                channel = int(part)
+            except ValueError as exc:
+                raise ValueError(f"无效通道: {part}") from exc
+
+            if channel not in ALL_CHANNELS:
+                raise ValueError(f"通道号超出范围: {channel} (仅支持 1-4)")
+
+            channels.append(channel)
+
+    return _dedupe_channels(channels)
+
+
+class ChannelListAction(argparse.Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        try:
+            parsed_channels = _parse_channel_values(values)
+        except ValueError as exc:
+            parser.error(str(exc))
+
+        current_channels = getattr(namespace, self.dest, None) or []
+        setattr(namespace, self.dest, _dedupe_channels(current_channels + parsed_channels))
+
+class ParameterListAction(argparse.Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        try:
+            parameters = scope_measure.parse_parameter_values(values)
+        except ValueError as exc:
+            parser.error(str(exc))
+
+        current_parameters = getattr(namespace, self.dest, None) or []
+        setattr(namespace, self.dest, current_parameters + [p for p in parameters if p not in current_parameters])
+
+class ScopeController:
+    """示波器控制器核心，子类实现 open_transport() 以提供具体的传输会话"""
+
+    def __init__(self, args):
+        self.args = args
+        self.transport = None
+        # 通道 -> (range, offset, position)，本连接内设置未变化时复用
+        self.conversion_cache = {}
+        # 已知的仪器设置 (写穿缓存)，与缓存一致的设置指令不再发送
+        self.state = scope_state.StateCache()
+        # 本连接内已发送的 SRQ 配置 (:STATus:FILTer/EESE + *SRE，见 wait_condition)
+        self.srq_config = None
+        # 本连接上发生过传输层错误 (发送/接收失败、超时) 时为 True，守护进程据此决定是否重新连接
+        self.io_error = False
+        # --trace/--stats 时记录每个 SCPI 事务的耗时与字节数 (见 scope_trace)，否则为 None
+        self.tracer = None
+        if getattr(args, "trace", None) or getattr(args, "stats", False):
+            import scope_trace
+
+            self.tracer = scope_trace.Tracer()
+
+    def trace_span(self, name, category="session", **args):
+        """连接/断开等阶段的计时上下文；未启用计时时为空操作"""
+        if self.tracer is None:
+            return contextlib.nullcontext()
+        return self.tracer.span(name, category, **args)
+
+    def finish_trace(self):
+        """写出 --trace 文件并打印 --stats 汇总 (输出到 stderr)"""
+        if self.tracer is None:
+            return
+        trace_path = getattr(self.args, "trace", None)
+        if trace_path:
+            try:
+                self.tracer.write(trace_path)
+                print(f"trace 已保存: {trace_path}", file=sys.stderr)
+            except OSError as e:
+                print(f"保存 trace 失败: {e}", file=sys.stderr)
+        if getattr(self.args, "stats", False):
+            self.tracer.print_stats()
+
+    def open_transport(self, quiet=False):
+        """按 args 建立并打开传输会话，失败时返回 None (或抛出异常)"""
+        raise NotImplementedError
+
+    def connect(self, quiet=False, prefetch_state=False):
+        """建立连接；prefetch_state 为 True 时一次查询填充设置缓存 (常驻会话使用)"""
+        with self.trace_span("connect"):
+            return self._connect(quiet, prefetch_state)
+
+    def _connect(self, quiet, prefetch_state):
+        if not quiet:
+            print("-" * 30)
+
+        try:
+            transport_name = getattr(self.args, "transport", None)
+            if transport_name == "sim":
+                if not quiet:
+                    print("连接方式: 进程内模拟器")
+                transport = scope_transport.SimulatorTransport()
+                transport.open()
+            elif transport_name == "socket":
+                if not self.args.ip:
+                    raise Exception("--transport socket 需要同时指定 --ip")
+                port = getattr(self.args, "port", None) or scope_transport.SOCKET_PORT
+                if not quiet:
+                    print(f"连接方式: Socket (IP: {self.args.ip}, 端口: {port})")
+                transport = scope_transport.SocketTransport(self.args.ip, port)
+                transport.open()
+            elif transport_name == "hislip":
+                if not self.args.ip:
+                    raise Exception("--transport hislip 需要同时指定 --ip")
+                port = getattr(self.args, "port", None) or scope_hislip.HISLIP_PORT
+                if not quiet:
+                    print(f"连接方式: HiSLIP (IP: {self.args.ip}, 端口: {port})")
+                transport = scope_transport.HislipTransport(self.args.ip, port)
+                transport.open()
+            else:
+                transport = self.open_transport(quiet)
+            if transport is None:
+                return False
+            self.transport = transport
+            self.conversion_cache.clear()
+            self.state.clear()
+            self.srq_config = None
+            self.io_error = False
+            if prefetch_state:
+                self.load_state()
+
+            if not quiet:
+                print("连接成功!")
+                # 查询 IDN 确认设备
+                try:
+                    print(f"设备信息: {self.query('*IDN?')}")
+                except Exception:
+                    pass
+            return True
+
+        except Exception as e:
+            if not quiet:
+                print(f"连接异常: {e}")
+            return False
+
+    def reconnect(self, quiet=True, prefetch_state=False):
+        """断开后重新连接，丢弃会话中可能残留的数据 (超时后迟到的应答、只读了一半的应答)；返回是否成功"""
+        try:
+            self.close(quiet=quiet)
+        except Exception:
+            # 链路已断开时关闭也可能失败，直接丢弃旧会话
+            self.transport = None
+        return self.connect(quiet=quiet, prefetch_state=prefetch_state)
+
+    def close(self, quiet=False):
+        """断开连接"""
+        if self.transport:
+            if not quiet:
+                print("正在断开连接...")
+            with self.trace_span("close"):
+                self.transport.close()
+            self.transport = None
+            if not quiet:
+                print("-" * 30)
+
+    def send(self, cmd):
+        """发送指令；与设置缓存一致的设置指令被省略，全部省略 (未发送) 时返回 False"""
+        message, _ = self.state.filter(cmd)
+        if message is None:
+            return False
+        tracer = self.tracer
+        start = tracer.clock() if tracer else 0
+        try:
+            self.transport.write(message)
+        except Exception as e:
+            self.state.clear()
+            self.io_error = True
+            if tracer:
+                tracer.record("write", message, start, len(message) + 1, error=e)
+            raise Exception(f"指令发送失败: '{message}' ({e})")
+        if tracer:
+            tracer.record("write", message, start, len(message) + 1)
+        if self.conversion_cache and not _keeps_waveform_parameters(message):
+            self.conversion_cache.clear()
+        return True
+
+    def query(self, cmd, size=1000):
+        """查询指令 (发送 + 接收)"""
+        if self.state.observe(cmd):
+            self.conversion_cache.clear()
+        tracer = self.tracer
+        start = tracer.clock() if tracer else 0
+        try:
+            response = self.transport.query(cmd, size)
+        except Exception as e:
+            self.io_error = True
+            if tracer:
+                tracer.record("query", cmd, start, len(cmd) + 1, error=e)
+            raise Exception(f"接收数据失败: '{cmd}' ({e})")
+        if tracer:
+            tracer.record("query", cmd, start, len(cmd) + 1, len(response) + 1)
+        return response
+
+    def query_many(self, cmds, size=1000):
+        """执行多条互不依赖的查询，按顺序返回应答 (HiSLIP overlapped 模式下流水线发送)"""
+        for cmd in cmds:
+            if self.state.observe(cmd):
+                self.conversion_cache.clear()
+        tracer = self.tracer
+        start = tracer.clock() if tracer else 0
+        try:
+            responses = self.transport.query_many(cmds, size)
+        except Exception as e:
+            self.io_error = True
+            if tracer:
+                tracer.record("query_many", ";".join(cmds), start, sum(len(cmd) + 1 for cmd in cmds), error=e)
+            raise Exception(f"接收数据失败: {'; '.join(cmds)} ({e})")
+        if tracer:
+            tracer.record("query_many", ";".join(cmds), start, sum(len(cmd) + 1 for cmd in cmds),
+                          sum(len(response) + 1 for response in responses))
+        return responses
+
+    def load_state(self):
+        """一条程序消息查询通信/各通道/截图设置，用带头部的应答填充设置缓存"""
+        message = ";".join((":COMMunicate:HEADer ON",) + scope_state.LOAD_QUERIES)
+        self.state.load(self.query(message, size=65536))
+
+    def check_panel(self):
+        """检查面板是否可能改动过设置，是则丢弃面板可修改的缓存设置并返回 True
+
+        没有状态位报告面板按键，改为检查 :COMMunicate:REMote? (面板只有在 SHIFT+CLR 切回本地模式后才能操作)
+        以及 :STATus:CONDition? 的校准/自检位。
+        """
+        units = scope_state.split_units(self.query(":STATus:CONDition?;:COMMunicate:REMote?"))
+        condition, remote = (scope_status.register_value(unit) for unit in units)
+        if remote and not condition & (scope_status.CONDITION_CAL | scope_status.CONDITION_TST):
+            return False
+        self.state.forget_panel_settings()
+        self.conversion_cache.clear()
+        return True
+
+    def sync(self, *commands):
+        """发送设置指令并用 *OPC? 确认执行完毕，合并为一条程序消息 (一次往返)
+
+        与设置缓存一致的指令被省略，全部省略时不通信并返回 False。
+        """
+        message, _ = self.state.filter(";".join(commands))
+        if message is None:
+            return False
+        if self.conversion_cache and not _keeps_waveform_parameters(message):
+            self.conversion_cache.clear()
+        self.query(f"{message};*OPC?")
+        return True
+
+    def wait_condition(self, command, mask, level, timeout=30.0):
+        """执行 command，等待条件寄存器的 mask 位变为 level (例如 :ASETup:EXECute 后 RUN 位重新置 1)，返回耗时 (秒)
+
+        由扩展事件寄存器锁存该位的转换并产生服务请求：传输支持 SRQ 时等待期间总线空闲，
+        否则按 POLL_MIN 起逐渐增大、不超过 POLL_MAX 的间隔轮询 :STATus:EESR?。
+        SRQ 配置只在等待的位/边沿变化时发送；读出 EESR (清除旧事件) 与 command 在同一条程序消息中。
+        """
+        config = scope_status.filter_command(mask, level)
+        if self.srq_config != config:
+            self.send(config)
+            self.srq_config = config
+        start = time.perf_counter()
+        deadline = start + timeout
+        self.query(f":STATus:EESR?;{command}")
+        interval = scope_status.POLL_MIN
+        with self.trace_span("wait", "wait", command=command):
+            while True:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    raise Exception(f"等待 '{command}' 完成超时 ({timeout:g} s)")
+                srq = self.transport.wait_srq(remaining)
+                if srq is None:
+                    time.sleep(min(interval, remaining))
+                    interval = min(interval * scope_status.POLL_GROWTH, scope_status.POLL_MAX)
+                elif not srq:
+                    continue
+                # SRQ 可能来自之前的事件，以 EESR 确认
+                if scope_status.register_value(self.query(":STATus:EESR?")) & mask:
+                    return time.perf_counter() - start
+
+    def read_block(self, progress=None, buffer=None):
+        """读取 IEEE 488.2 定长块数据 (#N<len><data>)，返回数据体 (memoryview)
+
+        数据体按头部声明的长度一次性分配缓冲区，分块读入后不再做额外复制；
+        buffer 为足够大的 bytearray 时直接复用 (返回的视图在下次复用前有效)。
+        """
+        tracer = self.tracer
+        start = tracer.clock() if tracer else 0
+        try:
+            data = self.transport.read_block(progress, buffer)
+        except Exception as e:
+            self.io_error = True
+            if tracer:
+                tracer.record("block", None, start, error=e)
+            raise Exception(f"读取块数据失败: {e}")
+        if tracer:
+            tracer.record("block", None, start, received=len(data))
+        return data
+
+    def waveform_parameters(self, channels):
+        """各通道的波形换算参数 {channel: (range, offset, position)}
+
+        未缓存的通道在一条程序消息中一并查询；之后只要没有发送会改变设置的指令就不再重复查询。
+        查询会切换 :WAVeform:TRACe，调用方不应依赖之前选择的波形。
+        """
+        missing = [channel for channel in channels if channel not in self.conversion_cache]
+        if missing:
+            message = ";".join(
+                f":WAVeform:TRACe {channel};:WAVeform:RANGe?;:WAVeform:OFFSet?;:WAVeform:POSition?" for channel in missing
+            )
+            values = self.query(message).split(";")
+            if len(values) != 3 * len(missing):
+                raise Exception(f"换算参数应答格式错误: {';'.join(values)}")
+            for i, channel in enumerate(missing):
+                self.conversion_cache[channel] = tuple(float(value) for value in values[3 * i:3 * i + 3])
+        return {channel: self.conversion_cache[channel] for channel in channels}
+
+    def fetch_all_traces(self, channels):
+        """:WAVeform:ALL:SEND? 一次块传输读取所有显示中的波形 (WORD, 最新一次采集)
+
+        返回 {channel: int16 数组}，各数组都是块数据上的视图，不复制数据。
+        """
+        import scope_waveform
+
+        self.send(":WAVeform:ALL:TRACe ALL")
+        self.send(":WAVeform:ALL:SEND? 0")
+        _, traces = scope_waveform.split_all_payload(self.read_block())
+        missing = [channel for channel in channels if channel not in traces]
+        if missing:
+            raise Exception(f"{', '.join(f'CH{c}' for c in missing)} 不在 :WAVeform:ALL:SEND? 数据中 (通道未显示?)")
+        return {channel: traces[channel] for channel in channels}
+
+    def _cmd_get_measurement(self, measurement_name, scpi_parameter):
+        """获取标量测量值逻辑"""
+        channel = self.args.channel
+        # 默认开启 clean 模式，除非指定了 --verbose
+        is_clean = not self.args.verbose
+        success = False
+
+        if not is_clean:
+            print(f"正在读取 Channel {channel} 的 {measurement_name} 值...")
+
+        try:
+            self.send(":COMMunicate:HEADer OFF")
+
+            # 查询结果
+            val_str = self.query(f":MEASure:CHANnel{channel}:{scpi_parameter}:VALue?")
+
+            try:
+                # 转换为毫伏/毫安 (x1000)
+                val = float(val_str) * 1000.0
+                if is_clean:
+                    print(f"{val:.3f}")
+                else:
+                    print(f"\n[结果] CH{channel} {measurement_name} = {val:.3f} (mUnit)")
+            except ValueError:
+                if is_clean:
+                    print("NaN")
+                else:
+                    print(f"\n[结果] CH{channel} {measurement_name} = {val_str} (非数值)")
+            success = True
+
+        except Exception as e:
+            if not is_clean:
+                print(f"读取出错: {e}")
+            else:
+                print("Error")
+
+        return success
+
+    def cmd_get_mean(self):
+        """获取 Mean 值逻辑"""
+        return self._cmd_get_measurement("Mean", "AVERage")
+
+    def cmd_get_rms(self):
+        """获取 RMS 值逻辑"""
+        return self._cmd_get_measurement("RMS", "RMS")
+
+    def measure_snapshot(self, items):
+        """一次读取多个 (通道, 测量项)，查询按 ';' 拼接，每条程序消息不超过 1024 字节
+
+        拆分出的多条程序消息互不依赖，通过 query_many 发送 (HiSLIP 下流水线执行)。
+        """
+        messages = scope_measure.build_measure_messages(items, prefix=":COMMunicate:HEADer OFF")
+        size = max(1000, 32 * max((len(message_items) for _, message_items in messages), default=0))
+        responses = self.query_many([message for message, _ in messages], size)
+        values = []
+        for response, (_, message_items) in zip(responses, messages):
+            values.extend(scope_measure.parse_measure_response(response, len(message_items)))
+        return values
+
+    def host_measurements(self, channels, parameters, gates=None):
+        """停止采集读取各通道最新一次采集的整条 WORD 记录，在主机端计算测量值 (见 scope_analysis)
+
+        返回 {测量项: ndarray (门控区间数, 通道数)}。多个通道且记录不超过 12.5 kPoints 时用 :WAVeform:ALL:SEND? 一次取回。
+        """
+        import numpy as np
+
+        import scope_analysis
+        import scope_waveform
+
+        scope_analysis.check_parameters(parameters)
+        stopped = False
+        try:
+            self.sync(":COMMunicate:HEADer OFF", ":STOP")
+            stopped = True
+            self.send(f":WAVeform:TRACe {channels[0]}")
+            self.send(":WAVeform:RECord 0")
+            self.send(":WAVeform:FORMat WORD")
+            self.send(":WAVeform:BYTeorder LSBFirst")
+            length = int(float(self.query(":WAVeform:LENGth?")))
+            sample_rate = float(self.query(":WAVeform:SRATe?"))
+
+            t0 = time.perf_counter()
+            if len(channels) > 1 and length <= scope_waveform.ALL_MAX_POINTS:
+                traces = self.fetch_all_traces(channels)
+            else:
+                self.send(":WAVeform:STARt 0")
+                self.send(f":WAVeform:END {length - 1}")
+                traces = {}
+                for channel in channels:
+                    self.send(f":WAVeform:TRACe {channel};:WAVeform:SEND?")
+                    traces[channel] = np.frombuffer(self.read_block(), dtype=scope_waveform.WAVEFORM_DTYPE["WORD"])
+            parameters_by_channel = self.waveform_parameters(channels)
+        finally:
+            if stopped:
+                self.send(":STARt")
+
+        t1 = time.perf_counter()
+        codes = np.vstack([traces[channel] for channel in channels])
+        results = scope_analysis.analyze(
+            codes, [parameters_by_channel[channel] for channel in channels], sample_rate, "WORD", gates, parameters
+        )
+        if self.args.verbose:
+            print(f"主机端计算: {len(channels)} 通道 × {codes.shape[1]} 点, 传输 {t1 - t0:.3f} s, "
+                  f"计算 {time.perf_counter() - t1:.3f} s")
+        return results
+
+    def cmd_measure(self):
+        """多通道、多测量项快照"""
+        channels = ALL_CHANNELS if self.args.all_channels else (self.args.channel or [1])
+        parameters = self.args.param or ["AVERage"]
+        items = [(channel, parameter) for channel in channels for parameter in parameters]
+
+        if self.args.host or self.args.gate:
+            return self._cmd_host_measure(channels, parameters)
+
+        if self.args.verbose:
+            print(f"正在读取 {len(items)} 个测量值...")
+
+        try:
+            values = self.measure_snapshot(items)
+        except Exception as e:
+            if self.args.verbose:
+                print(f"读取出错: {e}")
+            else:
+                print("Error")
+            return False
+
+        print(scope_measure.format_snapshot(items, values, self.args.format, self.args.header))
+        return True
+
+    def _cmd_host_measure(self, channels, parameters):
+        """measure --host/--gate：由原始波形在主机端计算，指定门控区间时列名追加 @START:END"""
+        try:
+            import scope_analysis
+        except ImportError:
+            print("请先安装 numpy: pip install numpy")
+            return False
+
+        if self.args.verbose:
+            print(f"正在读取 {', '.join(f'CH{c}' for c in channels)} 波形并在主机端计算...")
+
+        try:
+            gates = [scope_analysis.parse_gate(text) for text in self.args.gate or []]
+            results = self.host_measurements(channels, parameters, gates or None)
+        except Exception as e:
+            if self.args.verbose:
+                print(f"读取出错: {e}")
+            else:
+                print("Error")
+            return False
+
+        items = []
+        values = []
+        for column, channel in enumerate(channels):
+            for parameter in parameters:
+                for row, gate in enumerate(gates or [None]):
+                    label = parameter if gate is None else f"{parameter}@{scope_analysis.gate_label(gate)}"
+                    items.append((channel, label))
+                    values.append(float(results[parameter][row, column]))
+        print(scope_measure.format_snapshot(items, values, self.args.format, self.args.header))
+        return True
+
+    def cmd_log(self):
+        """连续测量记录逻辑"""
+        import scope_logger
+
+        channels = ALL_CHANNELS if self.args.all_channels else (self.args.channel or [1])
+        parameters = self.args.param or ["AVERage"]
+        items = [(channel, parameter) for channel in channels for parameter in parameters]
+
+        if self.args.rate <= 0:
+            print("--rate 必须大于 0")
+            return False
+
+        filename = self.args.output
+        if not filename:
+            # 默认文件名: DLM_年月日_时分秒.dlmlog
+            timestamp = time.strftime("%Y%m%d_%H%M%S")
+            filename = f"DLM_{timestamp}.dlmlog"
+
+        try:
+            return scope_logger.run_logging(
+                self,
+                items,
+                filename,
+                self.args.rate,
+                duration=self.args.duration,
+                count=self.args.count,
+                flush_interval=self.args.flush,
+                verbose=self.args.verbose,
+            )
+        except Exception as e:
+            print(f"记录出错: {e}")
+            return False
+
+    def cmd_exporter(self):
+        """Prometheus 导出服务：保持连接，后台定时刷新测量值，经 HTTP /metrics 提供"""
+        import scope_exporter
+
+        channels = ALL_CHANNELS if self.args.all_channels else (self.args.channel or [1])
+        parameters = self.args.param or ["AVERage"]
+        items = [(channel, parameter) for channel in channels for parameter in parameters]
+        if self.args.interval <= 0:
+            print("--interval 必须大于 0")
+            return False
+
+        try:
+            return scope_exporter.run_exporter(
+                self, items, self.args.bind, self.args.http_port, self.args.interval, verbose=self.args.verbose
+            )
+        except Exception as e:
+            print(f"导出服务出错: {e}")
+            return False
+
+    def cmd_channel_set(self):
+        """Set channel display state."""
+        channels = ALL_CHANNELS if self.args.all_channels else (self.args.channel or [1])
+        state = self.args.state
+
+        try:
+            self.send(":COMMunicate:HEADer OFF")
+            channel_text = ", ".join(f"CH{channel}" for channel in channels)
+
+            # 设置缓存中已是目标状态的通道不再发送，全部省略时也不需要 *OPC? 同步
+            if state == "on":
+                print(f"Turning on {channel_text}...")
+                changed = False
+                for channel in channels:
+                    changed |= self.send(f":CHANnel{channel}:DISPlay ON")
+                if changed:
+                    self.query("*OPC?")
+                print(f"{channel_text} enabled.")
+            else:
+                print(f"Turning off {channel_text}...")
+                changed = False
+                for channel in channels:
+                    changed |= self.send(f":CHANnel{channel}:DISPlay OFF")
+                if changed:
+                    self.query("*OPC?")
+                print(f"{channel_text} disabled.")
+
+            return True
+        except Exception as e:
+            print(f"Failed to set channel state: {e}")
+            return False
+
+    def _wait_operation(self, label, command, mask, level):
+        """执行耗时操作并等待完成 (见 wait_condition)，打印结果"""
+        print(f"{label}，等待完成 (超时 {self.args.timeout:g} s)...")
+        try:
+            elapsed = self.wait_condition(command, mask, level, self.args.timeout)
+        except Exception as e:
+            print(f"{label}出错: {e}")
+            return False
+        print(f"{label}完成，用时 {elapsed:.3f} s")
+        return True
+
+    def cmd_autoset(self):
+        """自动设置：完成后仪器重新开始采集 (RUN 位上升沿)"""
+        return self._wait_operation("自动设置", ":ASETup:EXECute", scope_status.CONDITION_RUN, True)
+
+    def cmd_single(self):
+        """单次采集：切换到单次触发并开始采集，触发后采集停止 (RUN 位下降沿)"""
+        return self._wait_operation("单次采集", ":TRIGger:MODE SINGle;:STARt", scope_status.CONDITION_RUN, False)
+
+    def cmd_save(self):
+        """保存到仪器的存储介质：访问结束时 ACS 位下降"""
+        command = f":FILE:SAVE:{self.args.type.upper()}:EXECute"
+        if self.args.name:
+            command = f':FILE:SAVE:NAME "{self.args.name}";{command}'
+        return self._wait_operation("保存文件", command, scope_status.CONDITION_ACS, False)
+
+    def cmd_get_screenshot(self):
+        """截图逻辑
+
+        --count 大于 1 时为连拍：格式只设置一次，帧按序号命名，由后台线程写盘，同时传输下一帧；
+        --no-stop 时不暂停采集 (截取的是运行中的画面)。
+        """
+        import scope_screenshot
+
+        fmt = self.args.format.upper()
+        count = self.args.count
+        interval = self.args.interval
+        if count < 1 or interval < 0:
+            print("--count 必须大于 0，--interval 不能为负数")
+            return False
+        filename = self.args.output or scope_screenshot.default_screenshot_filename(fmt)
+
+        output_path = os.path.abspath(filename)
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        if count == 1:
+            print(f"正在获取截图，目标文件: '{filename}'")
+        else:
+            print(f"正在连拍 {count} 帧 ({fmt}, 间隔 {interval:g} s)，目标文件: "
+                  f"'{scope_screenshot.numbered_filename(filename, 1, count)}' ...")
+
+        success = False
+        stopped = False
+        writer = None
+
+        try:
+            # 清除之前的错误信息
+            self.transport.clear()
+
+            # 1. 暂停示波器 (Stop Acquisition) 并设置截图格式
+            # 两条指令与 *OPC? 合并为一条程序消息，一次往返确认执行完毕；格式未变 (指令被省略) 且不暂停时不通信
+            commands = [f":IMAGe:FORMat {fmt}"]
+            if not self.args.no_stop:
+                print("暂停示波器采集...")
+                commands.insert(0, ":STOP")
+            print("发送截图指令...")
+            self.sync(*commands)
+            stopped = not self.args.no_stop
+
+            # 获取数据头后按总大小一次性分配缓冲区，数据直接写入其中
+            print("开始接收数据...")
+
+            def report_progress(received, total):
+                sys.stdout.write(f"\r进度: {received}/{total} bytes")
+                sys.stdout.flush()
+
+            writer = scope_screenshot.FrameWriter()
+            started = time.perf_counter()
+            frames = 0
+            try:
+                for index in range(1, count + 1):
+                    # 按固定节拍取帧，传输比间隔慢时不等待
+                    delay = started + (index - 1) * interval - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+
+                    self.send(":IMAGe:SEND?")
+                    image_data = self.read_block(progress=report_progress if count == 1 else None)
+                    if len(image_data) == 0:
+                        raise Exception("接收到的图像数据长度为 0。请检查设备状态。")
+
+                    # 每帧的缓冲区都是新分配的，直接交给写盘线程
+                    writer.put(scope_screenshot.numbered_filename(filename, index, count), image_data)
+                    frames = index
+                    if count > 1:
+                        sys.stdout.write(f"\r进度: {index}/{count} 帧")
+                        sys.stdout.flush()
+            except KeyboardInterrupt:
+                print("\n已中断，保留已接收的帧")
+            print("")
+            writer.close()
+            elapsed = max(time.perf_counter() - started, 1e-9)
+
+            if count == 1:
+                print(f"截图成功! 实际写入: {writer.bytes} bytes. 已保存: {output_path}")
+            else:
+                print(f"连拍完成: {writer.written}/{count} 帧, {writer.bytes} bytes, 用时 {elapsed:.2f} s, "
+                      f"{writer.written / elapsed:.1f} 帧/s")
+            success = frames == count
+
+        except Exception as e:
+            print(f"\n截图出错: {e}")
+            # 尝试获取设备错误信息
+            try:
+                err = self.query(":STATus:ERRor?")
+                print(f"设备错误日志: {err}")
+            except Exception:
+                pass
+        finally:
+            if writer is not None and writer.thread.is_alive():
+                try:
+                    writer.close()
+                except Exception:
+                    success = False
+            if stopped:
+                print("恢复示波器运行...")
+                try:
+                    self.send(":STARt")
+                except Exception as e:
+                    success = False
+                    print(f"恢复运行失败: {e}")
+
+        return success
+
+    def cmd_get_waveform(self):
+        """波形数据读取逻辑
+
+        读取多个通道时，若为最新一次采集的整条 WORD 记录 (不超过 12.5 kPoints)，
+        改用 :WAVeform:ALL:SEND? 一次块传输取回全部波形；否则逐个通道 :WAVeform:SEND?。
+        指定 --window 或读取范围很长时分段传输到内存映射的 .npy 文件，可从检查点续传。
+        """
+        try:
+            import scope_waveform
+        except ImportError:
+            print("请先安装 numpy: pip install numpy")
+            return False
+
+        channels = ALL_CHANNELS if self.args.all_channels else (self.args.channel or [1])
+        fmt = self.args.format.upper()
+        filename = self.args.output or scope_waveform.default_waveform_filename(channels[0] if len(channels) == 1 else channels)
+
+        print(f"正在读取 {', '.join(f'CH{c}' for c in channels)} 波形，目标文件: '{filename}'")
+
+        success = False
+        stopped = False
+        # 分段传输未完成时保持停止，记录留在仪器上供续传
+        keep_stopped = False
+
+        try:
+            print("暂停示波器采集...")
+            self.sync(":COMMunicate:HEADer OFF", ":STOP")
+            stopped = True
+
+            self.send(f":WAVeform:TRACe {channels[0]}")
+            self.send(f":WAVeform:RECord {self.args.record}")
+            self.send(f":WAVeform:FORMat {fmt}")
+            self.send(":WAVeform:BYTeorder LSBFirst")
+
+            length = int(float(self.query(":WAVeform:LENGth?")))
+            start = self.args.start
+            end = self.args.end if self.args.end is not None else length - 1
+            sample_rate = float(self.query(":WAVeform:SRATe?"))
+            bulk = (
+                len(channels) > 1 and fmt == "WORD" and self.args.record == 0
+                and start == 0 and end == length - 1 and length <= scope_waveform.ALL_MAX_POINTS
+            )
+
+            print(f"记录长度: {length} 点, 读取范围: {start}-{end}, 采样率: {sample_rate:g} S/s")
+
+            import scope_chunked
+
+            wavefile = filename.lower().endswith(".dlmwav")
+            windowed = self.args.window is not None or (
+                end - start + 1 > scope_chunked.AUTO_WINDOW_POINTS and not filename.lower().endswith((".csv", ".dlmwav"))
+            )
+            if windowed:
+                if filename.lower().endswith((".csv", ".dlmwav")):
+                    raise Exception("分段传输只能保存为 .npy 文件")
+                parameters = self.waveform_parameters(channels)
+                # 检查点据此确认续传时仪器上仍是同一条记录
+                identity = {
+                    "channels": channels,
+                    "record": self.args.record,
+                    "start": start,
+                    "end": end,
+                    "format": fmt,
+                    "stamp": self.query(f":HISTory:TIME? {self.args.record}"),
+                    "sample_rate": sample_rate,
+                    "parameters": [list(parameters[channel]) for channel in channels],
+                }
+                keep_stopped = True
+                if scope_chunked.run_windowed_download(self, channels, filename, identity, parameters, fmt, self.args.window):
+                    keep_stopped = False
+                    print(f"波形保存成功! 已保存: {os.path.abspath(filename)}")
+                    success = True
+                return success
+
+            t0 = time.perf_counter()
+            if bulk:
+                codes = self.fetch_all_traces(channels)
+            else:
+                self.send(f":WAVeform:STARt {start}")
+                self.send(f":WAVeform:END {end}")
+                codes = {}
+                for channel in channels:
+                    self.send(f":WAVeform:TRACe {channel};:WAVeform:SEND?")
+                    codes[channel] = self.read_block()
+            t1 = time.perf_counter()
+            parameters = self.waveform_parameters(channels)
+            if wavefile:
+                # 原始码值与换算参数直接写入 .dlmwav，不解码
+                import scope_wavefile
+
+                trigger = int(float(self.query(":WAVeform:TRIGger?")))
+                raw, size = scope_wavefile.write_waveform_file(
+                    filename, codes, fmt, parameters, sample_rate=sample_rate, start=start, trigger=trigger,
+                    codec=self.args.compress, metadata={"record": self.args.record},
+                )
+                t2 = time.perf_counter()
+                print(f"传输: {raw} bytes, {t1 - t0:.3f} s ({raw / 1e6 / max(t1 - t0, 1e-9):.1f} MB/s)")
+                print(f"写入: {size} bytes ({size * 100.0 / max(raw, 1):.1f}%, {self.args.compress}), {t2 - t1:.3f} s "
+                      f"({raw / 1e6 / max(t2 - t1, 1e-9):.1f} MB/s)")
+                print(f"波形保存成功! 已保存: {os.path.abspath(filename)}")
+                return True
+            traces = scope_waveform.decode_traces(codes, parameters, fmt)
+            t2 = time.perf_counter()
+
+            size = sum(c.nbytes for c in codes.values())
+            points = sum(len(v) for v in traces.values())
+            size_mb = size / 1e6
+            method = ":WAVeform:ALL:SEND?" if bulk else ":WAVeform:SEND?"
+            print(f"传输: {size} bytes, {t1 - t0:.3f} s ({size_mb / max(t1 - t0, 1e-9):.1f} MB/s, {method})")
+            print(f"解码: {points} 点, {t2 - t1:.3f} s ({size_mb / max(t2 - t1, 1e-9):.1f} MB/s)")
+
+            if len(channels) == 1:
+                values = traces[channels[0]]
+            else:
+                import numpy as np
+
+                values = np.vstack([traces[channel] for channel in channels])
+            output_path = scope_waveform.save_waveform(filename, values, sample_rate, names=[f"CH{c}" for c in channels])
+            print(f"波形保存成功! 已保存: {output_path}")
+            success = True
+
+        except Exception as e:
+            print(f"\n读取波形出错: {e}")
+            try:
+                err = self.query(":STATus:ERRor?")
+                print(f"设备错误日志: {err}")
+            except Exception:
+                pass
+        finally:
+            if stopped and keep_stopped:
+                print("传输未完成，示波器保持停止状态以便从检查点继续")
+            elif stopped:
+                print("恢复示波器运行...")
+                try:
+                    self.send(":STARt")
+                except Exception as e:
+                    success = False
+                    print(f"恢复运行失败: {e}")
+
+        return success
+
+
+    def cmd_capture(self):
+        """连续单次采集流水线：每次触发后读取测量值与波形，统计每秒触发数与死区时间"""
+        import scope_capture
+
+        channels = ALL_CHANNELS if self.args.all_channels else (self.args.channel or [1])
+        items = [(channel, parameter) for channel in channels for parameter in (self.args.param or [])]
+        wave_channels = [] if self.args.no_wave else channels
+        if not items and not wave_channels:
+            print("--no-wave 时需要用 -p 指定测量项")
+            return False
+
+        filename = self.args.output
+        if not filename:
+            # 默认文件名: DLM_CAP_年月日_时分秒.dlmhist (只读测量值时为 .dlmlog)
+            timestamp = time.strftime("%Y%m%d_%H%M%S")
+            filename = f"DLM_CAP_{timestamp}.{'dlmhist' if wave_channels else 'dlmlog'}"
+
+        try:
+            return scope_capture.run_capture(
+                self,
+                wave_channels,
+                items,
+                filename,
+                count=self.args.count,
+                duration=self.args.duration,
+                timeout=self.args.timeout,
+                overlap=self.args.overlap,
+                fmt=self.args.format.upper(),
+                verbose=self.args.verbose,
+            )
+        except Exception as e:
+            print(f"采集出错: {e}")
+            try:
+                print(f"设备错误日志: {self.query(':STATus:ERRor?')}")
+            except Exception:
+                pass
+            return False
+
+    def cmd_history_export(self):
+        """批量导出历史记录波形到归档文件 (整个导出过程只停止/恢复一次采集)"""
+        try:
+            import scope_history
+        except ImportError:
+            print("请先安装 numpy: pip install numpy")
+            return False
+
+        channels = ALL_CHANNELS if self.args.all_channels else (self.args.channel or [1])
+        filename = self.args.output
+        if not filename:
+            # 默认文件名: DLM_HIST_年月日_时分秒.dlmhist
+            timestamp = time.strftime("%Y%m%d_%H%M%S")
+            filename = f"DLM_HIST_{timestamp}.dlmhist"
+
+        success = False
+        stopped = False
+
+        try:
+            print("暂停示波器采集...")
+            self.sync(":COMMunicate:HEADer OFF", ":STOP")
+            stopped = True
+
+            first = self.args.first
+            if first is None:
+                self.send(f":WAVeform:TRACe {channels[0]}")
+                first = int(float(self.query(":WAVeform:RECord? MINimum")))
+            last = self.args.last
+            if first > last:
+                raise Exception(f"记录范围无效: {first}..{last}")
+
+            success = scope_history.run_history_export(
+                self, channels, filename, first, last, self.args.format.upper(), self.args.start, self.args.end
+            )
+
+        except Exception as e:
+            print(f"\n导出历史记录出错: {e}")
+            try:
+                err = self.query(":STATus:ERRor?")
+                print(f"设备错误日志: {err}")
+            except Exception:
+                pass
+        finally:
+            if stopped:
+                print("恢复示波器运行...")
+                try:
+                    self.send(":STARt")
+                except Exception as e:
+                    success = False
+                    print(f"恢复运行失败: {e}")
+
+        return success
+
+
+def build_parser(description, transports):
+    """创建两个 CLI 共用的参数解析器，返回 (parser, subparsers)
+
+    transports 为 --transport 可选值，第一个为默认值；各 CLI 在此基础上追加自己的参数和子命令。
+    """
+    parser = argparse.ArgumentParser(description=description)
+
+    # 全局参数：连接设置
+    parser.add_argument("--serial", help="指定 USB 序列号 (默认使用内置默认值)", default=None)
+    parser.add_argument("--ip", help="指定 IP 地址 (若设置则优先使用网口 VXI-11)", default=None)
+    parser.add_argument(
+        "--transport",
+        choices=transports,
+        default=transports[0],
+        help=f"传输方式 (默认 {transports[0]}；socket 直连 --ip 的命令端口；hislip 为 --ip 的 HiSLIP 会话；sim 为进程内模拟器，无需连接设备)",
+    )
+    parser.add_argument("--port", type=int, default=None, help=f"--transport socket/hislip 的端口 (默认 {scope_transport.SOCKET_PORT}/{scope_hislip.HISLIP_PORT})")
+    parser.add_argument("--trace", metavar="FILE", default=None,
+                        help="记录连接、每个 SCPI 事务与断开的耗时，保存为 Chrome trace JSON (chrome://tracing / Perfetto 打开)")
+    parser.add_argument("--stats", action="store_true", help="结束后按指令头部汇总 p50/p95/p99 耗时与收发字节数 (输出到 stderr)")
+
+    # 子命令集
+    subparsers = parser.add_subparsers(dest="command", required=True, help="请选择要执行的操作")
+
+    # 子命令: mean
+    parser_mean = subparsers.add_parser("mean", help="读取指定通道的 Mean 值")
+    parser_mean.add_argument("-c", "--channel", type=int, choices=[1, 2, 3, 4], default=1, help="通道号 (1-4, 默认 1)")
+    parser_mean.add_argument("-v", "--verbose", action="store_true", help="详细输出模式 (显示日志和完整信息)")
+    parser_mean.add_argument("--clean", action="store_true", help="[已废弃] 默认即为干净模式，保留此参数仅为兼容性")
+
+    # 子命令: rms
+    parser_rms = subparsers.add_parser("rms", help="读取指定通道的 RMS 值")
+    parser_rms.add_argument("-c", "--channel", type=int, choices=[1, 2, 3, 4], default=1, help="通道号 (1-4, 默认 1)")
+    parser_rms.add_argument("-v", "--verbose", action="store_true", help="详细输出模式 (显示日志和完整信息)")
+    parser_rms.add_argument("--clean", action="store_true", help="[已废弃] 默认即为干净模式，保留此参数仅为兼容性")
+
+    # 子命令: measure (多通道多测量项快照)
+    parser_measure = subparsers.add_parser("measure", help="一次读取多个通道/测量项，输出单行 CSV 或 JSON")
+    measure_target_group = parser_measure.add_mutually_exclusive_group()
+    measure_target_group.add_argument(
+        "-c",
+        "--channel",
+        nargs="+",
+        action=ChannelListAction,
+        default=None,
+        help="通道号 (1-4, 默认 1)，支持多个值，例如 -c 1 2 或 -c 1,2,4",
+    )
+    measure_target_group.add_argument("-a", "--all", dest="all_channels", action="store_true", help="选择所有通道 (CH1-CH4)")
+    parser_measure.add_argument(
+        "-p",
+        "--param",
+        nargs="+",
+        action=ParameterListAction,
+        default=None,
+        help="测量项 (默认 mean)，例如 -p mean rms pp freq 或 -p AVERage,RMS,PTOPeak",
+    )
+    parser_measure.add_argument("--format", choices=["csv", "json"], default="csv", help="输出格式 (默认 csv)")
+    parser_measure.add_argument("--header", action="store_true", help="CSV 输出时先打印列名")
+    parser_measure.add_argument(
+        "--host",
+        action="store_true",
+        help="停止采集读取整条原始波形，在主机端计算 (需要 numpy；支持 mean rms sdev max min pp freq PERiod RISE FALL duty)",
+    )
+    parser_measure.add_argument(
+        "--gate",
+        action="append",
+        default=None,
+        metavar="START:END",
+        help="主机端计算的门控区间 (数据点，左闭右开，END 可省略)，可重复指定多个；指定后隐含 --host",
+    )
+    parser_measure.add_argument("-v", "--verbose", action="store_true", help="详细输出模式 (显示日志和完整信息)")
+
+    # 子命令: log (连续测量记录)
+    parser_log = subparsers.add_parser("log", help="保持连接，按固定速率连续记录测量值到二进制日志文件")
+    log_target_group = parser_log.add_mutually_exclusive_group()
+    log_target_group.add_argument(
+        "-c",
+        "--channel",
+        nargs="+",
+        action=ChannelListAction,
+        default=None,
+        help="通道号 (1-4, 默认 1)，支持多个值，例如 -c 1 2 或 -c 1,2,4",
+    )
+    log_target_group.add_argument("-a", "--all", dest="all_channels", action="store_true", help="选择所有通道 (CH1-CH4)")
+    parser_log.add_argument("-p", "--param", nargs="+", action=ParameterListAction, default=None, help="测量项 (默认 mean)，同 measure")
+    parser_log.add_argument("-r", "--rate", type=float, default=1.0, help="目标采样速率 (Hz, 默认 1)")
+    parser_log.add_argument("-o", "--output", help="日志文件名 (默认: DLM_年月日_时分秒.dlmlog，已存在则追加)")
+    parser_log.add_argument("--duration", type=float, default=None, help="记录时长 (秒, 默认不限，Ctrl+C 结束)")
+    parser_log.add_argument("--count", type=int, default=None, help="记录条数上限 (默认不限)")
+    parser_log.add_argument("--flush", type=float, default=1.0, help="刷新到磁盘的间隔 (秒, 默认 1)")
+    parser_log.add_argument("-v", "--verbose", action="store_true", help="逐条打印测量值")
+
+    # 子命令: exporter (Prometheus /metrics)
+    parser_exporter = subparsers.add_parser("exporter", help="保持连接，定时刷新测量值并通过 HTTP /metrics 提供给 Prometheus 抓取")
+    exporter_target_group = parser_exporter.add_mutually_exclusive_group()
+    exporter_target_group.add_argument(
+        "-c",
+        "--channel",
+        nargs="+",
+        action=ChannelListAction,
+        default=None,
+        help="通道号 (1-4, 默认 1)，支持多个值，例如 -c 1 2 或 -c 1,2,4",
+    )
+    exporter_target_group.add_argument("-a", "--all", dest="all_channels", action="store_true", help="选择所有通道 (CH1-CH4)")
+    parser_exporter.add_argument("-p", "--param", nargs="+", action=ParameterListAction, default=None, help="测量项 (默认 mean)，同 measure")
+    parser_exporter.add_argument("--interval", type=float, default=1.0, help="刷新间隔 (秒, 默认 1)；抓取只读取最近一次结果")
+    parser_exporter.add_argument("--bind", default="127.0.0.1", help="HTTP 监听地址 (默认 127.0.0.1，0.0.0.0 为所有网卡)")
+    parser_exporter.add_argument("--http-port", type=int, default=9464, help="HTTP 监听端口 (默认 9464)")
+    parser_exporter.add_argument("-v", "--verbose", action="store_true", help="逐次打印刷新结果")
+
+    # 子命令: channel (通道开关，兼容 channel-on 别名)
+    parser_channel = subparsers.add_parser("channel", aliases=["channel-on"], help="Set channel display on/off (panel-like by default)")
+    parser_channel.add_argument("state", nargs="?", default="on", choices=["on", "off"], help="通道状态: on 开启, off 关闭 (默认: on)")
+    channel_target_group = parser_channel.add_mutually_exclusive_group()
+    channel_target_group.add_argument(
+        "-c",
+        "--channel",
+        nargs="+",
+        action=ChannelListAction,
+        default=None,
+        help="Channel number(s) (1-4, default: 1). Supports multiple values, e.g. -c 1 2 or -c 1,2,4",
+    )
+    channel_target_group.add_argument(
+        "-a",
+        "--all",
+        dest="all_channels",
+        action="store_true",
+        help="选择所有通道 (CH1-CH4)",
+    )
+
+    # 子命令: autoset / single / save (耗时操作，以服务请求等待完成)
+    parser_autoset = subparsers.add_parser("autoset", help="自动设置 (:ASETup:EXECute)，等待完成")
+    parser_autoset.add_argument("-t", "--timeout", type=float, default=30.0, help="等待超时 (秒, 默认 30)")
+    parser_single = subparsers.add_parser("single", help="单次触发采集，等待触发后采集停止")
+    parser_single.add_argument("-t", "--timeout", type=float, default=30.0, help="等待超时 (秒, 默认 30)")
+    parser_save = subparsers.add_parser("save", help="把波形/设置保存到仪器的存储介质，等待写入完成")
+    parser_save.add_argument("--type", choices=["binary", "ascii", "setup"], default="binary", help="保存类型 (默认 binary)")
+    parser_save.add_argument("--name", default=None, help="文件名 (默认使用仪器当前设置)")
+    parser_save.add_argument("-t", "--timeout", type=float, default=30.0, help="等待超时 (秒, 默认 30)")
+
+    # 子命令: shot
+    parser_shot = subparsers.add_parser("shot", help="获取屏幕截图")
+    parser_shot.add_argument("-o", "--output", help="保存的文件名 (默认: 自动生成带时间戳的文件名)；连拍时自动追加帧序号")
+    parser_shot.add_argument("--format", choices=["png", "bmp", "jpeg"], default="png",
+                             help="截图格式 (默认 png；bmp 仪器端编码最快，jpeg 数据量最小)")
+    parser_shot.add_argument("--count", type=int, default=1, help="连拍帧数 (默认 1)")
+    parser_shot.add_argument("--interval", type=float, default=0.0, help="连拍时相邻两帧的起始间隔 (秒, 默认 0: 尽快连拍)")
+    parser_shot.add_argument("--no-stop", action="store_true", help="截图期间不暂停采集 (截取运行中的画面)")
+
+    # 子命令: wave
+    parser_wave = subparsers.add_parser("wave", help="读取指定通道的波形数据")
+    wave_target_group = parser_wave.add_mutually_exclusive_group()
+    wave_target_group.add_argument(
+        "-c",
+        "--channel",
+        nargs="+",
+        action=ChannelListAction,
+        default=None,
+        help="通道号 (1-4, 默认 1)，支持多个值，例如 -c 1 2 或 -c 1,2,4",
+    )
+    wave_target_group.add_argument("-a", "--all", dest="all_channels", action="store_true", help="选择所有通道 (CH1-CH4)")
+    parser_wave.add_argument(
+        "-o", "--output",
+        help="保存的文件名 (.npy、.csv 或 .dlmwav, 默认: 自动生成带时间戳的 .npy 文件名；多通道时 .npy 为 通道数×点数 数组；"
+             ".dlmwav 保存原始码值与换算参数)",
+    )
+    parser_wave.add_argument("--format", choices=["word", "byte"], default="word", help="传输格式 (默认 word, 16 bit)")
+    parser_wave.add_argument("--start", type=int, default=0, help="起始数据点 (默认 0)")
+    parser_wave.add_argument("--end", type=int, default=None, help="结束数据点 (默认: 记录末尾)")
+    parser_wave.add_argument("--record", type=int, default=0, help="历史记录编号 (0 为最新, 负数为更早的记录)")
+    parser_wave.add_argument("--compress", choices=["none", "zlib", "zstd"], default="zlib",
+                             help=".dlmwav 的块压缩方式 (默认 zlib；zstd 需要安装 zstandard)")
+    parser_wave.add_argument(
+        "--window", type=int, default=None,
+        help="按 :WAVeform:STARt/END 分段传输，每段的点数 (0 为按吞吐自动调整)；读取范围超过 1000 万点时自动分段，中断后再次执行可续传",
+    )
+
+    # 子命令: history-export (历史记录批量导出)
+    parser_history = subparsers.add_parser("history-export", help="批量导出历史记录波形到单个归档文件 (流式写入)")
+    history_target_group = parser_history.add_mutually_exclusive_group()
+    history_target_group.add_argument(
+        "-c",
+        "--channel",
+        nargs="+",
+        action=ChannelListAction,
+        default=None,
+        help="通道号 (1-4, 默认 1)，支持多个值，例如 -c 1 2 或 -c 1,2,4",
+    )
+    history_target_group.add_argument("-a", "--all", dest="all_channels", action="store_true", help="选择所有通道 (CH1-CH4)")
+    parser_history.add_argument("-o", "--output", help="归档文件名 (默认: DLM_HIST_年月日_时分秒.dlmhist)")
+    parser_history.add_argument("--first", type=int, default=None, help="起始历史记录编号 (默认: 最早的记录)")
+    parser_history.add_argument("--last", type=int, default=0, help="结束历史记录编号 (默认 0, 即最新记录)")
+    parser_history.add_argument("--format", choices=["word", "byte"], default="word", help="传输格式 (默认 word, 16 bit)")
+    parser_history.add_argument("--start", type=int, default=0, help="起始数据点 (默认 0)")
+    parser_history.add_argument("--end", type=int, default=None, help="结束数据点 (默认: 记录末尾)")
+
+    # 子命令: capture (连续单次采集流水线)
+    parser_capture = subparsers.add_parser("capture", help="连续执行单次采集，每次触发后读取测量值与波形，统计每秒触发数与死区时间")
+    capture_target_group = parser_capture.add_mutually_exclusive_group()
+    capture_target_group.add_argument(
+        "-c",
+        "--channel",
+        nargs="+",
+        action=ChannelListAction,
+        default=None,
+        help="通道号 (1-4, 默认 1)，支持多个值，例如 -c 1 2 或 -c 1,2,4",
+    )
+    capture_target_group.add_argument("-a", "--all", dest="all_channels", action="store_true", help="选择所有通道 (CH1-CH4)")
+    parser_capture.add_argument("-p", "--param", nargs="+", action=ParameterListAction, default=None,
+                                help="每次触发后读取的测量项 (同 measure，默认不读取)")
+    parser_capture.add_argument("-o", "--output", help="归档文件名 (默认: DLM_CAP_年月日_时分秒.dlmhist，测量值写入同名 .dlmlog)")
+    parser_capture.add_argument("--no-wave", action="store_true", help="只读取测量值，不传输波形")
+    parser_capture.add_argument("--format", choices=["word", "byte"], default="word", help="波形传输格式 (默认 word, 16 bit)")
+    parser_capture.add_argument("--count", type=int, default=None, help="采集次数上限 (默认不限)")
+    parser_capture.add_argument("--duration", type=float, default=None, help="运行时长 (秒, 默认不限，Ctrl+C 结束)")
+    parser_capture.add_argument("-t", "--timeout", type=float, default=10.0, help="每次等待触发的超时 (秒, 默认 10)")
+    parser_capture.add_argument("--overlap", action="store_true",
+                                help="读出测量值后立即开始下一次采集，上一次的波形作为历史记录 -1 在采集期间传输")
+    parser_capture.add_argument("-v", "--verbose", action="store_true", help="逐次打印死区时间与测量值")
+
+    # 子命令: multi (多台示波器并发执行)
+    parser_multi = subparsers.add_parser("multi", help="对多台示波器并发执行同一子命令，汇总结果与耗时")
+    parser_multi.add_argument("--ip", dest="multi_ip", action="append", help="目标 IP 地址，可重复指定或逗号分隔")
+    parser_multi.add_argument("--serial", dest="multi_serial", action="append", help="目标 USB 序列号，可重复指定或逗号分隔")
+    parser_multi.add_argument("multi_args", nargs=argparse.REMAINDER, help="要执行的子命令及其参数，例如 measure -a -p mean rms")
+
+    return parser, subparsers
+
+
+def run_command(controller, args):
+    """在已连接的 controller 上执行子命令，返回是否成功"""
+    controller.state.reset_counters()
+    success = _dispatch(controller, args)
+    # 省略统计只在非 clean 输出时打印，避免影响 mean/rms/measure 的结果解析
+    if controller.state.elided and (args.command not in CLEAN_COMMANDS or getattr(args, "verbose", False)):
+        print(f"设置缓存: 省略 {controller.state.elided} 条重复设置指令 (实际发送 {controller.state.sent} 条)")
+    return success
+
+
+def _dispatch(controller, args):
+    if args.command == "mean":
+        return controller.cmd_get_mean()
+    elif args.command == "rms":
+        return controller.cmd_get_rms()
+    elif args.command in ("channel", "channel-on"):
+        return controller.cmd_channel_set()
+    elif args.command == "shot":
+        return controller.cmd_get_screenshot()
+    elif args.command == "wave":
+        return controller.cmd_get_waveform()
+    elif args.command == "measure":
+        return controller.cmd_measure()
+    elif args.command == "log":
+        return controller.cmd_log()
+    elif args.command == "history-export":
+        return controller.cmd_history_export()
+    elif args.command == "exporter":
+        return controller.cmd_exporter()
+    elif args.command == "capture":
+        return controller.cmd_capture()
+    elif args.command == "autoset":
+        return controller.cmd_autoset()
+    elif args.command == "single":
+        return controller.cmd_single()
+    elif args.command == "save":
+        return controller.cmd_save()
+    return False
+
+
+def cmd_multi(parser, args, controller_factory):
+    """对多台示波器并发执行同一子命令"""
+    import scope_multi
+
+    sub_args = parser.parse_args(args.multi_args)
+    # 写在 multi 之前的传输参数与 --trace/--stats 对所有目标生效
+    sub_args.transport = args.transport
+    sub_args.port = args.port
+    sub_args.trace = args.trace
+    sub_args.stats = args.stats
+    if sub_args.command not in scope_multi.MULTI_COMMANDS:
+        parser.error(f"multi 不支持子命令: {sub_args.command} (支持: {', '.join(scope_multi.MULTI_COMMANDS)})")
+
+    targets = scope_multi.parse_targets(
+        ips=args.multi_ip, serials=args.multi_serial, resources=getattr(args, "multi_resource", None)
+    )
+    if not targets:
+        parser.error("multi 至少需要一个目标设备")
+
+    ok = scope_multi.run_multi(sub_args, targets, controller_factory, run_command, CLEAN_COMMANDS)
+    return 0 if ok else 1
+
+
+def execute(controller, args):
+    """连接 -> 执行子命令 -> 断开，返回退出码"""
+    # mean/rms/measure 命令默认 quiet (clean)，除非 verbose
+    # shot 命令默认 verbose (不 quiet)
+    quiet_mode = args.command in CLEAN_COMMANDS and not args.verbose
+
+    if not controller.connect(quiet=quiet_mode):
+        if quiet_mode:
+            print("Error")
+        else:
+            print("连接失败。")
+        controller.finish_trace()
+        return 1
+
+    op_ok = False
+    try:
+        with controller.trace_span(args.command, "command"):
+            op_ok = run_command(controller, args)
+    finally:
+        controller.close(quiet=quiet_mode)
+        controller.finish_trace()
+
+    return 0 if op_ok else 1
@@ -0,0 +1,189 @@
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import threading
+
+# 守护进程默认监听的 Unix socket 路径，可通过环境变量 YOKOGAWA_SOCKET 覆盖
+SOCKET_ENV = "YOKOGAWA_SOCKET"
+# 客户端连接守护进程的超时 (秒)；请求发出后不限时等待应答，截图、长记录波形等长操作由守护进程内部的仪器超时控制
+CONNECT_TIMEOUT = 0.2
+
+
+def default_socket_path():
+    """返回守护进程的默认 socket 路径"""
+    path = os.environ.get(SOCKET_ENV)
+    if path:
+        return path
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    # 与 tempfile.gettempdir() 在 Linux 上的结果一致，但不必为此导入 tempfile (启动路径上约 5 ms)
+    tmp_dir = os.environ.get("TMPDIR") or os.environ.get("TEMP") or os.environ.get("TMP") or "/tmp"
+    return os.path.join(tmp_dir, f"yokogawa-{uid}.sock")
+
+
+def connection_target(args):
+    """提取决定目标设备的参数，用于确认守护进程连接的是同一台设备"""
+    return {
+        "ip": getattr(args, "ip", None),
+        "serial": getattr(args, "serial", None),
+        "resource": getattr(args, "resource", None),
+        "transport": getattr(args, "transport", None),
+        "port": getattr(args, "port", None),
+    }
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+        except ValueError:
+            response = {"code": None, "error": "invalid request"}
+        else:
+            response = self.server.execute(request)
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """持有一个已连接的 ScopeController，按顺序执行客户端转发来的子命令"""
+
+    daemon_threads = True
+
+    def __init__(self, path, controller, parser, run_command):
+        self.controller = controller
+        self.parser = parser
+        self.run_command = run_command
+        self.target = connection_target(controller.args)
+        self.lock = threading.Lock()
+        self.stale = False
+        self.requests_served = 0
+        super().__init__(path, _RequestHandler)
+
+    def execute(self, request):
+        """执行一次转发请求，返回 {"code", "output"}；code 为 None 表示客户端应自行处理"""
+        if request.get("target") != self.target:
+            return {"code": None, "error": "target mismatch"}
+
+        # 同一时刻只允许一个子命令占用仪器会话
+        with self.lock:
+            if self.stale:
+                self.controller.close(quiet=True)
+                if not self.controller.connect(quiet=True, prefetch_state=True):
+                    return {"code": None, "error": "reconnect failed"}
+                self.stale = False
+
+            output = io.StringIO()
+            code = 1
+            cwd = os.getcwd()
+            # 只有子命令抛出异常或发生传输层错误时会话状态才未知；参数错误、测量无效等普通失败不必重新连接
+            failed = False
+            self.controller.io_error = False
+            try:
+                with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+                    try:
+                        args = self.parser.parse_args(request.get("argv", []))
+                    except SystemExit as exc:
+                        code = exc.code if isinstance(exc.code, int) else 2
+                    else:
+                        if request.get("cwd"):
+                            # 相对路径 (如 shot -o) 按客户端的工作目录解析
+                            os.chdir(request["cwd"])
+                        self.controller.args = args
+                        # 两次请求之间可能有面板操作，不沿用上一个请求缓存的波形换算参数
+                        self.controller.conversion_cache.clear()
+                        # 设置缓存只在面板可能被操作过 (本地模式/校准/自检) 时丢弃面板可修改的部分
+                        if self.controller.state.has_panel_settings():
+                            self.controller.check_panel()
+                        ok = self.run_command(self.controller, args)
+                        code = 0 if ok else 1
+            except Exception as e:
+                output.write(f"守护进程执行出错: {e}\n")
+                code = 1
+                failed = True
+            finally:
+                os.chdir(cwd)
+
+            # 会话状态未知 (可能残留未读应答)，下一个请求前重新建立连接
+            if failed or self.controller.io_error:
+                self.stale = True
+            self.requests_served += 1
+            return {"code": code, "output": output.getvalue()}
+
+
+def serve(controller, parser, run_command, path, quiet=False):
+    """在 path 上启动守护进程，直到收到 Ctrl+C"""
+    if os.path.exists(path):
+        # 残留的 socket 文件：先确认是否已有守护进程在运行
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.settimeout(CONNECT_TIMEOUT)
+            probe.connect(path)
+        except OSError:
+            os.unlink(path)
+        else:
+            print(f"守护进程已在运行: {path}")
+            return False
+        finally:
+            probe.close()
+
+    # 在 0600 权限下创建 socket：先 bind 再 chmod 会留下一段其他本地用户可以连接的窗口
+    # (默认路径在共享的 /tmp，连接者可在仪器上执行子命令并让守护进程在其指定的目录写文件)
+    previous_umask = os.umask(0o177)
+    try:
+        server = DaemonServer(path, controller, parser, run_command)
+    finally:
+        os.umask(previous_umask)
+    if not quiet:
+        print(f"守护进程已启动，监听: {path} (Ctrl+C 退出)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        if not quiet:
+            print(f"守护进程已退出，共处理 {server.requests_served} 个请求")
+    return True
+
+
+def forward(path, argv, target):
+    """把子命令转发给守护进程；守护进程不可用时返回 None，由调用方直接连接设备"""
+    if not path or not os.path.exists(path):
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            sock.connect(path)
+        except OSError:
+            return None
+
+        request = {"argv": list(argv), "target": target, "cwd": os.getcwd()}
+        # 请求发出后守护进程可能要操作仪器很久 (--timeout、长记录)，不设应答超时
+        sock.settimeout(None)
+        try:
+            sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            with sock.makefile("rb") as reader:
+                line = reader.readline()
+        except OSError as e:
+            # 请求已发出，守护进程可能仍在操作仪器，不能再回退到直连
+            return 1, f"守护进程无响应: {e}\n"
+    finally:
+        sock.close()
+
+    try:
+        response = json.loads(line)
+    except ValueError:
+        return None
+    if response.get("code") is None:
+        return None
+    return response["code"], response.get("output", "")
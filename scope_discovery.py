@@ -0,0 +1,221 @@
+import json
+import os
+import socket
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 序列号 -> VISA 资源字符串 的磁盘缓存，可通过环境变量 YOKOGAWA_DISCOVERY_CACHE 指定路径
+CACHE_ENV = "YOKOGAWA_DISCOVERY_CACHE"
+# 缓存有效期 (秒)；过期后重新枚举，打开失败时立即作废对应条目
+CACHE_TTL = 24 * 3600
+# *IDN? 探测的超时 (ms) 与并发数
+PROBE_TIMEOUT = 200
+PROBE_WORKERS = 16
+# 局域网内 LXI/SCPI 仪器通过 mDNS 公告的服务类型
+MDNS_SERVICE_TYPES = (
+    "_lxi._tcp.local.",
+    "_vxi-11._tcp.local.",
+    "_scpi-raw._tcp.local.",
+    "_hislip._tcp.local.",
+)
+MDNS_TIMEOUT = 1.5
+
+
+def default_cache_path():
+    """返回发现缓存的默认路径 ($XDG_CACHE_HOME/yokogawa/discovery.json)"""
+    path = os.environ.get(CACHE_ENV)
+    if path:
+        return path
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "yokogawa", "discovery.json")
+
+
+def hex_serial(serial):
+    """部分系统/驱动把序列号显示为 Hex 字符串，例如 90Y701585 -> 393059373031353835"""
+    return "".join("{:02X}".format(ord(c)) for c in serial)
+
+
+def serial_in_resource(serial, resource):
+    """USB 资源字符串中是否包含该序列号 (原样或 Hex 编码)"""
+    return "USB" in resource and (serial in resource or hex_serial(serial) in resource)
+
+
+def serial_from_idn(idn):
+    """从 *IDN? 应答 (厂商,型号,序列号,固件) 中取出序列号"""
+    fields = [field.strip() for field in (idn or "").split(",")]
+    return fields[2] if len(fields) >= 3 and fields[2] else None
+
+
+class DiscoveryCache:
+    """序列号 -> 资源字符串 的缓存，条目超过 ttl 秒后视为失效"""
+
+    def __init__(self, path=None, ttl=CACHE_TTL):
+        self.path = path or default_cache_path()
+        self.ttl = ttl
+        self.entries = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            if isinstance(entries, dict):
+                self.entries = entries
+        except (OSError, ValueError):
+            pass
+
+    def get(self, serial):
+        entry = self.entries.get(serial)
+        if not entry or time.time() - entry.get("time", 0) > self.ttl:
+            return None
+        return entry.get("resource")
+
+    def put(self, serial, resource, idn=None):
+        self.entries[serial] = {"resource": resource, "idn": idn, "time": time.time()}
+        self.save()
+
+    def invalidate(self, serial):
+        if self.entries.pop(serial, None) is not None:
+            self.save()
+
+    def save(self):
+        # 先写临时文件再替换，避免并发进程读到半个文件
+        try:
+            cache_dir = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=".discovery-")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+
+def probe_idn(rm, resource, timeout=PROBE_TIMEOUT):
+    """以短超时打开资源并查询 *IDN?，失败返回 None"""
+    try:
+        with rm.open_resource(resource) as inst:
+            inst.timeout = timeout
+            inst.read_termination = "\n"
+            inst.write_termination = "\n"
+            return inst.query("*IDN?").strip()
+    except Exception:
+        return None
+
+
+def probe_resources(rm, resources, timeout=PROBE_TIMEOUT, workers=PROBE_WORKERS):
+    """并发探测多个资源的 *IDN?，按输入顺序返回 [(resource, idn 或 None), ...]
+
+    总耗时约为最慢的一个资源，而不是各资源超时之和。
+    """
+    resources = list(resources)
+    if not resources:
+        return []
+    with ThreadPoolExecutor(max_workers=min(workers, len(resources))) as executor:
+        idns = list(executor.map(lambda res: probe_idn(rm, res, timeout), resources))
+    return list(zip(resources, idns))
+
+
+def browse_lan(timeout=MDNS_TIMEOUT):
+    """通过 mDNS (zeroconf) 发现局域网仪器，返回 VXI-11 资源字符串列表
+
+    未安装 zeroconf 或网络不可用时返回空列表。
+    """
+    try:
+        from zeroconf import ServiceBrowser, ServiceListener, Zeroconf
+    except ImportError:
+        return []
+
+    found = {}
+
+    class _Listener(ServiceListener):
+        def add_service(self, zc, type_, name):
+            found[(type_, name)] = None
+
+        def update_service(self, zc, type_, name):
+            found[(type_, name)] = None
+
+        def remove_service(self, zc, type_, name):
+            pass
+
+    addresses = []
+    try:
+        zc = Zeroconf()
+    except Exception:
+        return []
+    try:
+        ServiceBrowser(zc, list(MDNS_SERVICE_TYPES), _Listener())
+        time.sleep(timeout)
+        for type_, name in list(found):
+            info = zc.get_service_info(type_, name, timeout=int(timeout * 1000))
+            if not info:
+                continue
+            for address in info.parsed_addresses():
+                if address not in addresses:
+                    addresses.append(address)
+    except Exception:
+        pass
+    finally:
+        zc.close()
+
+    # 只保留 IPv4，VXI-11 资源字符串不接受 IPv6 字面量
+    ipv4 = []
+    for address in addresses:
+        try:
+            socket.inet_aton(address)
+        except OSError:
+            continue
+        ipv4.append(address)
+    return [f"TCPIP::{address}::INSTR" for address in ipv4]
+
+
+def discover(rm, lan=True, timeout=PROBE_TIMEOUT, mdns_timeout=MDNS_TIMEOUT, cache=None):
+    """枚举 VISA 资源 (可选加上 mDNS 发现的局域网仪器) 并并发探测 *IDN?
+
+    返回 [(resource, idn 或 None), ...]；传入 cache 时顺便刷新 序列号 -> 资源 的缓存。
+    """
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # mDNS 需要等待应答，与本地枚举同时进行
+        lan_future = executor.submit(browse_lan, mdns_timeout) if lan else None
+        try:
+            resources = list(rm.list_resources())
+        except Exception:
+            resources = []
+        if lan_future:
+            resources.extend(res for res in lan_future.result() if res not in resources)
+
+    results = probe_resources(rm, resources, timeout)
+    if cache is not None:
+        for resource, idn in results:
+            serial = serial_from_idn(idn)
+            if serial:
+                cache.entries[serial] = {"resource": resource, "idn": idn, "time": time.time()}
+        cache.save()
+    return results
+
+
+def find_resource(rm, serial, lan=True, timeout=PROBE_TIMEOUT, mdns_timeout=MDNS_TIMEOUT, cache=None):
+    """按序列号查找资源字符串，找不到返回 (None, 已枚举的资源列表)
+
+    先按资源字符串匹配 USB 设备 (不需要打开设备)；仍未找到时再发现局域网仪器，
+    并发查询 *IDN? 比对序列号。
+    """
+    try:
+        resources = list(rm.list_resources())
+    except Exception:
+        resources = []
+
+    for res in resources:
+        if serial_in_resource(serial, res):
+            if cache is not None:
+                cache.put(serial, res)
+            return res, resources
+
+    if lan:
+        candidates = [res for res in browse_lan(mdns_timeout) if res not in resources]
+        for res, idn in probe_resources(rm, candidates, timeout):
+            if serial_from_idn(idn) == serial:
+                if cache is not None:
+                    cache.put(serial, res, idn)
+                return res, resources + candidates
+        resources += candidates
+
+    return None, resources
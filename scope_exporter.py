@@ -0,0 +1,185 @@
+import http.server
+import math
+import threading
+import time
+
+import scope_logger
+import scope_measure
+
+# Prometheus 文本格式 (0.0.4)，OpenMetrics 抓取端同样接受
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def format_value(value):
+    """Prometheus 样本值：NaN/Inf 使用规定的拼写"""
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class MeasurementPoller:
+    """后台按固定间隔刷新测量快照 (每次刷新一次 measure_snapshot)，并预先渲染 /metrics 文本
+
+    抓取只读取最近一次渲染好的字节串，不访问仪器，任意多个并发抓取都不会增加仪器查询。
+    """
+
+    def __init__(self, controller, items, interval):
+        self.controller = controller
+        self.items = items
+        self.interval = interval
+        self.values = [math.nan] * len(items)
+        self.up = False
+        self.last_success = 0.0
+        self.last_duration = 0.0
+        self.duration_sum = 0.0
+        self.refreshes = 0
+        self.errors = 0
+        # 上一次刷新失败 (会话中可能残留超时后迟到的应答) 时为 True，下一次刷新前重新连接
+        self.stale = False
+        self.reconnects = 0
+        self.missed = 0
+        self.scrapes = 0
+        # 抓取在 HTTP 服务的各请求线程中计数
+        self.scrape_lock = threading.Lock()
+        self.payload = self.render()
+
+    def refresh(self):
+        """刷新一次；上一次失败时先重新连接，否则下一次查询会读到迟到的旧应答。返回是否成功"""
+        if self.stale or self.controller.io_error:
+            self.reconnects += 1
+            if not self.controller.reconnect():
+                self.errors += 1
+                self.up = False
+                self.payload = self.render()
+                return False
+            self.stale = False
+
+        t0 = time.perf_counter()
+        try:
+            values = self.controller.measure_snapshot(self.items)
+        except Exception:
+            self.errors += 1
+            self.stale = True
+            self.up = False
+            self.payload = self.render()
+            raise
+        self.last_duration = time.perf_counter() - t0
+        self.duration_sum += self.last_duration
+        self.refreshes += 1
+        self.values = values
+        self.up = True
+        self.last_success = time.time()
+        self.payload = self.render()
+        return True
+
+    def scraped(self):
+        """记录一次抓取，返回最近一次渲染好的 /metrics 文本"""
+        with self.scrape_lock:
+            self.scrapes += 1
+        return self.payload
+
+    def render(self):
+        """渲染 Prometheus 文本 (bytes)"""
+        lines = [
+            "# HELP dlm_up 最近一次刷新是否成功 (1 成功, 0 失败)",
+            "# TYPE dlm_up gauge",
+            f"dlm_up {int(self.up)}",
+            "# HELP dlm_measurement_value 测量值 (:MEASure:CHANnel<x>:<parameter>:VALue?)，刷新失败时保留上一次的值",
+            "# TYPE dlm_measurement_value gauge",
+        ]
+        for (channel, parameter), value in zip(self.items, self.values):
+            lines.append(f'dlm_measurement_value{{channel="{channel}",parameter="{parameter}"}} {format_value(value)}')
+        lines += [
+            "# HELP dlm_last_success_timestamp_seconds 最近一次成功刷新的 UNIX 时间",
+            "# TYPE dlm_last_success_timestamp_seconds gauge",
+            f"dlm_last_success_timestamp_seconds {format_value(self.last_success)}",
+            "# HELP dlm_refresh_duration_seconds 每次刷新 (一次测量快照查询) 的耗时",
+            "# TYPE dlm_refresh_duration_seconds summary",
+            f"dlm_refresh_duration_seconds_sum {format_value(self.duration_sum)}",
+            f"dlm_refresh_duration_seconds_count {self.refreshes}",
+            "# HELP dlm_refresh_last_duration_seconds 最近一次成功刷新的耗时",
+            "# TYPE dlm_refresh_last_duration_seconds gauge",
+            f"dlm_refresh_last_duration_seconds {format_value(self.last_duration)}",
+            "# HELP dlm_refresh_errors_total 刷新失败次数",
+            "# TYPE dlm_refresh_errors_total counter",
+            f"dlm_refresh_errors_total {self.errors}",
+            "# HELP dlm_refresh_missed_total 因上一次刷新超时而跳过的刷新时隙",
+            "# TYPE dlm_refresh_missed_total counter",
+            f"dlm_refresh_missed_total {self.missed}",
+            "# HELP dlm_reconnects_total 重新连接次数",
+            "# TYPE dlm_reconnects_total counter",
+            f"dlm_reconnects_total {self.reconnects}",
+        ]
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def _respond(self, send_body):
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            body, content_type, status = self.server.poller.scraped(), CONTENT_TYPE, 200
+        elif path == "/":
+            body, content_type, status = b'<a href="/metrics">/metrics</a>\n', "text/html; charset=utf-8", 200
+        else:
+            body, content_type, status = b"not found\n", "text/plain; charset=utf-8", 404
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 抓取请求很频繁，不逐条打印访问日志
+        pass
+
+
+class MetricsServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    # 默认的 listen 队列只有 5，大量并发抓取时 SYN 被丢弃，客户端要等约 1 s 重传
+    request_queue_size = 128
+
+    def __init__(self, address, poller):
+        self.poller = poller
+        super().__init__(address, _MetricsHandler)
+
+
+def run_exporter(controller, items, bind, port, interval, verbose=False):
+    """后台线程提供 /metrics，当前线程按 interval 刷新测量值，直到 Ctrl+C；返回是否成功"""
+    poller = MeasurementPoller(controller, items, interval)
+    server = MetricsServer((bind, port), poller)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True)
+    thread.start()
+    columns = ", ".join(scope_measure.column_name(*item) for item in items)
+    print(f"导出服务已启动: http://{bind}:{server.server_address[1]}/metrics，每 {interval:g} s 刷新 ({columns}) (Ctrl+C 退出)")
+
+    scheduler = scope_logger.FixedRateScheduler(1.0 / interval)
+    try:
+        while True:
+            scheduler.wait()
+            poller.missed = scheduler.missed
+            try:
+                poller.refresh()
+            except Exception as e:
+                if verbose:
+                    print(f"刷新出错: {e}")
+                continue
+            if verbose:
+                print(scope_measure.format_snapshot(items, poller.values))
+    except KeyboardInterrupt:
+        print("")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print(f"导出服务已退出: 刷新 {poller.refreshes} 次, 失败 {poller.errors} 次, 重连 {poller.reconnects} 次, "
+          f"抓取 {poller.scrapes} 次")
+    return poller.refreshes > 0
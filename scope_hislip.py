@@ -0,0 +1,69 @@
+# HiSLIP (IVI-6.1) 协议常量与报文编解码，HislipTransport 与本地 HiSLIP 假示波器共用
+import socket
+import struct
+
+HISLIP_PORT = 4880
+PROTOCOL_VERSION = 0x0100
+VENDOR_ID = b"PY"
+DEFAULT_SUB_ADDRESS = "hislip0"
+# 报文序号从 0xFFFFFF00 开始，每发送一条 Data/DataEND 加 2
+INITIAL_MESSAGE_ID = 0xFFFFFF00
+
+# 报文头: "HS" + 类型 + 控制码 + 参数 (uint32) + 负载长度 (uint64)，大端
+HEADER = struct.Struct(">2sBBIQ")
+PROLOGUE = b"HS"
+
+# 报文类型
+INITIALIZE = 0
+INITIALIZE_RESPONSE = 1
+FATAL_ERROR = 2
+ERROR = 3
+DATA = 6
+DATA_END = 7
+ASYNC_MAXIMUM_MESSAGE_SIZE = 15
+ASYNC_MAXIMUM_MESSAGE_SIZE_RESPONSE = 16
+ASYNC_INITIALIZE = 17
+ASYNC_INITIALIZE_RESPONSE = 18
+ASYNC_DEVICE_CLEAR = 19
+ASYNC_SERVICE_REQUEST = 20
+ASYNC_DEVICE_CLEAR_ACKNOWLEDGE = 23
+
+# InitializeResponse 控制码 bit0: 服务器工作在 overlapped 模式
+OVERLAP_MODE = 0x01
+
+
+def pack_message(message_type, control=0, parameter=0, payload=b""):
+    return HEADER.pack(PROLOGUE, message_type, control, parameter & 0xFFFFFFFF, len(payload)) + payload
+
+
+def recv_exact(sock, n):
+    """从 socket 读取恰好 n 字节"""
+    buf = bytearray(n)
+    view = memoryview(buf)
+    received = 0
+    while received < n:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            raise ConnectionError("HiSLIP 连接已关闭")
+        received += count
+    return bytes(buf)
+
+
+def recv_header(sock):
+    """读取一个报文头，返回 (type, control, parameter, payload_len)"""
+    prologue, message_type, control, parameter, length = HEADER.unpack(recv_exact(sock, HEADER.size))
+    if prologue != PROLOGUE:
+        raise ConnectionError("HiSLIP 报文头无效")
+    return message_type, control, parameter, length
+
+
+def recv_message(sock):
+    """读取一条完整报文，返回 (type, control, parameter, payload)"""
+    message_type, control, parameter, length = recv_header(sock)
+    return message_type, control, parameter, recv_exact(sock, length) if length else b""
+
+
+def connect(host, port, timeout):
+    sock = socket.create_connection((host, port), timeout=timeout)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return sock
@@ -0,0 +1,166 @@
+import json
+import os
+import struct
+import sys
+import time
+
+# 历史波形归档文件格式 (流式追加，定长记录):
+#   第 1 行: HISTORY_MAGIC
+#   第 2 行: JSON 头 {"channels", "format", "points", "vrange", "offset", "sample_rate", ...}
+#   之后: 定长记录，每条为
+#         record (int64, 历史记录编号) + time (float64, 当天秒数) + stamp (32 字节, :HISTory:TIME? 原始应答)
+#         + 各通道的 :WAVeform:SEND? 原始码值 (channels × points, little-endian)
+# 读取时按结构化 dtype 整体 memmap，码值用 scope_waveform.decode_waveform 换算为物理值
+HISTORY_MAGIC = b"DLMHIST1\n"
+RECORD_HEADER = struct.Struct("<qd32s")
+CODE_DTYPE = {"WORD": "<i2", "BYTE": "i1"}
+CODE_SIZE = {"WORD": 2, "BYTE": 1}
+# 进度输出间隔 (秒)
+PROGRESS_INTERVAL = 1.0
+
+
+def parse_history_time(text):
+    """把 :HISTory:TIME? 应答 (如 "-100 10:20:30.400") 中的时刻换算为当天秒数，无法解析时返回 NaN"""
+    for token in text.strip().strip('"').split():
+        if token.count(":") == 2:
+            try:
+                hours, minutes, seconds = token.split(":")
+                return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+            except ValueError:
+                break
+    return float("nan")
+
+
+class HistoryArchive:
+    """流式写入的历史波形归档，每条记录直接写入块数据，内存占用与记录数无关"""
+
+    def __init__(self, path, channels, fmt, points, metadata=None):
+        self.path = path
+        self.channels = list(channels)
+        self.fmt = fmt
+        self.points = points
+        self.payload_size = points * CODE_SIZE[fmt]
+        self.records = 0
+        self.bytes = 0
+
+        output_dir = os.path.dirname(os.path.abspath(path))
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        header = dict(metadata or {})
+        header.update({
+            "channels": self.channels,
+            "format": fmt,
+            "points": points,
+            "record_size": RECORD_HEADER.size + self.payload_size * len(self.channels),
+            "created": time.time(),
+        })
+        self.file = open(path, "wb")
+        self.file.write(HISTORY_MAGIC + json.dumps(header).encode("utf-8") + b"\n")
+
+    def append(self, record, stamp, payloads):
+        """写入一条记录；payloads 为各通道的块数据 (顺序与 channels 一致)"""
+        for channel, payload in zip(self.channels, payloads):
+            if len(payload) != self.payload_size:
+                raise ValueError(f"记录 {record} CH{channel} 数据长度 {len(payload)} 与预期 {self.payload_size} 不符")
+        self.file.write(RECORD_HEADER.pack(record, parse_history_time(stamp), stamp.encode("ascii", "replace")[:32]))
+        for payload in payloads:
+            self.file.write(payload)
+        self.records += 1
+        self.bytes += self.payload_size * len(payloads)
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+def read_history_header(path):
+    """读取归档头，返回 (header, 数据区起始偏移)"""
+    with open(path, "rb") as f:
+        if f.readline() != HISTORY_MAGIC:
+            raise ValueError(f"不是历史波形归档文件: {path}")
+        header = json.loads(f.readline())
+        return header, f.tell()
+
+
+def read_history(path):
+    """以 NumPy 结构化数组 (memmap, 只读) 读取归档，返回 (header, records)
+
+    records["codes"] 的形状为 (记录数, 通道数, 点数)；异常中断时残留的半条记录被忽略。
+    """
+    import numpy as np
+
+    header, data_offset = read_history_header(path)
+    dtype = np.dtype([
+        ("record", "<i8"),
+        ("time", "<f8"),
+        ("stamp", "S32"),
+        ("codes", CODE_DTYPE[header["format"]], (len(header["channels"]), header["points"])),
+    ])
+    count = (os.path.getsize(path) - data_offset) // dtype.itemsize
+    if count == 0:
+        return header, np.zeros(0, dtype=dtype)
+    return header, np.memmap(path, dtype=dtype, mode="r", offset=data_offset, shape=(count,))
+
+
+def run_history_export(controller, channels, path, first, last, fmt="WORD", start=0, end=None):
+    """逐条读取历史记录 first..last 的波形写入归档，结束时打印吞吐统计；返回是否成功
+
+    调用前示波器须已停止采集。
+    """
+    controller.send(f":WAVeform:FORMat {fmt}")
+    controller.send(":WAVeform:BYTeorder LSBFirst")
+    controller.send(f":WAVeform:TRACe {channels[0]}")
+    length = int(float(controller.query(":WAVeform:LENGth?")))
+    end = length - 1 if end is None else end
+    controller.send(f":WAVeform:STARt {start}")
+    controller.send(f":WAVeform:END {end}")
+
+    sample_rate = float(controller.query(":WAVeform:SRATe?"))
+    parameters = controller.waveform_parameters(channels)
+    vranges = [parameters[channel][0] for channel in channels]
+    offsets = [parameters[channel][1] for channel in channels]
+
+    total = last - first + 1
+    archive = HistoryArchive(path, channels, fmt, end - start + 1, metadata={
+        "vrange": vranges,
+        "offset": offsets,
+        "sample_rate": sample_rate,
+        "start": start,
+        "end": end,
+        "first": first,
+        "last": last,
+    })
+    print(f"导出历史记录 {first}..{last} (共 {total} 条)，通道: {', '.join(f'CH{c}' for c in channels)}，"
+          f"每条 {archive.points} 点，输出: {os.path.abspath(path)}")
+
+    # 每个通道一个可复用的接收缓冲区 (多留 1 字节给 tmctl 的块结束符)，逐条记录不再分配内存
+    buffers = [bytearray(archive.payload_size + 1) for _ in channels]
+    started = time.perf_counter()
+    last_report = started
+    try:
+        for record in range(first, last + 1):
+            stamp = controller.query(f":HISTory:TIME? {record}")
+            payloads = []
+            for channel, buffer in zip(channels, buffers):
+                controller.send(f":WAVeform:TRACe {channel};:WAVeform:RECord {record};:WAVeform:SEND?")
+                payloads.append(controller.read_block(buffer=buffer))
+            archive.append(record, stamp, payloads)
+
+            now = time.perf_counter()
+            if now - last_report >= PROGRESS_INTERVAL:
+                last_report = now
+                elapsed = now - started
+                sys.stdout.write(f"\r进度: {archive.records}/{total} 条, "
+                                 f"{archive.bytes / elapsed / 1e6:.1f} MB/s, {archive.records / elapsed:.1f} 条/s")
+                sys.stdout.flush()
+    except KeyboardInterrupt:
+        print("\n已中断，保留已导出的记录")
+    finally:
+        archive.close()
+
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    print(f"\n导出完成: {archive.records}/{total} 条, {archive.bytes} bytes, 用时 {elapsed:.2f} s")
+    print(f"吞吐: {archive.bytes / elapsed / 1e6:.1f} MB/s, {archive.records / elapsed:.1f} 条/s")
+    return archive.records == total
@@ -0,0 +1,189 @@
+import array
+import json
+import math
+import os
+import struct
+import time
+
+import scope_measure
+
+# 测量日志文件格式 (追加写入，定长记录):
+#   第 1 行: LOG_MAGIC
+#   第 2 行: JSON 头 {"columns": [...], "record_size": N, "created": ...}
+#   之后: 定长记录，每条为 len(columns) 个 little-endian float64
+#         (time=UNIX 时间戳秒, latency=本次查询耗时秒, 其余为测量值)
+LOG_MAGIC = b"DLMLOG1\n"
+LOG_FIXED_COLUMNS = ("time", "latency")
+# 连续读取失败达到该次数时停止记录 (链路已断开时不无限重试)
+MAX_CONSECUTIVE_ERRORS = 10
+
+
+class MeasurementLog:
+    """追加写入的定长二进制测量日志，按时间间隔批量刷新到磁盘"""
+
+    def __init__(self, path, columns, flush_interval=1.0):
+        self.path = path
+        self.columns = list(LOG_FIXED_COLUMNS) + list(columns)
+        self.record = struct.Struct("<" + "d" * len(self.columns))
+        self.flush_interval = flush_interval
+        self.records = 0
+
+        output_dir = os.path.dirname(os.path.abspath(path))
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            existing_columns, data_offset = read_log_header(path)
+            if existing_columns != self.columns:
+                raise ValueError(f"日志文件列与本次配置不一致: {path}")
+            # 丢弃异常中断时残留的半条记录，保证追加后仍按记录对齐
+            usable = (os.path.getsize(path) - data_offset) // self.record.size
+            self.file = open(path, "r+b")
+            self.file.truncate(data_offset + usable * self.record.size)
+            self.file.seek(0, os.SEEK_END)
+        else:
+            self.file = open(path, "wb")
+            header = {"columns": self.columns, "record_size": self.record.size, "created": time.time()}
+            self.file.write(LOG_MAGIC + json.dumps(header).encode("utf-8") + b"\n")
+        self.last_flush = time.monotonic()
+
+    def append(self, timestamp, latency, values):
+        self.file.write(self.record.pack(timestamp, latency, *values))
+        self.records += 1
+        now = time.monotonic()
+        if now - self.last_flush >= self.flush_interval:
+            self.file.flush()
+            self.last_flush = now
+
+    def close(self):
+        if self.file:
+            self.file.flush()
+            self.file.close()
+            self.file = None
+
+
+def read_log_header(path):
+    """读取日志头，返回 (columns, 数据区起始偏移)"""
+    with open(path, "rb") as f:
+        if f.readline() != LOG_MAGIC:
+            raise ValueError(f"不是测量日志文件: {path}")
+        header = json.loads(f.readline())
+        return header["columns"], f.tell()
+
+
+def read_log(path):
+    """以 NumPy 结构化数组 (memmap, 只读) 读取日志，列名与文件头一致"""
+    import numpy as np
+
+    columns, data_offset = read_log_header(path)
+    dtype = np.dtype([(name, "<f8") for name in columns])
+    count = (os.path.getsize(path) - data_offset) // dtype.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=data_offset, shape=(count,))
+
+
+class FixedRateScheduler:
+    """无累计漂移的定速调度器：第 k 次的截止时间固定为 start + k*period
+
+    若某次执行超时错过了后续时隙，则跳到下一个未来时隙，并计入 missed。
+    """
+
+    def __init__(self, rate):
+        self.period = 1.0 / rate
+        self.start = None
+        self.index = 0
+        self.missed = 0
+
+    def wait(self):
+        """等待到下一个时隙，返回该时隙的截止时间 (time.monotonic 基准)"""
+        now = time.monotonic()
+        if self.start is None:
+            self.start = now
+            return now
+
+        self.index += 1
+        deadline = self.start + self.index * self.period
+        if now > deadline + self.period:
+            # 已错过至少一个完整时隙：跳过这些时隙，不做补偿性的连续采样
+            skipped = int((now - deadline) / self.period)
+            self.missed += skipped
+            self.index += skipped
+            deadline = self.start + self.index * self.period
+        if deadline > now:
+            time.sleep(deadline - now)
+        return deadline
+
+
+def percentile(sorted_values, q):
+    """已排序序列的百分位数 (线性插值)，q 取 0-100"""
+    if not sorted_values:
+        return float("nan")
+    position = (len(sorted_values) - 1) * q / 100.0
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def run_logging(controller, items, path, rate, duration=None, count=None, flush_interval=1.0, verbose=False):
+    """按固定速率轮询测量快照并写入日志，结束时打印统计；返回是否成功"""
+    columns = [scope_measure.column_name(*item) for item in items]
+    log = MeasurementLog(path, columns, flush_interval=flush_interval)
+    scheduler = FixedRateScheduler(rate)
+    latencies = array.array("d")
+    errors = 0
+    consecutive_errors = 0
+    aborted = False
+    started = time.monotonic()
+
+    print(f"开始记录 {len(items)} 个测量值，目标速率 {rate:g} Hz，输出: {os.path.abspath(path)} (Ctrl+C 结束)")
+    try:
+        while True:
+            if count is not None and log.records >= count:
+                break
+            if duration is not None and time.monotonic() - started >= duration:
+                break
+
+            scheduler.wait()
+            timestamp = time.time()
+            t0 = time.perf_counter()
+            try:
+                values = controller.measure_snapshot(items)
+            except Exception as e:
+                errors += 1
+                consecutive_errors += 1
+                if verbose:
+                    print(f"读取出错: {e}")
+                if consecutive_errors >= MAX_CONSECUTIVE_ERRORS:
+                    print(f"连续 {consecutive_errors} 次读取失败，停止记录")
+                    aborted = True
+                    break
+                # 超时后迟到的应答或读了一半的应答仍留在会话中，不重新连接的话之后每条记录都会错位
+                if not controller.reconnect() and verbose:
+                    print("重新连接失败")
+                continue
+            consecutive_errors = 0
+            latency = time.perf_counter() - t0
+            latencies.append(latency)
+            log.append(timestamp, latency, values)
+
+            if verbose:
+                print(scope_measure.format_snapshot(items, values))
+    except KeyboardInterrupt:
+        print("")
+    finally:
+        log.close()
+
+    elapsed = time.monotonic() - started
+    ordered = sorted(latencies)
+    print(f"记录结束: {log.records} 条记录, 用时 {elapsed:.1f} s")
+    print(f"实际速率: {log.records / elapsed if elapsed > 0 else 0.0:.2f} Hz (目标 {rate:g} Hz)")
+    print(f"错过时隙: {scheduler.missed}, 读取失败: {errors}")
+    if ordered:
+        print("查询延迟: p50={:.2f} ms  p95={:.2f} ms  p99={:.2f} ms  max={:.2f} ms".format(
+            percentile(ordered, 50) * 1000.0,
+            percentile(ordered, 95) * 1000.0,
+            percentile(ordered, 99) * 1000.0,
+            ordered[-1] * 1000.0,
+        ))
+    return log.records > 0 and not aborted
@@ -0,0 +1,119 @@
+import json
+import math
+
+# :MEASure:{CHANnel<x>}:<Parameter>:VALue? 支持的测量项 (见手册 MEASure Group)
+MEASURE_PARAMETERS = (
+    "AMPLitude", "AVERage", "AVGFreq", "AVGPeriod", "BWIDth", "DELay", "DT", "DUTYcycle",
+    "ENUMber", "FALL", "FREQuency", "HIGH", "LOW", "MAXimum", "MINimum", "NOVershoot",
+    "NWIDth", "PERiod", "PNUMber", "POVershoot", "PTOPeak", "PWIDth", "RISE", "RMS",
+    "SDEViation", "TY1Integ", "TY2Integ", "V1", "V2",
+)
+
+# 常用别名，与 mean/rms 子命令的叫法保持一致
+MEASURE_ALIASES = {
+    "mean": "AVERage",
+    "avg": "AVERage",
+    "pp": "PTOPeak",
+    "p-p": "PTOPeak",
+    "freq": "FREQuency",
+    "max": "MAXimum",
+    "min": "MINimum",
+    "amp": "AMPLitude",
+    "duty": "DUTYcycle",
+    "sdev": "SDEViation",
+}
+
+# 单条程序消息 (含结束符) 需小于 1024 字节，否则仪器可能死锁 (见手册 4 章 Deadlock)
+MAX_PROGRAM_MESSAGE = 1024
+
+
+def short_form(mnemonic):
+    """助记符的短形式，例如 AVERage -> AVER"""
+    return "".join(c for c in mnemonic if c.isupper() or c.isdigit())
+
+
+def normalize_parameter(name):
+    """把用户输入的测量项 (别名/长形式/短形式，大小写不敏感) 转换为标准助记符"""
+    key = name.strip()
+    if key.lower() in MEASURE_ALIASES:
+        return MEASURE_ALIASES[key.lower()]
+    for parameter in MEASURE_PARAMETERS:
+        if key.upper() in (parameter.upper(), short_form(parameter)):
+            return parameter
+    raise ValueError(f"不支持的测量项: {name}")
+
+
+def parse_parameter_values(values):
+    """解析 -p 参数，支持多个值或逗号分隔，去重并保持顺序"""
+    parameters = []
+    for value in values:
+        for part in str(value).split(","):
+            if not part.strip():
+                raise ValueError("测量项参数不能为空")
+            parameter = normalize_parameter(part)
+            if parameter not in parameters:
+                parameters.append(parameter)
+    return parameters
+
+
+def measure_query(channel, parameter):
+    """单个测量值的查询指令 (短形式，便于在一条消息中放入更多查询)"""
+    return f":MEAS:CHAN{channel}:{short_form(parameter)}:VAL?"
+
+
+def build_measure_messages(items, prefix="", limit=MAX_PROGRAM_MESSAGE):
+    """把 (channel, parameter) 列表拼接为若干条 ';' 分隔的程序消息
+
+    每条消息连同结束符 (LF) 保持在 limit 字节以内；prefix (如 :COMMunicate:HEADer OFF)
+    只放在第一条消息的开头。返回 [(message, [items...]), ...]。
+    """
+    messages = []
+    current = prefix
+    current_items = []
+
+    for item in items:
+        query = measure_query(*item)
+        candidate = f"{current};{query}" if current else query
+        # +1 为程序消息结束符
+        if len(candidate) + 1 >= limit and current_items:
+            messages.append((current, current_items))
+            current, current_items = query, []
+        else:
+            current = candidate
+        current_items.append(item)
+
+    if current_items:
+        messages.append((current, current_items))
+    return messages
+
+
+def parse_measure_response(response, count):
+    """拆分 ';' 拼接的应答，返回 count 个数值 (非数值返回 NaN)"""
+    parts = [part.strip() for part in response.strip().split(";")]
+    if len(parts) != count:
+        raise ValueError(f"应答数量不匹配: 期望 {count} 个, 实际 {len(parts)} 个")
+
+    values = []
+    for part in parts:
+        try:
+            values.append(float(part))
+        except ValueError:
+            values.append(float("nan"))
+    return values
+
+
+def column_name(channel, parameter):
+    return f"CH{channel}_{parameter}"
+
+
+def format_snapshot(items, values, fmt="csv", header=False):
+    """把一次快照格式化为单行 CSV 或 JSON 文本"""
+    if fmt == "json":
+        row = {column_name(*item): (None if math.isnan(value) else value) for item, value in zip(items, values)}
+        return json.dumps(row)
+
+    lines = []
+    if header:
+        lines.append(",".join(column_name(*item) for item in items))
+    lines.append(",".join("NaN" if math.isnan(value) else repr(value) for value in values))
+    return "\n".join(lines)
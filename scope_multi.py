@@ -0,0 +1,182 @@
+import asyncio
+import copy
+import io
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from scope_controller import ALL_CHANNELS
+from scope_screenshot import IMAGE_EXTENSIONS
+
+# 可以同时下发给多台示波器的子命令
+MULTI_COMMANDS = ("mean", "rms", "measure", "channel", "channel-on", "shot", "wave")
+
+
+class _ThreadOutput(io.TextIOBase):
+    """按线程分流的 stdout：设备线程的输出写入各自的缓冲区，其余线程照常输出"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, text):
+        buffer = getattr(self.local, "buffer", None)
+        (buffer if buffer is not None else self.stream).write(text)
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def parse_targets(ips=None, serials=None, resources=None):
+    """把 --ip/--serial/--resource 列表展开为 [(kind, value), ...]
+
+    --ip/--serial 可逗号分隔；VISA 资源字符串本身可能含逗号 (如 TCPIP::host,port::inst0::INSTR)，不拆分。
+    """
+    targets = []
+    for kind, values in (("ip", ips), ("serial", serials), ("resource", resources)):
+        for value in values or []:
+            for part in [value] if kind == "resource" else str(value).split(","):
+                part = part.strip()
+                if part and (kind, part) not in targets:
+                    targets.append((kind, part))
+    return targets
+
+
+def target_label(kind, value):
+    """文件名安全的设备标签，例如 192.168.1.10 -> 192_168_1_10"""
+    return re.sub(r"[^0-9A-Za-z]+", "_", value).strip("_") or kind
+
+
+def with_label(filename, label):
+    """在扩展名前插入设备标签: screen.png -> screen_<label>.png"""
+    root, ext = os.path.splitext(filename)
+    return f"{root}_{label}{ext}"
+
+
+def default_output(args):
+    """各子命令未指定 -o 时的默认文件名"""
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    if args.command == "wave":
+        channels = ALL_CHANNELS if args.all_channels else (args.channel or [1])
+        return f"DLM_CH{'-'.join(str(c) for c in channels)}_{timestamp}.npy"
+    return f"DLM_{timestamp}{IMAGE_EXTENSIONS[args.format.upper()]}"
+
+
+class AsyncScope:
+    """单台示波器的异步包装
+
+    所有调用都进入该设备专属的单线程执行器，因此同一台设备上的操作天然串行，
+    不同设备之间则并行进行。
+    """
+
+    def __init__(self, label, controller, output):
+        self.label = label
+        self.controller = controller
+        self.output = output
+        self.buffer = io.StringIO()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"scope-{label}")
+        self.timings = {}
+
+    def _run(self, func, args):
+        self.output.local.buffer = self.buffer
+        try:
+            return func(*args)
+        finally:
+            self.output.local.buffer = None
+
+    async def call(self, name, func, *args):
+        """在设备线程上执行 func，并把耗时记入 timings[name]"""
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self.executor, self._run, func, args)
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def _command(self, run_command, args):
+        with self.controller.trace_span(args.command, "command"):
+            return run_command(self.controller, args)
+
+    async def execute(self, args, run_command, quiet):
+        """连接 -> 执行子命令 -> 断开，返回是否成功"""
+        self.controller.args = args
+        try:
+            if not await self.call("connect", self.controller.connect, quiet):
+                self.buffer.write("Error\n" if quiet else "连接失败。\n")
+                return False
+            try:
+                return bool(await self.call("command", self._command, run_command, args))
+            finally:
+                await self.call("close", self.controller.close, quiet)
+        except Exception as e:
+            self.buffer.write(f"执行出错: {e}\n")
+            return False
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+async def _run_all(scopes, target_args, run_command, quiet):
+    return await asyncio.gather(*(scope.execute(args, run_command, quiet) for scope, args in zip(scopes, target_args)))
+
+
+def run_multi(args, targets, controller_factory, run_command, clean_commands=()):
+    """把 args 描述的子命令并发下发给 targets 中的每台示波器，汇总输出与耗时"""
+    quiet = args.command in clean_commands and not getattr(args, "verbose", False)
+    base_output = getattr(args, "output", None)
+
+    target_args = []
+    for kind, value in targets:
+        target = copy.copy(args)
+        target.ip = value if kind == "ip" else None
+        target.serial = value if kind == "serial" else None
+        target.resource = value if kind == "resource" else None
+        if hasattr(target, "output"):
+            target.output = with_label(base_output or default_output(args), target_label(kind, value))
+        if getattr(args, "trace", None):
+            # 每台设备各写一个 trace 文件: multi.json -> multi_<label>.json
+            target.trace = with_label(args.trace, target_label(kind, value))
+        target_args.append(target)
+
+    output = _ThreadOutput(sys.stdout)
+    scopes = [AsyncScope(target_label(kind, value), controller_factory(target), output)
+              for (kind, value), target in zip(targets, target_args)]
+
+    sys.stdout = output
+    start = time.perf_counter()
+    try:
+        results = asyncio.run(_run_all(scopes, target_args, run_command, quiet))
+    finally:
+        sys.stdout = output.stream
+        for scope in scopes:
+            scope.shutdown()
+    total = time.perf_counter() - start
+
+    for (kind, value), scope, ok in zip(targets, scopes, results):
+        print(f"=== {kind}={value} [{'OK' if ok else 'FAIL'}] ===")
+        sys.stdout.write(scope.buffer.getvalue())
+
+    for (kind, value), scope in zip(targets, scopes):
+        if scope.controller.tracer is not None:
+            # 与单台设备时一样输出到 stderr
+            sys.stdout.flush()
+            print(f"=== {kind}={value} trace ===", file=sys.stderr)
+            scope.controller.finish_trace()
+
+    width = max(len(value) for _, value in targets)
+    print("-" * 30)
+    print(f"{'设备':<{width}} {'结果':<6} {'连接':>9} {'命令':>9} {'断开':>9} {'合计':>9}")
+    serial_total = 0.0
+    for (kind, value), scope, ok in zip(targets, scopes, results):
+        timings = scope.timings
+        subtotal = sum(timings.values())
+        serial_total += subtotal
+        print(f"{value:<{width}} {'OK' if ok else 'FAIL':<6} "
+              f"{timings.get('connect', 0.0):8.3f}s {timings.get('command', 0.0):8.3f}s "
+              f"{timings.get('close', 0.0):8.3f}s {subtotal:8.3f}s")
+    print(f"并发总耗时: {total:.3f} s (逐台串行约 {serial_total:.3f} s)")
+    return all(results)
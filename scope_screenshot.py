@@ -0,0 +1,64 @@
+import os
+import queue
+import threading
+import time
+
+# :IMAGe:FORMat 可选格式与保存的扩展名；BMP 不压缩 (仪器端编码最快，传输量最大)，JPEG 数据量最小
+IMAGE_EXTENSIONS = {"PNG": ".png", "BMP": ".bmp", "JPEG": ".jpg"}
+# 后台写盘队列长度：写盘跟不上传输时最多缓存的帧数，超过后传输等待写盘
+WRITE_QUEUE_FRAMES = 8
+
+
+def default_screenshot_filename(fmt="PNG"):
+    """默认文件名: DLM_年月日_时分秒.<ext>"""
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    return f"DLM_{timestamp}{IMAGE_EXTENSIONS[fmt.upper()]}"
+
+
+def numbered_filename(filename, index, count):
+    """连拍时的帧文件名: screen.png -> screen_0001.png (序号位数随帧数增加，单帧时不变)"""
+    if count == 1:
+        return filename
+    root, ext = os.path.splitext(filename)
+    return f"{root}_{index:0{max(4, len(str(count)))}d}{ext}"
+
+
+class FrameWriter:
+    """后台写盘线程：传输下一帧的同时把上一帧写入文件"""
+
+    def __init__(self, maxsize=WRITE_QUEUE_FRAMES):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.error = None
+        self.written = 0
+        self.bytes = 0
+        self.thread = threading.Thread(target=self._run, name="screenshot-writer", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            path, data = item
+            if self.error is not None:
+                continue
+            try:
+                with open(path, "wb") as f:
+                    f.write(data)
+                self.written += 1
+                self.bytes += len(data)
+            except Exception as e:
+                self.error = e
+
+    def put(self, path, data):
+        """提交一帧 (data 在写盘完成前不能被修改)；之前的写盘出错时抛出异常"""
+        if self.error is not None:
+            raise Exception(f"写入文件失败: {self.error}")
+        self.queue.put((path, data))
+
+    def close(self):
+        """等待已提交的帧全部写完；写盘出错时抛出异常"""
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise Exception(f"写入文件失败: {self.error}")
@@ -0,0 +1,454 @@
+"""模拟示波器：按 DLM 常用 SCPI 指令应答，供 --transport sim、假示波器服务与基准测试使用。
+
+每条程序消息可用 ';' 拼接多条指令，查询结果同样以 ';' 拼接后返回；
+块数据 (截图、波形) 按 IEEE 488.2 定长块格式返回。
+"""
+import heapq
+import json
+import os
+import threading
+import time
+
+import scope_state
+import scope_status
+
+IDN_FORMAT = "YOKOGAWA,DLM3054,{serial},F1.00"
+DEFAULT_SERIAL = "90Y701585"
+# 模拟波形：CH4 的 WORD 码值幅度、正弦周期 (点)、采样率与量程
+SINE_AMPLITUDE = 3000.0
+SINE_PERIOD = 1250
+SAMPLE_RATE = 1.25e9
+WAVEFORM_RANGE = 5.0
+
+
+def load_responses(path):
+    """读取应答脚本 (JSON)，返回 {规范化查询头部: 应答}
+
+    脚本格式: {"<查询>": "文本应答" | {"block_file": "文件路径"} | {"block_size": 字节数}}，
+    例如 {":MEASure:CHANnel1:AVERage:VALue?": "1.5E-03", ":IMAGe:SEND?": {"block_file": "screen.png"}}；
+    block_* 以 IEEE 488.2 定长块返回，block_file 的相对路径相对于脚本所在目录。
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        script = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    responses = {}
+    for header, response in script.items():
+        if isinstance(response, dict):
+            if "block_file" in response:
+                with open(os.path.join(base_dir, response["block_file"]), "rb") as block:
+                    response = block.read()
+            else:
+                response = os.urandom(int(response["block_size"]))
+        responses[scope_state.normalize_header(header)] = response
+    return responses
+
+
+def short_header(header):
+    """把 :WAVeform:TRACe 这类助记符转换为短形式 WAV:TRAC (大小写混合时取大写部分)"""
+    nodes = []
+    for node in header.strip().lstrip(":").split(":"):
+        if node.startswith("*"):
+            nodes.append(node.upper())
+        elif any(c.islower() for c in node):
+            nodes.append("".join(c for c in node if c.isupper() or c.isdigit() or c == "?"))
+        else:
+            nodes.append(node.upper())
+    return ":".join(nodes)
+
+
+class StatusRegisters:
+    """状态寄存器模拟：耗时操作登记为 (时刻, 条件位, 电平) 事件，访问寄存器前按当前时刻推进"""
+
+    def __init__(self, condition=0):
+        self.condition = condition
+        # 条件位 -> 转换过滤器 (RISE/FALL/BOTH/NEVER)，未设置的位不锁存
+        self.filters = {}
+        self.eesr = 0
+        self.eese = 0
+        self.esr = 0
+        self.ese = 0
+        self.sre = 0
+        self.events = []
+        self.sequence = 0
+        # *OPC 之后 ESR 的 OPC 位置 1 的时刻
+        self.opc_at = None
+
+    def set(self, mask, level):
+        """改变条件位，按过滤器把转换锁存到扩展事件寄存器"""
+        old = bool(self.condition & mask)
+        if level:
+            self.condition |= mask
+        else:
+            self.condition &= ~mask
+        if old != bool(level) and self.filters.get(mask, "NEVER") in ("RISE" if level else "FALL", "BOTH"):
+            self.eesr |= mask
+
+    def schedule(self, at, mask, level):
+        heapq.heappush(self.events, (at, self.sequence, mask, level))
+        self.sequence += 1
+
+    def cancel(self, mask):
+        """取消 mask 位尚未发生的转换 (例如 :STOP 中止单次采集)"""
+        self.events = [event for event in self.events if event[2] != mask]
+        heapq.heapify(self.events)
+
+    def advance(self, now):
+        while self.events and self.events[0][0] <= now:
+            _, _, mask, level = heapq.heappop(self.events)
+            self.set(mask, level)
+        if self.opc_at is not None and self.opc_at <= now:
+            self.esr |= scope_status.ESR_OPC
+            self.opc_at = None
+
+    def operation_complete(self, now):
+        """*OPC: 已登记的操作全部完成后置位 ESR 的 OPC 位"""
+        self.opc_at = max([now] + [event[0] for event in self.events])
+
+    def next_time(self):
+        """下一次寄存器变化的时刻 (没有待发生的变化时为 None)"""
+        times = [self.events[0][0]] if self.events else []
+        if self.opc_at is not None:
+            times.append(self.opc_at)
+        return min(times, default=None)
+
+    def status_byte(self):
+        stb = 0
+        if self.eesr & self.eese:
+            stb |= scope_status.STB_EES
+        if self.esr & self.ese:
+            stb |= scope_status.STB_ESB
+        if stb & self.sre:
+            stb |= scope_status.STB_RQS
+        return stb
+
+
+class SimulatedScope:
+    """模拟示波器的仪器状态与指令应答
+
+    :ASETup:EXECute、单次采集与 :FILE:SAVE:...:EXECute 按 autoset_time/acquisition_time/save_time 耗时，
+    期间条件寄存器的 RUN/ACS 位与真实仪器一样变化，可以用 SRQ 或轮询等待完成。
+    """
+
+    def __init__(self, latency=0.0, image_size=256 * 1024, record_length=12500, serial=DEFAULT_SERIAL, history=100,
+                 responses=None, autoset_time=0.5, acquisition_time=0.02, save_time=0.2,
+                 history_while_running=True):
+        self.latency = latency
+        # 脚本化应答 (见 load_responses)，优先于内置应答
+        self.responses = responses or {}
+        self.serial = serial
+        self.image_size = image_size
+        self.image = None
+        self.record_length = record_length
+        # 历史记录条数：记录编号为 0 (最新) 到 -(history - 1)
+        self.history = history
+        self.lock = threading.Lock()
+        # 每处理完一条程序消息通知一次，等待 SRQ 的线程据此重新检查状态字节
+        self.changed = threading.Condition(self.lock)
+        self.commands = 0
+        # 累计应答字节数 (含块头与结束符)，供基准计算吞吐
+        self.bytes_sent = 0
+        self.waveform = {"TRAC": "1", "REC": "0", "FORM": "WORD", "BYT": "LSBFIRST", "STAR": "0", "END": str(record_length - 1)}
+        # 通道显示状态 (:WAVeform:ALL:SEND? 只包含显示中的通道) 与采集计数
+        self.display = {channel: True for channel in range(1, 5)}
+        self.acquisitions = 0
+        # 开始采集的累计次数：历史记录 r 对应第 captures + r 次采集 (波形相位与触发时刻由此确定)
+        self.captures = 0
+        # 为 False 时模拟不允许在采集进行中读取波形的仪器：:WAVeform:SEND? 不应答并记录执行错误
+        self.history_while_running = history_while_running
+        self.errors = []
+        # 通信头部、截图格式、触发模式与状态寄存器 (采集运行状态为条件寄存器的 RUN 位)
+        self.header = True
+        self.image_format = "PNG"
+        self.trigger_mode = "AUTO"
+        self.status = StatusRegisters(scope_status.CONDITION_RUN)
+        self.autoset_time = autoset_time
+        self.acquisition_time = acquisition_time
+        self.save_time = save_time
+
+    @property
+    def running(self):
+        return bool(self.status.condition & scope_status.CONDITION_RUN)
+
+    def status_byte(self):
+        """当前状态字节 (不含 MAV，输出队列由各传输自行维护)"""
+        with self.lock:
+            self.status.advance(time.perf_counter())
+            return self.status.status_byte()
+
+    def wait_rqs(self, level=True, timeout=None):
+        """等待状态字节的 RQS 位变为 level (模拟 SRQ 线/中断)，返回当时的状态字节；超时返回时 RQS 不等于 level"""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        with self.changed:
+            while True:
+                now = time.perf_counter()
+                self.status.advance(now)
+                stb = self.status.status_byte()
+                if bool(stb & scope_status.STB_RQS) == level or (deadline is not None and now >= deadline):
+                    return stb
+                wake = [t for t in (self.status.next_time(), deadline) if t is not None]
+                self.changed.wait(min(wake) - now if wake else None)
+
+    def handle_status(self, key, value, query, now):
+        """状态寄存器与耗时操作相关的指令，不属于这一类时返回 NotImplemented"""
+        status = self.status
+        status.advance(now)
+        if query:
+            if key == "*STB":
+                return str(status.status_byte())
+            if key == "*ESR":
+                esr, status.esr = status.esr, 0
+                return str(esr)
+            if key == "STAT:EESR":
+                eesr, status.eesr = status.eesr, 0
+                return str(eesr)
+            if key == "STAT:COND":
+                return str(status.condition)
+            if key == "MEAS:WAIT":
+                # 自动测量随采集停止立即完成
+                return "0"
+            if key in ("*ESE", "*SRE", "STAT:EESE"):
+                return str({"*ESE": status.ese, "*SRE": status.sre, "STAT:EESE": status.eese}[key])
+            if key == "SST":
+                # 单次采集并等待停止；参数为超时 (100 ms 单位)，采集停止返回 0，超时返回 1
+                # 参数为 0 时只开始不等待，为负数时不重新开始、只等待当前的采集停止
+                timeout = float(value or "0")
+                deadline = now + abs(timeout) * 0.1
+                if timeout >= 0:
+                    self.start_acquisition(now, single=True)
+                if timeout == 0:
+                    return "0"
+                while status.condition & scope_status.CONDITION_RUN:
+                    remaining = min(deadline, status.next_time() or deadline) - time.perf_counter()
+                    if time.perf_counter() >= deadline:
+                        return "1"
+                    # 等待期间释放锁，其他会话仍可访问
+                    self.changed.wait(max(0.0, remaining))
+                    status.advance(time.perf_counter())
+                return "0"
+            return NotImplemented
+        if key == "*CLS":
+            status.esr = 0
+            status.eesr = 0
+        elif key in ("*ESE", "*SRE", "STAT:EESE"):
+            setattr(status, {"*ESE": "ese", "*SRE": "sre", "STAT:EESE": "eese"}[key], int(float(value)))
+        elif key.startswith("STAT:FILT"):
+            edge = value.strip().upper()
+            status.filters[1 << (int(key[9:]) - 1)] = next(f for f in scope_status.FILTERS if f.startswith(edge[:3]))
+        elif key == "*OPC":
+            status.operation_complete(now)
+        elif key == "TRIG:MODE":
+            self.trigger_mode = value.strip().upper()
+        elif key == "STOP":
+            status.cancel(scope_status.CONDITION_RUN)
+            status.set(scope_status.CONDITION_RUN, False)
+        elif key == "STAR":
+            self.start_acquisition(now, single=self.trigger_mode.startswith("SING"))
+        elif key == "ASET:EXEC":
+            # 自动设置期间停止采集，完成后重新开始
+            status.cancel(scope_status.CONDITION_RUN)
+            status.set(scope_status.CONDITION_RUN, False)
+            status.schedule(now + self.autoset_time, scope_status.CONDITION_RUN, True)
+        elif key.startswith("FILE:SAVE") and key.endswith(":EXEC"):
+            status.set(scope_status.CONDITION_ACS, True)
+            status.schedule(now + self.save_time, scope_status.CONDITION_ACS, False)
+        else:
+            return NotImplemented
+        return None
+
+    def start_acquisition(self, now, single=False):
+        """开始采集；单次模式下 acquisition_time 后触发并停止
+
+        每次开始采集都在历史存储中占用一条新的记录 0，之前的记录编号依次减 1。
+        """
+        status = self.status
+        self.captures += 1
+        status.cancel(scope_status.CONDITION_RUN)
+        status.set(scope_status.CONDITION_RUN, True)
+        if single:
+            status.schedule(now + self.acquisition_time, scope_status.CONDITION_RUN, False)
+
+    def settings_response(self, group):
+        """:COMMunicate? / :CHANnel<x>? / :IMAGe? 的应答，按 HEADer ON 的复合头格式返回"""
+        if group == "COMM":
+            return f":COMMUNICATE:HEADER {int(self.header)};LOCKOUT 0;REMOTE 1;VERBOSE 1"
+        if group == "IMAG":
+            return f":IMAGE:FORMAT {self.image_format};TONE COLOR"
+        channel = int(group[4:])
+        return (f":CHANNEL{channel}:DISPLAY {int(self.display.get(channel, False))};"
+                f"LABEL:DEFINE \"CH{channel}\";DISPLAY 0;:CHANNEL{channel}:VDIV 5.000E-01;POSITION 0.00")
+
+    def measure_value(self, channel, parameter):
+        """按 waveform_codes 的正弦模型解析计算的测量值 (与主机端由码值计算的结果相互独立)，其他测量项为 channel"""
+        import math
+
+        amplitude = SINE_AMPLITUDE * channel / 4.0 * WAVEFORM_RANGE / 3200.0
+        period = SINE_PERIOD / SAMPLE_RATE
+        # 正弦从 10% 到 90% (-0.8A 到 0.8A) 所需时间
+        edge = period * math.asin(0.8) / math.pi
+        values = {
+            "AVER": 0.0, "RMS": amplitude / math.sqrt(2.0), "SDEV": amplitude / math.sqrt(2.0),
+            "MAX": amplitude, "MIN": -amplitude, "PTOP": 2.0 * amplitude,
+            "FREQ": 1.0 / period, "PER": period, "RISE": edge, "FALL": edge, "DUTY": 50.0,
+        }
+        key = parameter.upper()
+        for name in (key[:4], key[:3]):
+            if name in values:
+                return values[name]
+        return float(channel)
+
+    def waveform_codes(self, channel, start, end, record=0):
+        """生成 channel 的 WORD 波形码值 (正弦, 幅度随通道变化，相位随历史记录编号变化)"""
+        import numpy as np
+
+        index = np.arange(start + record * 125, end + 1 + record * 125, dtype=np.float64)
+        codes = (SINE_AMPLITUDE * channel / 4.0) * np.sin(2.0 * np.pi * index / SINE_PERIOD)
+        return codes.astype("<i2")
+
+    def all_payload(self):
+        """:WAVeform:ALL:SEND? 的数据体：公共信息 + 每个显示中的通道 (波形信息 + WORD 数据)"""
+        import struct
+
+        self.acquisitions += 1
+        points = min(self.record_length, 12500)
+        channels = [channel for channel, on in sorted(self.display.items()) if on]
+        parts = [struct.pack("<HQ", len(channels), self.acquisitions)]
+        for channel in channels:
+            parts.append(struct.pack("<I8xI", channel, points))
+            parts.append(self.waveform_codes(channel, 0, points - 1, self.captures).tobytes())
+        return b"".join(parts)
+
+    def history_time(self, record):
+        """历史记录的触发时刻：第 n 次采集为 12:00:00.000 之后 n × 10 ms"""
+        seconds = 12 * 3600 + (self.captures + record) * 0.01
+        hours, rest = divmod(seconds, 3600)
+        minutes, rest = divmod(rest, 60)
+        return f'"{record} {int(hours):02d}:{int(minutes):02d}:{rest:06.3f}"'
+
+    def waveform_payload(self):
+        start = int(self.waveform["STAR"])
+        end = min(int(self.waveform["END"]), self.record_length - 1)
+        record = int(self.waveform["REC"]) if self.waveform["REC"].lstrip("-").isdigit() else 0
+        codes = self.waveform_codes(int(self.waveform["TRAC"]), start, end, self.captures + record)
+        if self.waveform["FORM"].startswith("BYTE"):
+            return (codes // 256).astype("i1").tobytes()
+        return codes.tobytes()
+
+    def handle(self, command):
+        """处理单条指令，查询返回 bytes/str，设置类指令返回 None"""
+        self.commands += 1
+        command = command.strip()
+        header, _, value = command.partition(" ")
+        key = short_header(header)
+        upper = key.upper()
+
+        if key.startswith("WAV:") and not key.endswith("?"):
+            self.waveform[key.split(":")[1]] = value.strip().upper()
+            return None
+        if key.startswith("CHAN") and key.endswith(":DISP"):
+            self.display[int(key[4:].split(":")[0])] = value.strip().upper() in ("ON", "1")
+            return None
+        if key == "COMM:HEAD":
+            self.header = value.strip().upper() in ("ON", "1")
+            return None
+        if key == "IMAG:FORM":
+            self.image_format = value.strip().upper()
+            return None
+        status_key = scope_state.normalize_header(header)
+        if not upper.endswith("?"):
+            self.handle_status(status_key, value, False, time.perf_counter())
+            return None
+        if self.responses:
+            response = self.responses.get(status_key)
+            if response is not None:
+                return response
+        response = self.handle_status(status_key, value, True, time.perf_counter())
+        if response is not NotImplemented:
+            return response
+        if upper == "*IDN?":
+            return IDN_FORMAT.format(serial=self.serial)
+        if upper == "*OPC?":
+            return "1"
+        if upper.startswith("STAT") and ":ERR" in upper:
+            return self.errors.pop(0) if self.errors else '0,"No error"'
+        if upper == "COMM:REM?":
+            return "1"
+        if upper in ("COMM?", "IMAG?", "CHAN1?", "CHAN2?", "CHAN3?", "CHAN4?"):
+            return self.settings_response(upper.rstrip("?"))
+        if upper.startswith("CHAN") and upper.endswith(":DISP?"):
+            return "1" if self.display.get(int(upper[4:].split(":")[0]), False) else "0"
+        if upper.startswith("MEAS"):
+            parts = upper.split(":")
+            try:
+                channel = int(parts[1].rstrip("?")[-1])
+                return f"{self.measure_value(channel, parts[2]):.6E}"
+            except (IndexError, ValueError):
+                return "NAN"
+        if upper.startswith("IMAG") and upper.endswith(":SEND?"):
+            # 随机内容只生成一次，避免大图像时基准测到的是 os.urandom 的耗时
+            if self.image is None or len(self.image) != self.image_size:
+                self.image = os.urandom(self.image_size)
+            return self.image
+        if upper.startswith("HIST:"):
+            node = upper[5:].rstrip("?")
+            argument = value.strip().upper()
+            if node.startswith("REC") and argument.startswith("MIN"):
+                return str(1 - self.history)
+            if node.startswith("TIME"):
+                record = 1 - self.history if argument.startswith("MIN") else int(float(argument or "0"))
+                return self.history_time(record)
+            return "0"
+        if upper.startswith("WAV:"):
+            node = upper[4:].rstrip("?")
+            if node.startswith("REC") and value.strip().upper().startswith("MIN"):
+                return str(1 - self.history)
+            if node == "SEND":
+                if self.running and not self.history_while_running:
+                    self.errors.append('-200,"Execution error"')
+                    return None
+                return self.waveform_payload()
+            if node == "ALL:SEND":
+                return self.all_payload()
+            if node.startswith("POS"):
+                return "128"
+            if node.startswith("LENG"):
+                return str(self.record_length)
+            if node.startswith("RANG"):
+                return f"{WAVEFORM_RANGE:.3E}"
+            if node.startswith("OFFS"):
+                return "0.000E+00"
+            if node.startswith("SRAT"):
+                return f"{SAMPLE_RATE:.2E}"
+            if node.startswith("TRIG"):
+                return str(self.record_length // 2)
+            return self.waveform.get(node, "0")
+        return "0"
+
+    def process(self, message):
+        """处理一条程序消息 (可含 ';' 拼接的多条指令)
+
+        返回带结束符 (LF) 的应答字节；只含设置类指令时返回 None。
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        responses = []
+        with self.lock:
+            for command in message.split(";"):
+                response = self.handle(command)
+                if response is not None:
+                    responses.append(response)
+            self.changed.notify_all()
+        if not responses:
+            return None
+        if len(responses) == 1 and isinstance(responses[0], bytes):
+            response = format_block(responses[0]) + b"\n"
+        else:
+            response = ";".join(r if isinstance(r, str) else "" for r in responses).encode("ascii") + b"\n"
+        with self.lock:
+            self.bytes_sent += len(response)
+        return response
+
+
+def format_block(payload):
+    """按 IEEE 488.2 定长块格式封装二进制数据"""
+    length = str(len(payload)).encode("ascii")
+    return b"#" + str(len(length)).encode("ascii") + length + payload
@@ -0,0 +1,174 @@
+import re
+
+# 仪器设置缓存：记录已知的设置值 (写穿)，再次发送相同设置时直接省略
+# 键为规范化的 SCPI 头 (短形式、大写，如 :CHANnel1:DISPlay -> CHAN1:DISP)，值为规范化的参数
+
+# 参与缓存的指令组；其余指令 (动作类、查询等) 总是发送
+CACHED_GROUPS = ("COMM", "CHAN", "IMAG", "WAV")
+# 可以在前面板上修改的指令组 (COMMunicate/WAVeform 只属于远程接口，面板操作不会改变)
+PANEL_GROUPS = ("CHAN", "IMAG")
+# 会整体改变仪器设置的指令，发送后清空缓存
+INVALIDATING_HEADERS = ("*RST", "*RCL", "FILE:LOAD", "INIT:EXEC", "INIT:UNDO", "REC:SET", "ASET:EXEC")
+# 不缓存的指令：仪器会按记录长度调整 :WAVeform:STARt/END，:COMMunicate:REMote 会被面板 SHIFT+CLR 改变
+UNCACHED_HEADERS = ("WAV:STAR", "WAV:END", "COMM:REM")
+# 连接后一次性查询的设置组 (应答带头部，按 SCPI 复合头规则解析)
+LOAD_QUERIES = (":COMMunicate?", ":CHANnel1?", ":CHANnel2?", ":CHANnel3?", ":CHANnel4?", ":IMAGe?")
+
+_NODE = re.compile(r"^([A-Za-z*]+)(\d*)$")
+_VOWELS = "AEIOU"
+
+
+def short_mnemonic(word):
+    """SCPI 短形式规则：取前 4 个字母，第 4 个字母为元音时取前 3 个 (TRIGger -> TRIG, WAVeform -> WAV)"""
+    word = word.upper()
+    if word.startswith("*") or len(word) <= 4:
+        return word
+    return word[:3] if word[3] in _VOWELS else word[:4]
+
+
+def normalize_nodes(nodes):
+    """把头部节点列表规范化为缓存键，长/短形式、大小写得到相同结果"""
+    normalized = []
+    for node in nodes:
+        match = _NODE.match(node.strip())
+        if not match:
+            normalized.append(node.strip().upper())
+            continue
+        word, suffix = match.groups()
+        normalized.append(short_mnemonic(word) + suffix)
+    return ":".join(normalized)
+
+
+def normalize_header(header):
+    """:CHANnel1:DISPlay / :CHANNEL1:DISPLAY / :CHAN1:DISP -> CHAN1:DISP"""
+    return normalize_nodes(header.strip().rstrip("?").lstrip(":").split(":"))
+
+
+def normalize_value(value):
+    """规范化设置参数：布尔值统一为 1/0，数值统一为 float 表示，字符串保持原样"""
+    value = value.strip()
+    if value.startswith('"'):
+        return value
+    upper = {"ON": "1", "OFF": "0"}.get(value.upper(), value.upper())
+    try:
+        return repr(float(upper))
+    except ValueError:
+        return upper
+
+
+def split_units(message):
+    """按 ';' 拆分程序消息/应答消息，忽略引号内的 ';'"""
+    units = []
+    current = []
+    quoted = False
+    for char in message:
+        if char == '"':
+            quoted = not quoted
+        if char == ";" and not quoted:
+            units.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    units.append("".join(current))
+    return units
+
+
+def iter_settings(message):
+    """逐条解析程序消息/带头部的应答，生成 (规范化头部, 参数, 是否绝对路径, 原始指令)
+
+    相对头部 (不以 ':' 开头) 按 SCPI 复合头规则接在上一条指令的父节点之后；查询的参数为 None。
+    """
+    base = []
+    for unit in split_units(message):
+        unit = unit.strip()
+        if not unit:
+            continue
+        header, _, value = unit.partition(" ")
+        query = header.endswith("?")
+        absolute = header.startswith((":", "*"))
+        nodes = [node for node in header.rstrip("?").lstrip(":").split(":") if node]
+        path = nodes if absolute else base + nodes
+        if not header.startswith("*"):
+            base = path[:-1]
+        if query:
+            yield normalize_nodes(path), None, absolute, unit
+        else:
+            yield normalize_nodes(path), normalize_value(value) if value.strip() else "", absolute, unit
+
+
+def _group(key):
+    return key.split(":", 1)[0].rstrip("0123456789")
+
+
+def is_invalidating(key):
+    return key.startswith(INVALIDATING_HEADERS)
+
+
+def is_cached(key):
+    return _group(key) in CACHED_GROUPS and not key.startswith(UNCACHED_HEADERS)
+
+
+class StateCache:
+    """写穿式设置缓存，统计本次执行中省略/实际发送的设置指令"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.entries = {}
+        self.elided = 0
+        self.sent = 0
+
+    def clear(self):
+        self.entries.clear()
+
+    def forget_panel_settings(self):
+        """丢弃可在面板上修改的设置"""
+        for key in [key for key in self.entries if _group(key) in PANEL_GROUPS]:
+            del self.entries[key]
+
+    def has_panel_settings(self):
+        return any(_group(key) in PANEL_GROUPS for key in self.entries)
+
+    def reset_counters(self):
+        self.elided = 0
+        self.sent = 0
+
+    def load(self, response):
+        """用带头部的设置查询应答 (如 :CHANnel1? 的结果) 填充缓存"""
+        for key, value, _, _ in iter_settings(response):
+            if value and is_cached(key):
+                self.entries[key] = value
+
+    def observe(self, message):
+        """记录消息中的设置指令 (不省略)；返回消息是否包含使缓存失效的指令"""
+        invalidated = False
+        for key, value, _, _ in iter_settings(message):
+            if is_invalidating(key):
+                self.entries.clear()
+                invalidated = True
+            elif value and self.enabled and is_cached(key):
+                self.entries[key] = value
+        return invalidated
+
+    def filter(self, message):
+        """去掉消息中与缓存一致的设置指令，返回 (待发送的消息或 None, 是否包含使缓存失效的指令)
+
+        只有全部指令都使用绝对头部时才会省略，避免破坏相对头部的路径。
+        """
+        units = list(iter_settings(message))
+        if not self.enabled or not all(absolute for _, _, absolute, _ in units):
+            return message, self.observe(message)
+
+        kept = []
+        invalidated = False
+        for key, value, _, unit in units:
+            if is_invalidating(key):
+                self.entries.clear()
+                invalidated = True
+            elif value and is_cached(key):
+                if self.entries.get(key) == value:
+                    self.elided += 1
+                    continue
+                self.entries[key] = value
+                self.sent += 1
+            kept.append(unit)
+        return (";".join(kept) if kept else None), invalidated
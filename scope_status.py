@@ -0,0 +1,44 @@
+"""IEEE 488.2 状态模型与 DLM 扩展事件寄存器 (见手册 "Status Reports")
+
+条件寄存器 (:STATus:CONDition?) 的某一位发生转换时，按 :STATus:FILTer<x> 选择的边沿 (RISE/FALL/BOTH/NEVer)
+锁存到扩展事件寄存器 (:STATus:EESR?，读取后清零)；它与 :STATus:EESE 相与非零时状态字节的 EES 位置 1，
+*SRE 使能了 EES 时仪器发出服务请求 (SRQ)。
+
+事件寄存器是锁存的，操作开始前读一次 EESR 清零，之后无论等待 SRQ 还是轮询 EESR 都不会漏掉短暂的状态变化。
+"""
+
+# :STATus:CONDition? 各位 (:STATus:FILTer<x> 的 x 为位号 + 1)
+CONDITION_RUN = 1 << 0   # 正在采集
+CONDITION_CAL = 1 << 3   # 正在校准
+CONDITION_TST = 1 << 4   # 正在自检
+CONDITION_ACS = 1 << 6   # 正在访问存储介质 (文件保存/读取)
+
+# 状态字节 (*STB? / 串行查询)
+STB_EES = 1 << 3  # 扩展事件汇总
+STB_MAV = 1 << 4  # 输出队列中有应答
+STB_ESB = 1 << 5  # 标准事件汇总
+STB_RQS = 1 << 6  # 服务请求
+
+# 标准事件寄存器 (*ESR?)
+ESR_OPC = 1 << 0
+
+# :STATus:FILTer<x> 的取值
+FILTERS = ("RISE", "FALL", "BOTH", "NEVER")
+
+# 传输层不支持 SRQ 时轮询 :STATus:EESR? 的间隔：从 POLL_MIN 开始每次乘以 POLL_GROWTH，不超过 POLL_MAX
+# (每次轮询只是一次小查询的往返，POLL_MAX 远小于 Sample.py 的 100 ms)
+POLL_MIN = 0.002
+POLL_GROWTH = 1.5
+POLL_MAX = 0.02
+
+
+def register_value(text):
+    """寄存器查询的应答转为整数 (HEADer ON 时应答带头部，取最后一个字段)"""
+    return int(float(text.strip().split(" ")[-1]))
+
+
+def filter_command(mask, level):
+    """等待 mask 位变为 level 所需的 SRQ 配置：只锁存该位的对应边沿，并由 EES 发出服务请求"""
+    bit = mask.bit_length()
+    edge = "RISE" if level else "FALL"
+    return f":STATus:FILTer{bit} {edge};:STATus:EESE {mask};*SRE {STB_EES}"
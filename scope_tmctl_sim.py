@@ -0,0 +1,269 @@
+"""TMCTL 模拟后端：用纯 Python 实现 tmctl.dll 的导出函数 (TmcInitialize、TmcSend、TmcReceive、
+TmcReceiveBlockHeader、TmcReceiveBlockData、TmcWaitSRQ 等)，挂到 tmctlLib.TMCTL 上代替 windll.LoadLibrary。
+
+tmctlLib 原有的 ctypes 封装 (create_string_buffer、byref、c_char 数组 from_buffer) 照常执行，
+因此 yokogawa.py 的整条 Windows 路径可以在任意 Linux 主机上运行和做基准测试。
+SCPI 应答由 scope_simulator.SimulatedScope 生成，可用应答脚本覆盖。
+
+设置环境变量 YOKOGAWA_TMCTL_SIM 启用，取值为 1 (默认参数) 或逗号分隔的参数，例如：
+    YOKOGAWA_TMCTL_SIM="overhead=0.0002,bandwidth=40e6,image_size=1048576,script=responses.json"
+参数:
+    overhead       每次 DLL 调用的固定开销 (秒，模拟 USB 事务/驱动开销)
+    bandwidth      数据传输速率 (bytes/s，0 为不限)
+    latency        仪器处理每条程序消息的时间 (秒)
+    image_size     截图大小 (bytes)
+    record_length  波形记录长度 (点)
+    script         应答脚本 (JSON，格式见 scope_simulator.load_responses)
+"""
+import ctypes
+import os
+import time
+
+import scope_simulator
+import scope_status
+
+ENV_VAR = "YOKOGAWA_TMCTL_SIM"
+
+# tmctlLib.TMCTLError 中用到的错误码
+ERROR_TIMEOUT = 1
+ERROR_NOT_BLOCK = 1024
+ERROR_ILLEGAL_ID = 8192
+
+# 短于该时长的等待用忙等待，保证微秒级开销的模拟精度
+BUSY_WAIT_LIMIT = 0.002
+
+
+def parse_spec(spec):
+    """解析 YOKOGAWA_TMCTL_SIM 的取值，返回参数字典"""
+    options = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item or item == "1":
+            continue
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"{ENV_VAR} 参数格式错误: '{item}' (应为 key=value)")
+        key = key.strip()
+        if key == "script":
+            options[key] = value.strip()
+        elif key in ("image_size", "record_length"):
+            options[key] = int(float(value))
+        elif key in ("overhead", "bandwidth", "latency"):
+            options[key] = float(value)
+        else:
+            raise ValueError(f"{ENV_VAR} 不支持的参数: '{key}'")
+    return options
+
+
+def _wait(seconds):
+    if seconds <= 0:
+        return
+    if seconds >= BUSY_WAIT_LIMIT:
+        time.sleep(seconds)
+        return
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def _value(arg):
+    """取出 c_int/c_char_p 等参数的值 (byref() 时取其指向的对象)；普通 int 原样返回"""
+    arg = getattr(arg, "_obj", arg)
+    return getattr(arg, "value", arg)
+
+
+class _Session:
+    def __init__(self, scope):
+        self.scope = scope
+        self.output = bytearray()
+
+
+class SimulatedTmctlDll:
+    """模拟的 tmctl.dll，函数签名与 tmctlLib 通过 ctypes 调用的方式一致"""
+
+    def __init__(self, overhead=0.0, bandwidth=0.0, latency=0.0, image_size=256 * 1024, record_length=12500,
+                 script=None, scope=None):
+        self.overhead = overhead
+        self.bandwidth = bandwidth
+        self.responses = scope_simulator.load_responses(script) if script else None
+        self.scope_options = {"latency": latency, "image_size": image_size, "record_length": record_length}
+        # 指定 scope 时所有会话共用该模拟示波器 (便于基准读取统计)
+        self.scope = scope
+        self.sessions = {}
+        self.next_id = 0
+        self.last_error = 0
+        self.calls = 0
+
+    def _call(self, nbytes=0):
+        self.calls += 1
+        _wait(self.overhead + (nbytes / self.bandwidth if self.bandwidth else 0.0))
+
+    def _session(self, device_id):
+        session = self.sessions.get(_value(device_id))
+        if session is None:
+            self.last_error = ERROR_ILLEGAL_ID
+        return session
+
+    def _fail(self, error):
+        self.last_error = error
+        return 1
+
+    # --- 连接管理 ---
+    def TmcInitialize(self, wire, address, device_id):
+        self._call()
+        scope = self.scope or scope_simulator.SimulatedScope(responses=self.responses, **self.scope_options)
+        self.sessions[self.next_id] = _Session(scope)
+        device_id._obj.value = self.next_id
+        self.next_id += 1
+        return 0
+
+    def TmcInitializeEx(self, wire, address, device_id, timeout):
+        return self.TmcInitialize(wire, address, device_id)
+
+    def TmcFinish(self, device_id):
+        self._call()
+        self.sessions.pop(_value(device_id), None)
+        return 0
+
+    def TmcSearchDevices(self, wire, buffer, max_list, count, option):
+        # 只报告一台设备 (默认序列号)
+        address = scope_simulator.DEFAULT_SERIAL.encode("ascii")
+        ctypes.memmove(buffer._obj, address, len(address))
+        count._obj.value = 1
+        return 0
+
+    def TmcEncodeSerialNumber(self, buffer, length, source):
+        encoded = _value(source)[:_value(length)]
+        ctypes.memmove(buffer._obj, encoded, len(encoded))
+        return 0
+
+    def TmcDecodeSerialNumber(self, buffer, length, source):
+        return self.TmcEncodeSerialNumber(buffer, length, source)
+
+    def TmcSetTimeout(self, device_id, timeout):
+        return 0 if self._session(device_id) else 1
+
+    def TmcSetTerm(self, device_id, eos, eot):
+        return 0 if self._session(device_id) else 1
+
+    def TmcSetRen(self, device_id, flag):
+        return 0 if self._session(device_id) else 1
+
+    def TmcDeviceClear(self, device_id):
+        session = self._session(device_id)
+        if session is None:
+            return 1
+        self._call()
+        session.output.clear()
+        return 0
+
+    def TmcDeviceTrigger(self, device_id):
+        return 0 if self._session(device_id) else 1
+
+    def TmcCheckEnd(self, device_id):
+        session = self._session(device_id)
+        return 0 if session is None or session.output else 1
+
+    def TmcGetLastError(self, device_id):
+        return self.last_error
+
+    def TmcWaitSRQ(self, device_id, stsbyte, timeout):
+        """等待服务请求 (超时单位 100ms)，收到时写出状态字节"""
+        session = self._session(device_id)
+        if session is None:
+            return 1
+        self._call()
+        stb = session.scope.wait_rqs(True, _value(timeout) * 0.1)
+        if not stb & scope_status.STB_RQS:
+            return self._fail(ERROR_TIMEOUT)
+        stsbyte._obj.value = stb
+        return 0
+
+    # --- 发送 ---
+    def TmcSend(self, device_id, message):
+        session = self._session(device_id)
+        if session is None:
+            return 1
+        message = _value(message)
+        self._call(len(message) + 1)
+        response = session.scope.process(message.decode("ascii", "replace"))
+        if response is not None:
+            session.output += response
+        return 0
+
+    def TmcSendByLength(self, device_id, message, length):
+        return self.TmcSend(device_id, ctypes.c_char_p(_value(message)[:_value(length)]))
+
+    def TmcSendOnly(self, device_id, message, length, end):
+        return self.TmcSendByLength(device_id, message, length)
+
+    def TmcSendSetup(self, device_id):
+        return 0 if self._session(device_id) else 1
+
+    # --- 接收 ---
+    def TmcReceive(self, device_id, buffer, buffer_len, received):
+        """读取一条应答 (到 LF 为止，不含 LF)；应答比缓冲区长时只返回缓冲区能放下的部分"""
+        session = self._session(device_id)
+        if session is None:
+            return 1
+        end = session.output.find(b"\n")
+        if end < 0:
+            return self._fail(ERROR_TIMEOUT)
+        # 保留 1 字节给 C 字符串结束符
+        count = min(end, _value(buffer_len) - 1)
+        self._call(count)
+        ctypes.memmove(buffer._obj, bytes(session.output[:count]), count)
+        del session.output[:end + 1 if count == end else count]
+        received._obj.value = count
+        return 0
+
+    def TmcReceiveOnly(self, device_id, buffer, buffer_len, received):
+        return self.TmcReceive(device_id, buffer, buffer_len, received)
+
+    def TmcReceiveSetup(self, device_id):
+        return 0 if self._session(device_id) else 1
+
+    def TmcReceiveBlockHeader(self, device_id, length):
+        session = self._session(device_id)
+        if session is None:
+            return 1
+        if not session.output:
+            return self._fail(ERROR_TIMEOUT)
+        if session.output[:1] != b"#":
+            return self._fail(ERROR_NOT_BLOCK)
+        self._call()
+        digits = int(chr(session.output[1]))
+        length._obj.value = int(bytes(session.output[2:2 + digits]))
+        del session.output[:2 + digits]
+        return 0
+
+    def TmcReceiveBlockData(self, device_id, buffer, buffer_len, received, end):
+        """读取块数据 (含末尾的 LF)，直接写入调用方的缓冲区"""
+        session = self._session(device_id)
+        if session is None:
+            return 1
+        if not session.output:
+            return self._fail(ERROR_TIMEOUT)
+        count = min(buffer_len, len(session.output))
+        self._call(count)
+        source = (ctypes.c_char * count).from_buffer(session.output)
+        ctypes.memmove(buffer, source, count)
+        # 释放对 output 的引用后才能删除已读部分
+        del source
+        del session.output[:count]
+        received._obj.value = count
+        end._obj.value = int(not session.output)
+        return 0
+
+
+def create_tmctl(spec=None, scope=None):
+    """创建挂接模拟 DLL 的 tmctlLib.TMCTL 实例 (不加载 Windows DLL)；spec 默认取环境变量"""
+    try:
+        from tmctl_lib import tmctlLib
+    except ImportError:
+        import tmctlLib
+
+    options = parse_spec(os.environ.get(ENV_VAR, "") if spec is None else spec)
+    tmctl = tmctlLib.TMCTL.__new__(tmctlLib.TMCTL)
+    tmctl.dll = SimulatedTmctlDll(scope=scope, **options)
+    return tmctl
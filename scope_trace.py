@@ -0,0 +1,135 @@
+"""SCPI 事务计时：记录连接、每次 send/query/块传输与断开的单调时间戳和字节数，
+导出为 Chrome trace-event JSON (chrome://tracing 或 https://ui.perfetto.dev 打开)，并按指令头部汇总 p50/p95/p99。
+
+未指定 --trace/--stats 时控制器不创建 Tracer，send/query 只多一次 None 判断。
+"""
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+import scope_logger
+import scope_state
+
+# trace 文件最多保留的事件数 (长时间 log 时限制内存占用；统计不受限制)
+MAX_EVENTS = 1_000_000
+# trace 事件中保存的程序消息最大长度
+MESSAGE_LIMIT = 200
+# 统计表中头部列的最大宽度
+HEADER_WIDTH = 40
+
+
+def message_key(message):
+    """程序消息的统计键：第一条指令的短形式头部，多条拼接时附加条数，例如 MEAS:CHAN1:AVER:VAL? (+3)"""
+    units = [unit for unit in message.split(";") if unit.strip()]
+    if not units:
+        return "(空)"
+    header = units[0].strip().split(" ", 1)[0]
+    key = header.upper() if header.startswith("*") else scope_state.normalize_header(header)
+    if header.endswith("?") and not key.endswith("?"):
+        key += "?"
+    if len(units) > 1:
+        key += f" (+{len(units) - 1})"
+    return key
+
+
+class Tracer:
+    """收集计时事件 (线程安全)；clock() 为单调时钟 (ns)"""
+
+    clock = staticmethod(time.perf_counter_ns)
+
+    def __init__(self):
+        self.origin = time.perf_counter_ns()
+        self.events = []
+        self.dropped = 0
+        # 统计键 -> [耗时 (ns), ...]
+        self.durations = {}
+        # 统计键 -> [发送字节, 接收字节]
+        self.bytes = {}
+        self.last_message = ""
+        self.lock = threading.Lock()
+
+    def record(self, category, message, start, sent=0, received=0, error=None):
+        """记录一个从 start (clock() 的返回值) 到现在的 SCPI 事务
+
+        category 为 write/query/query_many/block；块传输 (message 为 None) 归到之前最后一条写入的指令下。
+        """
+        end = time.perf_counter_ns()
+        if message is None:
+            message = self.last_message
+        elif category == "write":
+            self.last_message = message
+        key = message_key(message)
+        if category == "block":
+            key += " [block]"
+        args = {"message": message[:MESSAGE_LIMIT], "sent": sent, "received": received}
+        if error is not None:
+            args["error"] = str(error)
+        with self.lock:
+            self.durations.setdefault(key, []).append(end - start)
+            totals = self.bytes.setdefault(key, [0, 0])
+            totals[0] += sent
+            totals[1] += received
+            self._append(category, key, start, end, args)
+
+    @contextlib.contextmanager
+    def span(self, name, category="session", **args):
+        """连接、断开等阶段的计时 (只写入 trace，不计入统计)"""
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            with self.lock:
+                self._append(category, name, start, end, args)
+
+    def _append(self, category, name, start, end, args):
+        if len(self.events) >= MAX_EVENTS:
+            self.dropped += 1
+            return
+        self.events.append((category, name, start, end, threading.get_ident(), args))
+
+    def trace_events(self):
+        """Chrome trace-event 格式 (完整事件 ph=X，时间单位 us)"""
+        pid = os.getpid()
+        return [
+            {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": (start - self.origin) / 1000.0,
+                "dur": (end - start) / 1000.0,
+                "pid": pid,
+                "tid": tid,
+                "args": args,
+            }
+            for category, name, start, end, tid, args in self.events
+        ]
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+
+    def print_stats(self, file=None):
+        """按统计键打印次数、p50/p95/p99/最大耗时 (ms) 与收发字节数，默认输出到 stderr (不影响 clean 模式的结果输出)"""
+        file = file or sys.stderr
+        print(f"{'指令':<{HEADER_WIDTH}} {'次数':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'最大':>9} {'发送':>10} {'接收':>12}", file=file)
+        total = 0
+        for key, durations in sorted(self.durations.items(), key=lambda item: -sum(item[1])):
+            values = sorted(durations)
+            total += sum(values)
+            sent, received = self.bytes[key]
+            label = key if len(key) <= HEADER_WIDTH else key[:HEADER_WIDTH - 3] + "..."
+            print(
+                f"{label:<{HEADER_WIDTH}} {len(values):6d} "
+                + " ".join(f"{value / 1e6:7.3f}ms" for value in (
+                    scope_logger.percentile(values, 50), scope_logger.percentile(values, 95),
+                    scope_logger.percentile(values, 99), values[-1]))
+                + f" {sent:10d} {received:12d}",
+                file=file,
+            )
+        print(f"SCPI 事务合计: {total / 1e6:.3f} ms", file=file)
+        if self.dropped:
+            print(f"trace 事件超过 {MAX_EVENTS} 条，已省略 {self.dropped} 条 (统计不受影响)", file=file)
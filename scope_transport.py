@@ -0,0 +1,542 @@
+# 传输层：控制器 (scope_controller.ScopeController) 只通过 Transport 接口与设备通信，
+# 缓冲、块传输等性能相关的实现集中在这里，tmctl / VISA / 模拟器共用同一套控制器逻辑。
+import ctypes
+import math
+import select
+import socket
+import time
+
+import scope_block
+import scope_hislip
+import scope_status
+
+# DLM 以太网 Socket 接口 (见手册 2.2 Socket Interface Specifications)：
+# 无协议头，LF 结束符，单次发送的指令不超过 4 KB
+SOCKET_PORT = 10002
+SOCKET_MAX_COMMAND = 4096
+# 大块数据 (截图/波形) 传输时的内核收发缓冲区大小
+SOCKET_BUFFER_SIZE = 4 << 20
+# tmctl 的错误码 Timeout (TmcGetLastError)
+TMCTL_ERROR_TIMEOUT = 1
+# HiSLIP overlapped 模式下同时在途的查询数上限，防止应答堆满双方的 TCP 缓冲区
+PIPELINE_DEPTH = 32
+
+
+class Transport:
+    """传输层接口
+
+    具体传输至少实现 write / read_line / read_exact / read_into；read_block 的默认实现
+    基于 read_exact + read_into 解析定长块数据，自带块接收函数的传输 (如 tmctl) 可以覆盖它。
+    """
+
+    name = "base"
+    chunk_size = scope_block.DEFAULT_CHUNK_SIZE
+    # 每次底层读取有固定开销的传输 (tmctl/VISA) 设置为 scope_block.ChunkTuner，按实测吞吐调整读取大小
+    tuner = None
+
+    def open(self):
+        """打开会话并完成基础通信设置"""
+
+    def close(self):
+        """关闭会话 (需可重复调用)"""
+
+    def write(self, cmd):
+        raise NotImplementedError
+
+    def read_line(self, size=1000):
+        """读取一条以 LF 结尾的应答，返回去掉结束符的字符串"""
+        raise NotImplementedError
+
+    def read_exact(self, n):
+        """读取恰好 n 字节"""
+        raise NotImplementedError
+
+    def read_into(self, view):
+        """把最多 len(view) 字节读入 view，返回实际字节数"""
+        raise NotImplementedError
+
+    def query(self, cmd, size=1000):
+        """发送查询并读取应答；size 为应答长度的估计值 (部分传输需要预先分配接收缓冲区)"""
+        self.write(cmd)
+        return self.read_line(size)
+
+    def query_many(self, cmds, size=1000):
+        """依次执行多条互不依赖的查询，按顺序返回应答列表
+
+        默认逐条往返；支持流水线的传输 (HiSLIP overlapped 模式) 会先连续发出查询再依次收取应答。
+        """
+        return [self.query(cmd, size) for cmd in cmds]
+
+    def clear(self):
+        """清除设备状态"""
+        self.write("*CLS")
+
+    def wait_srq(self, timeout):
+        """等待仪器的服务请求 (SRQ)，期间不占用总线
+
+        收到返回 True，超时返回 False；传输不支持 SRQ 时返回 None (调用方改为轮询状态寄存器)。
+        """
+        return None
+
+    def read_block(self, progress=None, buffer=None):
+        """读取 IEEE 488.2 定长块数据 (#N<len><data>)，返回数据体 (memoryview)
+
+        buffer 为调用方可复用的 bytearray (见 scope_block.receive_block)。
+        """
+        head = self.read_exact(2)
+        digits_head = self.read_exact(int(chr(head[1]))) if head[0:1] == b"#" else b""
+        _, data_len = scope_block.parse_block_header(head + digits_head)
+        data = scope_block.receive_block(data_len, self.read_into, self.chunk_size, progress=progress,
+                                         buffer=buffer, tuner=self.tuner)
+        # 消耗块数据末尾的结束符 (LF)
+        self.read_exact(1)
+        return data
+
+
+class VisaTransport(Transport):
+    """pyvisa 会话 (USBTMC / VXI-11 / VISA SOCKET 资源)"""
+
+    name = "visa"
+
+    def __init__(self, rm, resource_name, timeout=30000):
+        self.rm = rm
+        self.resource_name = resource_name
+        self.timeout = timeout
+        self.inst = None
+        self.tuner = scope_block.ChunkTuner(timeout=timeout / 1000.0)
+        # SRQ 事件队列是否已启用；None 为尚未尝试，False 为后端不支持 (如 pyvisa-py)
+        self.srq_enabled = None
+
+    def open(self):
+        self.inst = self.rm.open_resource(self.resource_name)
+        self.inst.read_termination = "\n"
+        self.inst.write_termination = "\n"
+        self.inst.timeout = self.timeout  # pyvisa 单位是 ms
+
+        # 横河设备不支持 clear() (viClear)，直接使用 *CLS
+        try:
+            self.inst.write("*CLS")
+        except Exception:
+            pass
+
+    def close(self):
+        if self.inst:
+            try:
+                self.inst.close()
+            except Exception:
+                pass
+            self.inst = None
+        self.srq_enabled = None
+
+    def write(self, cmd):
+        self.inst.write(cmd)
+
+    def read_line(self, size=1000):
+        return self.inst.read().strip()
+
+    def query(self, cmd, size=1000):
+        return self.inst.query(cmd).strip()
+
+    def read_exact(self, n):
+        return self.inst.read_bytes(n)
+
+    def read_into(self, view):
+        # 一次 VISA read 取回整个 view (pyvisa 默认按 20 KiB 分多次调用)
+        chunk = self.inst.read_bytes(len(view), chunk_size=len(view))
+        view[:len(chunk)] = chunk
+        return len(chunk)
+
+    def clear(self):
+        try:
+            self.inst.clear()
+        except Exception:
+            self.inst.write("*CLS")
+
+    def wait_srq(self, timeout):
+        # USBTMC 中断端点 / VXI-11 intr 通道上的服务请求由 VISA 转为 service_request 事件
+        from pyvisa import constants, errors
+
+        if self.srq_enabled is False:
+            return None
+        try:
+            if self.srq_enabled is None:
+                self.inst.enable_event(constants.EventType.service_request, constants.EventMechanism.queue)
+                self.srq_enabled = True
+            self.inst.wait_on_event(constants.EventType.service_request, max(1, int(timeout * 1000)))
+        except errors.VisaIOError as e:
+            if e.error_code == constants.StatusCode.error_timeout:
+                return False
+            self.srq_enabled = False
+            return None
+        except (NotImplementedError, AttributeError):
+            self.srq_enabled = False
+            return None
+        # 串行查询清除 RQS，之后的服务请求才会再次产生事件
+        self.inst.read_stb()
+        return True
+
+    def read_block(self, progress=None, buffer=None):
+        # 读取二进制数据时，暂时关闭结束符处理，防止数据被意外截断
+        old_term = self.inst.read_termination
+        self.inst.read_termination = None
+        try:
+            return super().read_block(progress, buffer)
+        finally:
+            self.inst.read_termination = old_term
+
+
+class TmctlTransport(Transport):
+    """横河 TMCTL 库 (Windows DLL) 会话"""
+
+    name = "tmctl"
+
+    def __init__(self, tmctl, wire, address, timeout=300):
+        self.tmctl = tmctl
+        self.wire = wire
+        self.address = address
+        self.timeout = timeout
+        self.device_id = -1
+        # ReceiveBlockData 每次调用都要经过 ctypes 与 DLL，读取大小从 64 KiB 起按实测吞吐加倍
+        self.tuner = scope_block.ChunkTuner(timeout=timeout * 0.1)
+        # 旧版 DLL 没有导出 TmcWaitSRQ 或接口不支持 SRQ 时为 False
+        self.srq_supported = True
+
+    def open(self):
+        ret, self.device_id = self.tmctl.Initialize(self.wire, self.address)
+        if ret != 0:
+            self.device_id = -1
+            raise Exception(f"Initialize 失败 (Ret={ret})")
+        self.tmctl.SetTerm(self.device_id, 2, 1)             # 接收/发送结束符设为 LF
+        self.tmctl.SetRen(self.device_id, 1)                 # 开启远程控制模式
+        self.tmctl.SetTimeout(self.device_id, self.timeout)  # 单位 100ms，截图可能较慢
+        self.tmctl.DeviceClear(self.device_id)               # 清除设备状态
+
+    def close(self):
+        if self.device_id >= 0:
+            try:
+                self.tmctl.SetRen(self.device_id, 0)  # 恢复本地控制
+                self.tmctl.Finish(self.device_id)
+            except Exception:
+                pass
+            self.device_id = -1
+
+    def write(self, cmd):
+        ret = self.tmctl.Send(self.device_id, cmd)
+        if ret != 0:
+            raise Exception(f"Ret={ret}")
+
+    def read_line(self, size=1000):
+        ret, buf, length = self.tmctl.Receive(self.device_id, size)
+        if ret != 0:
+            raise Exception(f"Ret={ret}")
+        return buf.strip()
+
+    def wait_srq(self, timeout):
+        if not self.srq_supported:
+            return None
+        try:
+            wait = self.tmctl.dll.TmcWaitSRQ
+        except AttributeError:
+            self.srq_supported = False
+            return None
+        status = ctypes.c_ubyte()
+        # 超时单位 100ms
+        ret = wait(ctypes.c_int(self.device_id), ctypes.byref(status), ctypes.c_int(max(1, math.ceil(timeout * 10))))
+        if ret == 0:
+            return True
+        if self.tmctl.dll.TmcGetLastError(ctypes.c_int(self.device_id)) == TMCTL_ERROR_TIMEOUT:
+            return False
+        # 其他错误 (如接口不支持 SRQ 时的 Unsupported function)：调用方改为轮询状态寄存器
+        self.srq_supported = False
+        return None
+
+    def read_into(self, view):
+        """通过 ReceiveBlockData 直接把数据写入 view，返回实际字节数"""
+        _, rlen, _ = self.tmctl.ReceiveBlockData(self.device_id, view, len(view))
+        return rlen
+
+    def read_block(self, progress=None, buffer=None):
+        _, total_len = self.tmctl.ReceiveBlockHeader(self.device_id)
+        if total_len == 0:
+            return memoryview(b"")
+        # 末尾多申请 1 字节，兼容设备附带的块结束符。
+        return scope_block.receive_block(total_len, self.read_into, self.chunk_size, extra=1, progress=progress,
+                                         buffer=buffer, tuner=self.tuner)
+
+
+class SocketTransport(Transport):
+    """直接使用 TCP Socket 连接仪器的命令端口，绕过 VISA/VXI-11 的 RPC 开销
+
+    小查询开启 TCP_NODELAY，避免 Nagle 与延迟 ACK 叠加造成的数十毫秒等待；
+    块数据在没有预读数据时直接 recv_into 到调用方的缓冲区，不经过中间复制。
+    """
+
+    name = "socket"
+
+    def __init__(self, host, port=SOCKET_PORT, timeout=30.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.sock = None
+        # 按行读取时多收到的数据 (例如紧随应答的块数据头)
+        self.pending = bytearray()
+        self.scratch = memoryview(bytearray(64 * 1024))
+
+    def open(self):
+        self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        for option in (socket.SO_RCVBUF, socket.SO_SNDBUF):
+            try:
+                self.sock.setsockopt(socket.SOL_SOCKET, option, SOCKET_BUFFER_SIZE)
+            except OSError:
+                pass
+        self.pending.clear()
+        self.write("*CLS")
+
+    def close(self):
+        if self.sock:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+        self.pending.clear()
+
+    def write(self, cmd):
+        data = cmd.encode("ascii") + b"\n"
+        if len(data) > SOCKET_MAX_COMMAND:
+            raise Exception(f"指令超过 {SOCKET_MAX_COMMAND} 字节")
+        self.sock.sendall(data)
+
+    def _fill(self):
+        """从 socket 追加读取一次到 pending"""
+        n = self.sock.recv_into(self.scratch)
+        if n == 0:
+            raise Exception("连接已被仪器关闭")
+        self.pending += self.scratch[:n]
+
+    def read_line(self, size=1000):
+        start = 0
+        while True:
+            end = self.pending.find(b"\n", start)
+            if end >= 0:
+                break
+            start = len(self.pending)
+            self._fill()
+        line = bytes(self.pending[:end])
+        del self.pending[:end + 1]
+        return line.decode("ascii", "replace").strip()
+
+    def read_exact(self, n):
+        while len(self.pending) < n:
+            self._fill()
+        data = bytes(self.pending[:n])
+        del self.pending[:n]
+        return data
+
+    def read_into(self, view):
+        if self.pending:
+            n = min(len(view), len(self.pending))
+            view[:n] = self.pending[:n]
+            del self.pending[:n]
+            return n
+        return self.sock.recv_into(view)
+
+
+class HislipTransport(Transport):
+    """HiSLIP (IVI-6.1) 会话：同步通道收发 Data/DataEND 报文，异步通道用于初始化与接收服务请求
+
+    服务器工作在 overlapped 模式时，query_many 会先连续发出多条查询 (最多 PIPELINE_DEPTH 条在途)，
+    再按顺序收取应答，省去每条查询一次完整往返的等待。
+    """
+
+    name = "hislip"
+
+    def __init__(self, host, port=scope_hislip.HISLIP_PORT, sub_address=scope_hislip.DEFAULT_SUB_ADDRESS, timeout=30.0):
+        self.host = host
+        self.port = port
+        self.sub_address = sub_address
+        self.timeout = timeout
+        self.sync = None
+        self.async_ = None
+        self.overlap = False
+        self.message_id = scope_hislip.INITIAL_MESSAGE_ID
+        # 当前应答报文中尚未读取的负载字节数，以及该报文是否为 DataEND
+        self.remaining = 0
+        self.end = False
+
+    def open(self):
+        self.sync = scope_hislip.connect(self.host, self.port, self.timeout)
+        self.sync.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+        parameter = (scope_hislip.PROTOCOL_VERSION << 16) | int.from_bytes(scope_hislip.VENDOR_ID, "big")
+        self.sync.sendall(scope_hislip.pack_message(
+            scope_hislip.INITIALIZE, 0, parameter, self.sub_address.encode("ascii")
+        ))
+        message_type, control, parameter, _ = scope_hislip.recv_message(self.sync)
+        if message_type != scope_hislip.INITIALIZE_RESPONSE:
+            raise Exception(f"HiSLIP 初始化失败 (报文类型 {message_type})")
+        self.overlap = bool(control & scope_hislip.OVERLAP_MODE)
+        session_id = parameter & 0xFFFF
+
+        self.async_ = scope_hislip.connect(self.host, self.port, self.timeout)
+        self.async_.sendall(scope_hislip.pack_message(scope_hislip.ASYNC_INITIALIZE, 0, session_id))
+        message_type, _, _, _ = scope_hislip.recv_message(self.async_)
+        if message_type != scope_hislip.ASYNC_INITIALIZE_RESPONSE:
+            raise Exception(f"HiSLIP 异步通道初始化失败 (报文类型 {message_type})")
+
+        self.message_id = scope_hislip.INITIAL_MESSAGE_ID
+        self.remaining = 0
+        self.end = False
+        self.write("*CLS")
+
+    def close(self):
+        for sock in (self.sync, self.async_):
+            if sock:
+                try:
+                    sock.close()
+                except OSError:
+                    pass
+        self.sync = None
+        self.async_ = None
+
+    def write(self, cmd):
+        # HiSLIP 以 DataEND 报文表示消息结束，不需要 LF 结束符
+        self.sync.sendall(scope_hislip.pack_message(
+            scope_hislip.DATA_END, 0, self.message_id, cmd.encode("ascii")
+        ))
+        self.message_id = (self.message_id + 2) & 0xFFFFFFFF
+
+    def _next_message(self):
+        """读取下一条应答报文头，跳过与数据无关的报文"""
+        while True:
+            message_type, _, _, length = scope_hislip.recv_header(self.sync)
+            if message_type in (scope_hislip.DATA, scope_hislip.DATA_END):
+                self.remaining = length
+                self.end = message_type == scope_hislip.DATA_END
+                return
+            payload = scope_hislip.recv_exact(self.sync, length) if length else b""
+            if message_type in (scope_hislip.ERROR, scope_hislip.FATAL_ERROR):
+                raise Exception(f"HiSLIP 错误: {payload.decode('ascii', 'replace')}")
+
+    def read_into(self, view):
+        while self.remaining == 0:
+            self._next_message()
+        n = self.sync.recv_into(view[:min(len(view), self.remaining)])
+        if n == 0:
+            raise Exception("HiSLIP 连接已关闭")
+        self.remaining -= n
+        return n
+
+    def read_exact(self, n):
+        buf = bytearray(n)
+        view = memoryview(buf)
+        received = 0
+        while received < n:
+            received += self.read_into(view[received:])
+        return bytes(buf)
+
+    def _finish_message(self):
+        """丢弃当前应答剩余的负载，直到 DataEND 结束"""
+        while True:
+            if self.remaining:
+                scope_hislip.recv_exact(self.sync, self.remaining)
+                self.remaining = 0
+            if self.end:
+                self.end = False
+                return
+            self._next_message()
+
+    def read_line(self, size=1000):
+        data = bytearray()
+        while True:
+            if self.remaining:
+                data += scope_hislip.recv_exact(self.sync, self.remaining)
+                self.remaining = 0
+            if self.end:
+                self.end = False
+                return data.decode("ascii", "replace").strip()
+            self._next_message()
+
+    def wait_srq(self, timeout):
+        # 仪器在异步通道上发送 AsyncServiceRequest；先等到可读再读整条报文，超时不会截断报文
+        deadline = time.perf_counter() + timeout
+        while True:
+            readable, _, _ = select.select([self.async_], [], [], max(0.0, deadline - time.perf_counter()))
+            if not readable:
+                return False
+            message_type, _, _, _ = scope_hislip.recv_message(self.async_)
+            if message_type == scope_hislip.ASYNC_SERVICE_REQUEST:
+                return True
+
+    def query_many(self, cmds, size=1000):
+        if not self.overlap:
+            return super().query_many(cmds, size)
+        responses = []
+        in_flight = 0
+        for cmd in cmds:
+            if in_flight >= PIPELINE_DEPTH:
+                responses.append(self.read_line(size))
+                in_flight -= 1
+            self.write(cmd)
+            in_flight += 1
+        for _ in range(in_flight):
+            responses.append(self.read_line(size))
+        return responses
+
+    def read_block(self, progress=None, buffer=None):
+        head = self.read_exact(2)
+        digits_head = self.read_exact(int(chr(head[1]))) if head[0:1] == b"#" else b""
+        _, data_len = scope_block.parse_block_header(head + digits_head)
+        data = scope_block.receive_block(data_len, self.read_into, self.chunk_size, progress=progress, buffer=buffer)
+        # 块数据之后可能还有结束符，直接丢弃到 DataEND 为止
+        self._finish_message()
+        return data
+
+
+class SimulatorTransport(Transport):
+    """进程内模拟器 (scope_simulator.SimulatedScope)，不需要任何硬件或网络"""
+
+    name = "sim"
+
+    def __init__(self, scope=None):
+        self.scope = scope
+        self.output = bytearray()
+
+    def open(self):
+        if self.scope is None:
+            import scope_simulator
+
+            self.scope = scope_simulator.SimulatedScope()
+        self.output.clear()
+
+    def close(self):
+        self.output.clear()
+
+    def write(self, cmd):
+        response = self.scope.process(cmd)
+        if response is not None:
+            self.output += response
+
+    def read_line(self, size=1000):
+        end = self.output.find(b"\n")
+        if end < 0:
+            raise Exception("无应答数据 (超时)")
+        line = bytes(self.output[:end])
+        del self.output[:end + 1]
+        return line.decode("ascii", "replace").strip()
+
+    def read_exact(self, n):
+        if len(self.output) < n:
+            raise Exception("无应答数据 (超时)")
+        data = bytes(self.output[:n])
+        del self.output[:n]
+        return data
+
+    def read_into(self, view):
+        n = min(len(view), len(self.output))
+        view[:n] = self.output[:n]
+        del self.output[:n]
+        return n
+
+    def wait_srq(self, timeout):
+        return bool(self.scope.wait_rqs(True, timeout) & scope_status.STB_RQS)
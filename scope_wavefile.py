@@ -0,0 +1,303 @@
+"""自描述的波形文件 (.dlmwav)：保存 :WAVeform:SEND? 的原始码值与换算参数，按块可选无损压缩，带块索引可随机读取。
+
+文件格式:
+  第 1 行: WAVEFILE_MAGIC
+  第 2 行: JSON 头 {"channels", "format", "points", "chunk_points", "codec", "delta", "shuffle",
+                    "range", "offset", "position", "division", "sample_rate", "start", "trigger", ...}
+  之后: 各通道依次分块写入，每块为 CHUNK_HEADER (通道, 起始点, 点数, 数据字节数) + 数据
+        数据 = 码值 (little-endian) [块内差分] [按字节位拆分重排 (压缩时)] [codec 压缩]
+  末尾: 块索引 (INDEX_DTYPE 数组) + TRAILER (索引偏移, 索引条数, INDEX_MAGIC)
+
+每块独立压缩 (块内第一个点保存原值)，读取任意区间只需解压覆盖它的块；缺少末尾索引时 (写入中断) 顺序扫描块头重建。
+电压 = range × (code - position) ÷ division + offset，与 scope_waveform.decode_waveform 一致 (position 仅 RBYTE 使用)。
+"""
+import json
+import os
+import struct
+import time
+import zlib
+
+import numpy as np
+
+import scope_waveform
+
+WAVEFILE_MAGIC = b"DLMWAV1\n"
+INDEX_MAGIC = b"DLMWIDX1"
+CHUNK_HEADER = struct.Struct("<HQII")
+TRAILER = struct.Struct("<QQ8s")
+INDEX_DTYPE = np.dtype([("channel", "<u2"), ("first", "<u8"), ("count", "<u4"), ("offset", "<u8"), ("size", "<u4")])
+CODE_DTYPE = {"WORD": "<i2", "BYTE": "i1", "RBYTE": "u1"}
+# 每块的点数：块越大压缩率越高，随机读取时多解压的数据也越多
+CHUNK_POINTS = 1 << 16
+CODECS = ("none", "zlib", "zstd")
+# 以速度为先的压缩级别
+ZLIB_LEVEL = 1
+ZSTD_LEVEL = 3
+
+
+def _compressor(codec):
+    """返回 (compress, decompress)；zstd 需要安装 zstandard"""
+    if codec == "none":
+        return bytes, bytes
+    if codec == "zlib":
+        return (lambda data: zlib.compress(data, ZLIB_LEVEL)), zlib.decompress
+    if codec == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise Exception("zstd 压缩需要先安装 zstandard: pip install zstandard")
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress, zstandard.ZstdDecompressor().decompress
+    raise ValueError(f"不支持的压缩方式: {codec} (支持: {', '.join(CODECS)})")
+
+
+def encode_chunk(codes, delta, shuffle):
+    """码值数组 -> 待压缩的字节：块内差分 (整数回绕，可无损还原)，再按字节位拆分重排，使高位/低位字节各自聚在一起"""
+    if delta and len(codes) > 1:
+        diff = np.empty_like(codes)
+        diff[0] = codes[0]
+        np.subtract(codes[1:], codes[:-1], out=diff[1:])
+        codes = diff
+    if not shuffle or codes.dtype.itemsize == 1:
+        return codes.tobytes()
+    return codes.view(np.uint8).reshape(-1, codes.dtype.itemsize).T.tobytes()
+
+
+def decode_chunk(data, dtype, count, delta, shuffle):
+    """encode_chunk 的逆变换"""
+    if not shuffle or dtype.itemsize == 1:
+        codes = np.frombuffer(data, dtype=dtype, count=count).copy()
+    else:
+        codes = np.frombuffer(data, dtype=np.uint8).reshape(dtype.itemsize, count).T.copy().view(dtype).reshape(count)
+    if delta:
+        np.cumsum(codes, dtype=dtype, out=codes)
+    return codes
+
+
+class WaveformFileWriter:
+    """流式写入 .dlmwav：各通道按顺序追加码值，满一块即压缩写盘，内存占用与记录长度无关"""
+
+    def __init__(self, path, channels, fmt, points, parameters, sample_rate=None, start=0, trigger=None,
+                 codec="zlib", delta=True, chunk_points=CHUNK_POINTS, metadata=None):
+        """parameters 为 {channel: (range, offset, position)}；trigger 为 :WAVeform:TRIGger? 的触发点位置"""
+        self.path = path
+        self.channels = list(channels)
+        self.dtype = np.dtype(CODE_DTYPE[fmt])
+        self.points = points
+        self.chunk_points = chunk_points
+        self.delta = delta
+        # 不压缩时字节重排没有意义
+        self.shuffle = codec != "none"
+        self.compress, _ = _compressor(codec)
+        self.pending = {channel: [] for channel in self.channels}
+        self.pending_points = {channel: 0 for channel in self.channels}
+        self.written = {channel: 0 for channel in self.channels}
+        self.index = []
+        self.raw_bytes = 0
+
+        output_dir = os.path.dirname(os.path.abspath(path))
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        header = dict(metadata or {})
+        header.update({
+            "channels": self.channels,
+            "format": fmt,
+            "points": points,
+            "chunk_points": chunk_points,
+            "codec": codec,
+            "delta": delta,
+            "shuffle": self.shuffle,
+            "range": [parameters[channel][0] for channel in self.channels],
+            "offset": [parameters[channel][1] for channel in self.channels],
+            "position": [parameters[channel][2] for channel in self.channels],
+            "division": scope_waveform.WAVEFORM_DIVISION[fmt],
+            "sample_rate": sample_rate,
+            "start": start,
+            "trigger": trigger,
+            "created": time.time(),
+        })
+        self.file = open(path, "wb")
+        self.file.write(WAVEFILE_MAGIC + json.dumps(header).encode("utf-8") + b"\n")
+
+    def write(self, channel, codes):
+        """追加 channel 的码值 (bytes/memoryview 或码值数组)；返回后调用方即可复用其缓冲区"""
+        codes = np.frombuffer(codes, dtype=self.dtype) if not isinstance(codes, np.ndarray) else codes.view(self.dtype)
+        pending = self.pending[channel]
+        while len(codes):
+            take = min(len(codes), self.chunk_points - self.pending_points[channel])
+            self.pending_points[channel] += take
+            # 满一块，或已到该通道的最后一个点
+            if (self.pending_points[channel] == self.chunk_points
+                    or self.written[channel] + self.pending_points[channel] >= self.points):
+                pending.append(codes[:take])
+                self._flush(channel)
+            else:
+                # 不足一块的部分要留到下次写入，复制一份
+                pending.append(codes[:take].copy())
+            codes = codes[take:]
+
+    def _flush(self, channel):
+        pending = self.pending[channel]
+        if not pending:
+            return
+        codes = pending[0] if len(pending) == 1 else np.concatenate(pending)
+        data = self.compress(encode_chunk(codes, self.delta, self.shuffle))
+        first = self.written[channel]
+        offset = self.file.tell()
+        self.file.write(CHUNK_HEADER.pack(channel, first, len(codes), len(data)))
+        self.file.write(data)
+        self.index.append((channel, first, len(codes), offset + CHUNK_HEADER.size, len(data)))
+        self.written[channel] += len(codes)
+        self.raw_bytes += codes.nbytes
+        pending.clear()
+        self.pending_points[channel] = 0
+
+    def close(self):
+        """写出剩余的块与块索引"""
+        if not self.file:
+            return
+        for channel in self.channels:
+            self._flush(channel)
+        index_offset = self.file.tell()
+        self.file.write(np.array(self.index, dtype=INDEX_DTYPE).tobytes())
+        self.file.write(TRAILER.pack(index_offset, len(self.index), INDEX_MAGIC))
+        self.file.close()
+        self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_waveform_file(path, codes, fmt, parameters, **options):
+    """把 {channel: 码值} 一次写入 .dlmwav (各通道点数须相同)，返回 (原始字节数, 文件字节数)"""
+    channels = list(codes)
+    points = len(np.frombuffer(codes[channels[0]], dtype=CODE_DTYPE[fmt])) if channels else 0
+    with WaveformFileWriter(path, channels, fmt, points, parameters, **options) as writer:
+        for channel in channels:
+            writer.write(channel, codes[channel])
+    return writer.raw_bytes, os.path.getsize(path)
+
+
+class WaveformTrace:
+    """单个通道的惰性视图：切片时才读取并解压覆盖该区间的块，返回换算后的电压值"""
+
+    def __init__(self, wavefile, channel):
+        self.wavefile = wavefile
+        self.channel = channel
+
+    def __len__(self):
+        return self.wavefile.points
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            points = range(*key.indices(len(self)))
+            if len(points) == 0:
+                return np.empty(0, dtype=np.float64)
+            lower = min(points[0], points[-1])
+            values = self.wavefile.read(self.channel, lower, max(points[0], points[-1]) + 1)
+            return values if points.step == 1 else values[points.start - lower::points.step]
+        index = range(len(self))[key]
+        return self.wavefile.read(self.channel, index, index + 1)[0]
+
+
+class WaveformFile:
+    """读取 .dlmwav；wavefile[channel][a:b] 或 read(channel, a, b) 只解压需要的块"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        if self.file.readline() != WAVEFILE_MAGIC:
+            self.file.close()
+            raise ValueError(f"不是波形文件: {path}")
+        self.header = json.loads(self.file.readline())
+        self.data_offset = self.file.tell()
+        self.channels = self.header["channels"]
+        self.points = self.header["points"]
+        self.fmt = self.header["format"]
+        self.dtype = np.dtype(CODE_DTYPE[self.fmt])
+        self.sample_rate = self.header.get("sample_rate")
+        _, self.decompress = _compressor(self.header["codec"])
+        index = self._read_index()
+        # 通道 -> 按起始点排序的块索引
+        self.chunks = {channel: np.sort(index[index["channel"] == channel], order="first") for channel in self.channels}
+
+    def _read_index(self):
+        size = os.path.getsize(self.path)
+        if size - self.data_offset >= TRAILER.size:
+            self.file.seek(size - TRAILER.size)
+            index_offset, entries, magic = TRAILER.unpack(self.file.read(TRAILER.size))
+            if magic == INDEX_MAGIC:
+                self.file.seek(index_offset)
+                return np.frombuffer(self.file.read(entries * INDEX_DTYPE.itemsize), dtype=INDEX_DTYPE)
+        # 写入中断没有索引：顺序扫描块头，遇到不完整或与前面不连续的块 (如残留的半截索引) 即停止
+        entries = []
+        expected = {channel: 0 for channel in self.channels}
+        offset = self.data_offset
+        while offset + CHUNK_HEADER.size <= size:
+            self.file.seek(offset)
+            channel, first, count, length = CHUNK_HEADER.unpack(self.file.read(CHUNK_HEADER.size))
+            if (expected.get(channel) != first or not 0 < count <= self.header["chunk_points"]
+                    or offset + CHUNK_HEADER.size + length > size):
+                break
+            entries.append((channel, first, count, offset + CHUNK_HEADER.size, length))
+            expected[channel] += count
+            offset += CHUNK_HEADER.size + length
+        return np.array(entries, dtype=INDEX_DTYPE)
+
+    def codes(self, channel, start=0, stop=None):
+        """channel 在 [start, stop) 区间的原始码值"""
+        stop = self.points if stop is None else min(stop, self.points)
+        out = np.empty(max(0, stop - start), dtype=self.dtype)
+        if len(out) == 0:
+            return out
+        chunks = self.chunks[channel]
+        first = max(0, int(np.searchsorted(chunks["first"], start, side="right")) - 1)
+        filled = start
+        for chunk in chunks[first:]:
+            chunk_first, count = int(chunk["first"]), int(chunk["count"])
+            if chunk_first >= stop:
+                break
+            self.file.seek(int(chunk["offset"]))
+            data = self.decompress(self.file.read(int(chunk["size"])))
+            values = decode_chunk(data, self.dtype, count, self.header["delta"], self.header["shuffle"])
+            lower, upper = max(start, chunk_first), min(stop, chunk_first + count)
+            out[lower - start:upper - start] = values[lower - chunk_first:upper - chunk_first]
+            filled = upper
+        if filled < stop:
+            raise ValueError(f"CH{channel} 数据不完整: 只有 {filled} 点 (文件可能在写入中断)")
+        return out
+
+    def read(self, channel, start=0, stop=None, dtype=np.float64):
+        """channel 在 [start, stop) 区间换算后的电压值"""
+        row = self.channels.index(channel)
+        return scope_waveform.decode_waveform(
+            self.codes(channel, start, stop), self.fmt, self.header["range"][row], self.header["offset"][row],
+            self.header["position"][row], dtype=dtype,
+        )
+
+    def times(self, start=0, stop=None):
+        """[start, stop) 各点相对触发点的时刻 (秒)；文件没有采样率时返回 None"""
+        if not self.sample_rate:
+            return None
+        stop = self.points if stop is None else min(stop, self.points)
+        trigger = self.header.get("trigger") or 0
+        return (np.arange(start, stop, dtype=np.float64) + self.header.get("start", 0) - trigger) / self.sample_rate
+
+    def __getitem__(self, channel):
+        if channel not in self.channels:
+            raise KeyError(f"文件中没有 CH{channel}")
+        return WaveformTrace(self, channel)
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
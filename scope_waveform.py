@@ -0,0 +1,120 @@
+import os
+import time
+
+import numpy as np
+
+# :WAVeform:SEND? 二进制数据的换算系数 (见手册 :WAVeform:SEND? 说明)
+# 电压 = range × (data - position) ÷ division + offset，仅 RBYTe 使用 position
+WAVEFORM_DIVISION = {"WORD": 3200.0, "BYTE": 12.5, "RBYTE": 25.0}
+WAVEFORM_DTYPE = {"WORD": "i2", "BYTE": "i1", "RBYTE": "u1"}
+
+# :WAVeform:ALL:SEND? 数据体 (小端): 公共信息 = 波形数 (uint16) + 采集计数 (uint64)，
+# 之后每个波形为 波形编号 (uint32) + 保留 (8 字节) + 点数 (uint32) + WORD 数据
+ALL_COMMON_DTYPE = np.dtype([("traces", "<u2"), ("count", "<u8")])
+ALL_TRACE_DTYPE = np.dtype([("trace", "<u4"), ("reserved", "V8"), ("points", "<u4")])
+# 单次最多 12.5 kPoints/波形
+ALL_MAX_POINTS = 12500
+# 总点数超过该值时多线程并行解码 (NumPy 的类型转换与四则运算会释放 GIL)
+PARALLEL_DECODE_POINTS = 1_000_000
+
+
+def decode_waveform(payload, fmt="WORD", vrange=1.0, offset=0.0, position=0.0, byteorder="LSBFirst", dtype=np.float64,
+                    out=None):
+    """把 :WAVeform:SEND? 的数据体一次性换算为物理值数组
+
+    payload 可以是 bytes/bytearray/memoryview 或码值数组 (如 split_all_payload 的结果)，不会复制原始数据。
+    out 为长度相同的数组 (如内存映射文件的切片) 时直接换算到其中，不分配临时数组。
+    """
+    fmt = fmt.upper()
+    code_dtype = np.dtype(WAVEFORM_DTYPE[fmt])
+    if code_dtype.itemsize > 1:
+        code_dtype = code_dtype.newbyteorder("<" if byteorder.upper().startswith("LSB") else ">")
+
+    nbytes = memoryview(payload).nbytes
+    usable = nbytes - nbytes % code_dtype.itemsize
+    codes = np.frombuffer(payload, dtype=code_dtype, count=usable // code_dtype.itemsize)
+
+    scale = vrange / WAVEFORM_DIVISION[fmt]
+    # 先整体转换类型，再原地缩放/平移，避免额外的临时数组
+    if out is None:
+        values = codes.astype(dtype)
+    else:
+        values = out
+        np.copyto(values, codes, casting="unsafe")
+    if fmt == "RBYTE" and position:
+        values -= position
+    values *= scale
+    values += offset
+    return values
+
+
+def split_all_payload(payload):
+    """把 :WAVeform:ALL:SEND? 的数据体拆分为各波形的 WORD 码值
+
+    返回 (采集计数, {波形编号: int16 数组})；各数组都是 payload 上的视图，不复制数据。
+    设备在采集计数未变化时返回空块 (#800000000)，此时返回 (None, {})。
+    """
+    if len(payload) == 0:
+        return None, {}
+    common = np.frombuffer(payload, dtype=ALL_COMMON_DTYPE, count=1)[0]
+    offset = ALL_COMMON_DTYPE.itemsize
+    traces = {}
+    for _ in range(int(common["traces"])):
+        info = np.frombuffer(payload, dtype=ALL_TRACE_DTYPE, count=1, offset=offset)[0]
+        offset += ALL_TRACE_DTYPE.itemsize
+        points = int(info["points"])
+        traces[int(info["trace"])] = np.frombuffer(payload, dtype="<i2", count=points, offset=offset)
+        offset += 2 * points
+    return int(common["count"]), traces
+
+
+def decode_traces(codes, parameters, fmt="WORD", dtype=np.float64):
+    """把多个波形的码值换算为物理值
+
+    codes 为 {trace: 码值}，parameters 为 {trace: (range, offset, position)}；
+    总点数较多时按波形并行解码。
+    """
+    def decode(trace):
+        vrange, offset, position = parameters[trace]
+        return decode_waveform(codes[trace], fmt, vrange, offset, position, dtype=dtype)
+
+    traces = list(codes)
+    if len(traces) > 1 and sum(len(c) for c in codes.values()) >= PARALLEL_DECODE_POINTS:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=len(traces)) as executor:
+            return dict(zip(traces, executor.map(decode, traces)))
+    return {trace: decode(trace) for trace in traces}
+
+
+def default_waveform_filename(channel):
+    """默认文件名: DLM_CH<x>_年月日_时分秒.npy (多个通道时为 DLM_CH1-2-4_...)"""
+    if isinstance(channel, (list, tuple)):
+        channel = "-".join(str(c) for c in channel)
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    return f"DLM_CH{channel}_{timestamp}.npy"
+
+
+def save_waveform(filename, values, sample_rate=None, names=None):
+    """按扩展名保存波形：.csv 为文本 (时间, 电压)，其余为 NumPy .npy
+
+    values 为二维数组 (通道数 × 点数) 时，CSV 每个通道一列，列名取 names。
+    """
+    output_path = os.path.abspath(filename)
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    if filename.lower().endswith(".csv"):
+        columns = list(values) if values.ndim == 2 else [values]
+        header = ",".join(names) if names else "voltage"
+        if sample_rate:
+            times = np.arange(values.shape[-1], dtype=np.float64) / sample_rate
+            np.savetxt(filename, np.column_stack([times] + columns), fmt="%.9e", delimiter=",", header="time," + header, comments="")
+        else:
+            np.savetxt(filename, np.column_stack(columns), fmt="%.9e", delimiter=",", header=header, comments="")
+    else:
+        # 传入文件对象，避免 np.save 自动追加 .npy 扩展名
+        with open(filename, "wb") as f:
+            np.save(f, values)
+    return output_path